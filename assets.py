@@ -0,0 +1,168 @@
+"""Shared tile surfaces and the pre-scaled asset bundle.
+
+The bundle holds every tile the game draws, already scaled for the Width and
+Height in settings.py, as raw RGBA pixels behind a small index. Loading it is
+one file read and a frombuffer per tile instead of a PNG decode and a
+rotozoom. A bundle built for another window size is ignored.
+
+Usage:
+    python assets.py [bundle]
+"""
+import os
+import sys
+import struct
+import pygame
+from settings import *
+
+BUNDLE_MAGIC = b'BRKASSET'
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<8sBHHI')
+BUNDLE_ENTRY = struct.Struct('<HdHHI')
+#tile number of the background image in the cache and the bundle
+BACKGROUND = 0
+
+def bundle_tiles():
+    """Return the (tile, scale) pairs the game draws, which go into the bundle."""
+    keys = [(int(tile), Scale_Fac) for tile in Block_Type.values()]
+    keys += [(int(tile), Upgrade_Scale) for tile in Upgrade_Type.values()]
+    keys += [(51, Scale_Fac), (58, Ball_Scale), (60, Heart_Scale), (61, 1), (BACKGROUND, 1)]
+    return keys
+
+class TextureCache:
+    """A registry that loads and scales every tile image only once.
+
+    Surfaces are keyed by tile number and scale factor, so every sprite that
+    asks for the same tile at the same scale shares one surface. The shared
+    surfaces must be treated as read only. The first miss loads the whole
+    asset bundle, and only tiles missing from it are loaded from their PNGs.
+
+    Attributes:
+        surfaces (dict): Scaled surfaces keyed by (tile, scale).
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to load and scale a PNG.
+        bundle (str): The asset bundle to load on the first miss, None to always use the PNGs.
+        bundled (bool): Indicates whether the bundle was loaded (or tried).
+
+    Methods:
+        get(tile, scale): Return the surface for a tile at a scale factor.
+        background(): Return the background image.
+        add(surfaces): Convert and cache surfaces read from a bundle.
+        stats(): Return the hit/miss counters.
+        clear(): Drop every cached surface and reset the counters.
+
+    """
+
+    def __init__(self):
+        """Initialize an empty TextureCache."""
+        self.surfaces = {}
+        self.hits = 0
+        self.misses = 0
+        self.bundle = Asset_Bundle
+        self.bundled = False
+
+    @staticmethod
+    def path(tile):
+        """Return the file path of a tile, e.g. 7 -> 'PNG/07-Breakout-Tiles.png'."""
+        if int(tile) == BACKGROUND:
+            return 'PNG/bg_image.png'
+        return f'PNG/{int(tile):02d}-Breakout-Tiles.png'
+
+    def get(self, tile, scale=1):
+        """Return the surface for a tile at a scale factor.
+
+        Args:
+            tile (int | str): The tile number, e.g. 51 or '01'.
+            scale (float, optional): The rotozoom scale factor. Defaults to 1 (unscaled).
+
+        """
+        key = (int(tile), scale)
+        surf = self.surfaces.get(key)
+        if surf is None and self.bundle and not self.bundled:
+            self.add(read_bundle(self.bundle))
+            surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            return surf
+
+        self.misses += 1
+        surf = pygame.image.load(self.path(tile)).convert_alpha()
+        if scale != 1:
+            surf = pygame.transform.rotozoom(surf, 0, scale).convert_alpha()
+        self.surfaces[key] = surf
+        return surf
+
+    def background(self):
+        """Return the background image."""
+        return self.get(BACKGROUND)
+
+    def add(self, surfaces):
+        """Convert surfaces read by read_bundle for the display and cache them."""
+        for key, surf in surfaces.items():
+            self.surfaces[key] = surf.convert_alpha()
+        self.bundled = True
+
+    def stats(self):
+        """Return the hit/miss counters as a dict."""
+        return {'hits': self.hits, 'misses': self.misses, 'surfaces': len(self.surfaces), 'bundled': self.bundled}
+
+    def clear(self):
+        """Drop every cached surface and reset the counters."""
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+        self.bundled = False
+
+#shared registry used by all sprites
+tiles = TextureCache()
+
+def build_bundle(path=Asset_Bundle):
+    """Write every tile of bundle_tiles(), scaled for the current window, into a bundle."""
+    cache = TextureCache()
+    cache.bundle = None
+    entries = []
+    pixels = []
+    offset = 0
+    for tile, scale in bundle_tiles():
+        surf = cache.get(tile, scale)
+        if tile == BACKGROUND:
+            #only the top left of the background is ever on screen
+            surf = surf.subsurface((0, 0, min(surf.get_width(), Width), min(surf.get_height(), Height)))
+        data = pygame.image.tobytes(surf, 'RGBA')
+        entries.append(BUNDLE_ENTRY.pack(tile, scale, *surf.get_size(), offset))
+        pixels.append(data)
+        offset += len(data)
+    with open(path, 'wb') as file:
+        file.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, Width, Height, len(entries)))
+        file.write(b''.join(entries))
+        file.write(b''.join(pixels))
+    return len(entries), os.path.getsize(path)
+
+def read_bundle(path=Asset_Bundle):
+    """Read a bundle in one go and return its unconverted surfaces keyed by (tile, scale).
+
+    Needs no display, so it can run on a loading thread. Returns an empty dict
+    when there is no bundle or it was built for another window size or version.
+    """
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, width, height, count = BUNDLE_HEADER.unpack_from(data)
+    except (OSError, struct.error):
+        return {}
+    if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION or (width, height) != (Width, Height):
+        return {}
+
+    surfaces = {}
+    base = BUNDLE_HEADER.size + BUNDLE_ENTRY.size * count
+    for tile, scale, w, h, offset in BUNDLE_ENTRY.iter_unpack(data[BUNDLE_HEADER.size:base]):
+        start = base + offset
+        surfaces[(tile, scale)] = pygame.image.frombuffer(data[start:start + 4 * w * h], (w, h), 'RGBA')
+    return surfaces
+
+if __name__ == '__main__':
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    path = sys.argv[1] if len(sys.argv) > 1 else Asset_Bundle
+    count, size = build_bundle(path)
+    print(f'wrote {count} tiles for {Width}x{Height} to {path} ({size / 1024:.0f} KiB)')
@@ -0,0 +1,332 @@
+"""Micro benchmarks for the Breakout game.
+
+Usage:
+    python benchmark.py <name> [<name> ...]
+    python benchmark.py all
+
+Every benchmark runs without a window through SDL's dummy video driver.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys
+import subprocess
+import random
+import timeit
+import tempfile
+import tracemalloc
+import pygame
+from settings import *
+from classes import Block
+from spatial import BlockGroup
+from blockfield import BlockField
+from render import BlockLayer
+from assets import tiles, build_bundle
+from levels import Level, LevelPack, compile_pack, parse_level, MAX_ROWS
+
+def setup_display():
+    """Create the (hidden) display surface that convert_alpha needs."""
+    pygame.init()
+    return pygame.display.set_mode((Width, Height))
+
+def make_blocks(n, group, cols=10):
+    """Fill a group with n blocks laid out like Game.blocks_setup."""
+    for i in range(n):
+        row, col = divmod(i, cols)
+        pos_x = col * (Block_Size[0] + Block_Offset)
+        pos_y = Top_Offset + row * (Block_Size[1] + Block_Offset)
+        Block(random.randint(1, 5), pos_x, pos_y, group, lambda pos, up_type: None)
+    return group
+
+def make_field(n, cols=10):
+    """Return a BlockField with n blocks laid out like Game.blocks_setup, its grid built."""
+    field = BlockField(lambda pos, up_type: None)
+    for i in range(n):
+        row, col = divmod(i, cols)
+        pos_x = col * (Block_Size[0] + Block_Offset)
+        pos_y = Top_Offset + row * (Block_Size[1] + Block_Offset)
+        field.add_block(random.randint(1, 5), pos_x, pos_y)
+    field.collide(pygame.Rect(0, 0, 1, 1))
+    return field
+
+def measure(build):
+    """Return (result, bytes allocated) of build()."""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+def report(name, seconds, count, unit='query'):
+    """Print one benchmark line."""
+    print(f'{name:<40} {seconds / count * 1e6:10.2f} us/{unit}')
+
+def bench_grid():
+    """Compare the BlockGroup spatial index with a linear spritecollide scan."""
+    setup_display()
+    queries = 2000
+    for n in (100, 1000, 10000):
+        random.seed(n)
+        plain = make_blocks(n, pygame.sprite.Group())
+        indexed = BlockGroup(*plain.sprites())
+        field_h = Top_Offset + (n // 10 + 1) * (Block_Size[1] + Block_Offset)
+
+        probe = pygame.sprite.Sprite()
+        probe.rect = pygame.Rect(0, 0, 2 * Ball_Radius, 2 * Ball_Radius)
+        points = [(random.uniform(0, Width), random.uniform(0, field_h)) for _ in range(queries)]
+
+        def linear():
+            for point in points:
+                probe.rect.center = point
+                pygame.sprite.spritecollide(probe, plain, False)
+
+        def grid():
+            for point in points:
+                probe.rect.center = point
+                indexed.spritecollide(probe)
+
+        report(f'spritecollide scan, {n} blocks', min(timeit.repeat(linear, number=1, repeat=3)), queries)
+        report(f'BlockGroup index, {n} blocks', min(timeit.repeat(grid, number=1, repeat=3)), queries)
+
+def bench_layer():
+    """Compare per-block drawing with the cached BlockLayer on a full board."""
+    screen = setup_display()
+    background = pygame.image.load('PNG/bg_image.png').convert_alpha()
+    frames = 500
+    #the full 10 x 10 board of Shape, plus a 10 x 30 board that runs past the bottom of the screen
+    for n, cols in ((100, 10), (300, 10)):
+        random.seed(n)
+        blocks = make_blocks(n, BlockGroup(), cols=cols)
+        layer = BlockLayer(background, blocks)
+
+        def per_block():
+            for _ in range(frames):
+                screen.blit(background, (0, 0))
+                blocks.draw(screen)
+
+        def cached():
+            for _ in range(frames):
+                layer.update()
+                screen.blit(layer.surface, (0, 0))
+
+        report(f'background + {n} block blits', min(timeit.repeat(per_block, number=1, repeat=3)), frames, 'frame')
+        report(f'BlockLayer, {n} blocks', min(timeit.repeat(cached, number=1, repeat=3)), frames, 'frame')
+
+        #one hit per frame: patch a single tile and blit the layer
+        sprites = blocks.sprites()
+        def cached_hits():
+            for i in range(frames):
+                blocks.touch(sprites[i % n])
+                layer.update()
+                screen.blit(layer.surface, (0, 0))
+        report(f'BlockLayer, {n} blocks, one hit/frame', min(timeit.repeat(cached_hits, number=1, repeat=3)), frames, 'frame')
+
+def bench_blocks():
+    """Compare Block sprites in a BlockGroup with the array backed BlockField."""
+    setup_display()
+    #load every tile first, the texture cache is shared by both
+    for tile in Block_Type.values():
+        tiles.get(tile, Scale_Fac)
+    queries = 2000
+    for n in (1000, 10000, 100000):
+        random.seed(n)
+        group, group_bytes = measure(lambda: make_blocks(n, BlockGroup()))
+        random.seed(n)
+        field, field_bytes = measure(lambda: make_field(n))
+        print(f'{f"BlockGroup memory, {n} blocks":<40} {group_bytes / n:10.1f} bytes/block')
+        print(f'{f"BlockField memory, {n} blocks":<40} {field_bytes / n:10.1f} bytes/block')
+
+        field_h = Top_Offset + (n // 10 + 1) * (Block_Size[1] + Block_Offset)
+        probe = pygame.sprite.Sprite()
+        probe.rect = pygame.Rect(0, 0, 2 * Ball_Radius, 2 * Ball_Radius)
+        points = [(random.uniform(0, Width), random.uniform(0, field_h)) for _ in range(queries)]
+
+        def collide(blocks):
+            for point in points:
+                probe.rect.center = point
+                blocks.spritecollide(probe)
+
+        report(f'BlockGroup collide, {n} blocks', min(timeit.repeat(lambda: collide(group), number=1, repeat=3)), queries)
+        report(f'BlockField collide, {n} blocks', min(timeit.repeat(lambda: collide(field), number=1, repeat=3)), queries)
+        report(f'BlockGroup health scan, {n} blocks',
+               min(timeit.repeat(lambda: sum(block.health for block in group), number=1, repeat=3)), n, 'block')
+        report(f'BlockField health scan, {n} blocks',
+               min(timeit.repeat(lambda: sum(field.health), number=1, repeat=3)), n, 'block')
+
+def bench_levels():
+    """Compare parsing text levels with opening a memory-mapped level pack."""
+    count = 10000
+    random.seed(count)
+    levels = [Level(f'level {i}', [[random.randint(0, 10) for _ in range(10)] for _ in range(MAX_ROWS)]) for i in range(count)]
+    texts = [f'name: {level.name}\ngrid:\n' + '\n'.join(' '.join(str(tier or '.') for tier in row) for row in level.grid)
+             for level in levels]
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'levels.brkpack')
+        compile_pack(path, levels)
+
+        def parse_all():
+            return [parse_level(text) for text in texts]
+
+        def open_one():
+            with LevelPack(path) as pack:
+                return pack[count // 2]
+
+        report(f'parse {count} text levels', min(timeit.repeat(parse_all, number=1, repeat=3)), 1, 'pack')
+        report(f'open pack of {count}, load one level', min(timeit.repeat(open_one, number=100, repeat=3)), 100, 'pack')
+
+def bench_balls():
+    """Time game updates with many balls in play, like python main.py --balls n."""
+    from main import Game
+    from headless import track_ball
+    frames = 300
+    for n in (1, 100, 500):
+        game = Game(headless=True, seed=n, balls=n)
+        game.serve()
+
+        def play():
+            for _ in range(frames):
+                game.serve()
+                game.update(track_ball(game))
+
+        report(f'update, {n} balls served', timeit.timeit(play, number=1), frames, 'frame')
+
+def bench_startup():
+    """Time python main.py to its first frame with and without the asset bundle."""
+    setup_display()
+    build_bundle()
+    runs = 5
+    for flags in ([], ['--no-bundle']):
+        wall = []
+        for _ in range(runs):
+            start = timeit.default_timer()
+            output = subprocess.run([sys.executable, 'main.py', '--startup'] + flags, capture_output=True, text=True).stdout
+            wall.append(timeit.default_timer() - start)
+        #the game's own measurement leaves out the interpreter and import time
+        print(f'{" ".join(["main.py"] + flags):<40} {min(wall) * 1000:10.1f} ms wall, {output.splitlines()[-1]}')
+
+def bench_scale():
+    """Time Game.draw with 500 balls in play at full size and on scaled canvases."""
+    from main import Game
+    from headless import track_ball
+    setup_display()
+    frames = 200
+    for scale, smooth in ((None, False), (0.75, False), (0.5, False), (0.5, True)):
+        game = Game(seed=1, balls=500, scale=scale, smooth=smooth)
+        game.serve()
+        for _ in range(30):
+            game.update(track_ball(game))
+        name = f'draw, scale {scale or 1}{" smooth" if smooth else ""}'
+        report(name, timeit.timeit(game.draw, number=frames), frames, 'frame')
+
+def bench_particles():
+    """Time ParticleSystem.update and draw with thousands of live particles."""
+    from particles import bench
+    for particles in (1000, 4000, 10000):
+        bench(particles)
+
+def bench_snapshot():
+    """Time Game.snapshot and Game.restore mid-game, with 1 and 100 balls in play."""
+    from main import Game
+    from headless import track_ball
+    from snapshot import RewindBuffer
+    runs = 2000
+    for n in (1, 100):
+        game = Game(headless=True, seed=n, balls=n)
+        for _ in range(600):
+            game.serve()
+            game.update(track_ball(game))
+        blob = game.snapshot()
+        report(f'snapshot, {n} balls, {len(blob)} bytes', timeit.timeit(game.snapshot, number=runs), runs, 'snapshot')
+        report(f'restore, {n} balls', timeit.timeit(lambda: game.restore(blob), number=runs), runs, 'restore')
+        rewind = RewindBuffer(game)
+
+        def play():
+            game.serve()
+            game.update(track_ball(game))
+            rewind.record()
+
+        frames = rewind.capacity
+        report(f'update and record, {n} balls', timeit.timeit(play, number=frames), frames, 'frame')
+        size = sum(len(blob) for frame, blob in rewind.snapshots)
+        print(f'{"rewind buffer":<40} {size / 1024:10.1f} KiB for {rewind.seconds():.0f} s')
+
+class CountingFont:
+    """A font that counts its render calls and the pixel bytes of the surfaces they create."""
+
+    def __init__(self, font):
+        self.font = font
+        self.calls = 0
+        self.bytes = 0
+
+    def render(self, *args):
+        surface = self.font.render(*args)
+        self.calls += 1
+        self.bytes += surface.get_width() * surface.get_height() * surface.get_bytesize()
+        return surface
+
+def bench_hud():
+    """Compare the cached HUD with rendering its fields with font.render every frame."""
+    from main import Game
+    from headless import track_ball
+    from hud import HUD
+    screen = setup_display()
+    frames = 2000
+    game = Game(seed=4, balls=3, particles=False)
+    game.player.sprite.upgrade('laser')
+    #the game draws without its own HUD, both ways are timed on the same values
+    game.hud = None
+    hud = HUD(game)
+    hud.text.font = cached_font = CountingFont(hud.text.font)
+    naive_font = CountingFont(pygame.font.SysFont(None, Hud_Font_Size))
+    naive = cached = 0.0
+    for _ in range(frames):
+        game.serve()
+        game.update(track_ball(game))
+
+        start = timeit.default_timer()
+        score, lasers, cooldown, speed, upgrades = hud.read()
+        fields = [f'SCORE {score}', f'SPEED {speed}']
+        if lasers is not None:
+            fields.append(f'LASERS {lasers}')
+        if lasers:
+            fields.append(f'COOLDOWN {cooldown / 10:.1f}s' if cooldown else 'COOLDOWN READY')
+        x = hud.rect.right
+        for text in reversed(fields + list(upgrades)):
+            surface = naive_font.render(text, True, Hud_Color)
+            x -= surface.get_width()
+            screen.blit(surface, (x, hud.rect.top))
+            x -= hud.gap
+        naive += timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        hud.update()
+        hud.draw(screen)
+        cached += timeit.default_timer() - start
+        game.draw()
+
+    for name, seconds, font in (('font.render every field every frame', naive, naive_font),
+                                ('HUD, glyph atlas and text cache', cached, cached_font)):
+        report(name, seconds, frames, 'frame')
+        print(f'{"":<40} {font.calls / frames:10.2f} renders/frame, {font.bytes / frames / 1024:7.2f} KiB of text surfaces/frame')
+    print(f'{"":<40} {hud.composed} of {frames} frames recomposed')
+
+BENCHMARKS = {
+    'grid': bench_grid,
+    'layer': bench_layer,
+    'blocks': bench_blocks,
+    'levels': bench_levels,
+    'balls': bench_balls,
+    'startup': bench_startup,
+    'scale': bench_scale,
+    'particles': bench_particles,
+    'snapshot': bench_snapshot,
+    'hud': bench_hud,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or ['all']
+    if names == ['all']:
+        names = list(BENCHMARKS)
+    for name in names:
+        print(f'--- {name}: {BENCHMARKS[name].__doc__}')
+        BENCHMARKS[name]()
@@ -0,0 +1,273 @@
+import random
+from array import array
+import pygame
+from settings import *
+from assets import tiles
+from classes import roll_drop
+
+#drop types are stored as indices into this list
+UPGRADES = list(Upgrade_Type)
+
+class BlockView:
+    """A lightweight handle on one block of a BlockField.
+
+    Views are created on demand by the field and behave like a Block sprite
+    for the code that collides with blocks: they expose rect, image, health,
+    type, drop, drop_type, get_damage() and kill(). Two views of the same
+    block compare equal.
+
+    """
+    __slots__ = ('field', 'index')
+
+    def __init__(self, field, index):
+        self.field = field
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, BlockView) and other.field is self.field and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.field), self.index))
+
+    @property
+    def rect(self):
+        return self.field.rect(self.index)
+
+    @property
+    def image(self):
+        return tiles.get(Block_Type[self.field.type[self.index]], Scale_Fac)
+
+    @property
+    def health(self):
+        return self.field.health[self.index]
+
+    @property
+    def type(self):
+        return self.field.type[self.index]
+
+    @property
+    def drop(self):
+        return bool(self.field.drop[self.index])
+
+    @property
+    def drop_type(self):
+        return UPGRADES[self.field.drop_type[self.index]] if self.drop else None
+
+    def get_damage(self, dam):
+        """Reduce the health of the block when hit, like Block.get_damage."""
+        self.field.damage(self.index, dam)
+
+    def kill(self):
+        """Remove the block from the field."""
+        self.field.remove(self.index)
+
+    def alive(self):
+        """Return True while the block is in the field."""
+        return bool(self.field.alive[self.index])
+
+class BlockField:
+    """Compact block storage: one entry per block in typed arrays instead of a Sprite.
+
+    Type, health, drop flag, drop type and position live in parallel arrays,
+    images come from the shared texture cache, and a flat grid array maps the
+    cells of the Game.blocks_setup layout to the block centred in them. It is a drop-in
+    for BlockGroup: len() counts the live blocks, iteration, collide() and
+    spritecollide() return BlockView handles in insertion order, and damaged or
+    removed blocks are reported in changed. Blocks must sit on the grid, one
+    block per cell; all block tiles share one size.
+
+    Attributes:
+        create_upgrade (function): Called with (pos, up_type) when a block with a drop dies.
+        x, y (array): Block rect positions.
+        type, health (array): Block tile type and health.
+        drop, drop_type, alive (bytearray): Drop flag, drop type index and live flag per block.
+        width, height (int): The size of every block rect.
+        changed (list): Rects of blocks damaged or removed since a renderer last read it,
+            None while no renderer tracks changes.
+        revision (int): Counts block damage and removals, so readers can tell the board changed.
+
+    Methods:
+        add_block(num, pos_x, pos_y): Add a block of tier num.
+        rect(index): Return the rect of a block.
+        damage(index, dam): Apply Block.get_damage to a block.
+        remove(index): Remove a block.
+        collide(rect): Return the live blocks colliding with a rect.
+        bounds(): Return a rect containing every live block.
+        spritecollide(sprite): Index backed drop-in for pygame.sprite.spritecollide.
+        touch(block): Record that a block changed its image.
+        draw(surface): Draw every live block.
+
+    """
+
+    def __init__(self, create_upgrade, rng=random):
+        """Initialize an empty BlockField.
+
+        Args:
+            create_upgrade (function): Called with (pos, up_type) when a block with a drop dies.
+            rng (Random, optional): Random generator for the drops. Defaults to the random module.
+
+        """
+        self.create_upgrade = create_upgrade
+        self.rng = rng
+        self.x = array('i')
+        self.y = array('i')
+        self.type = array('h')
+        self.health = array('i')
+        self.drop = bytearray()
+        self.drop_type = bytearray()
+        self.alive = bytearray()
+        self.width, self.height = tiles.get(Block_Type[2], Scale_Fac).get_size()
+        self.cell_w = Block_Size[0] + Block_Offset
+        self.cell_h = Block_Size[1] + Block_Offset
+        self.changed = None
+        self.revision = 0
+        self._count = 0
+        self._grid = None
+        self._cols = 0
+        self._rows = 0
+        self._bounds = None
+
+    def add_block(self, num, pos_x, pos_y, drop_prob=Drop_prob, drops=None):
+        """Add a block of tier num with its top left at (pos_x, pos_y), like Block(num, ...).
+
+        Args:
+            num (int): The block tier.
+            pos_x, pos_y (float): The top left corner of the block.
+            drop_prob (int, optional): Drop threshold of the level. Defaults to Drop_prob.
+            drops (dict, optional): Upgrade type weights of the level. Defaults to None for an even choice.
+
+        Returns:
+            int: The index of the new block.
+
+        """
+        rect = pygame.Rect(0, 0, self.width, self.height)
+        rect.topleft = (pos_x, pos_y)
+        self.x.append(rect.x)
+        self.y.append(rect.y)
+        self.type.append(2 * num)
+        self.health.append(num * 100)
+        self.alive.append(1)
+
+        #same draws as Block.check_drop, so a seed gives the same board
+        drop_type = roll_drop(self.rng, drop_prob, drops)
+        self.drop.append(drop_type is not None)
+        self.drop_type.append(UPGRADES.index(drop_type) if drop_type else 0)
+
+        self._count += 1
+        self._grid = None
+        self._bounds = None
+        return len(self.x) - 1
+
+    def rect(self, index):
+        """Return the rect of a block."""
+        return pygame.Rect(self.x[index], self.y[index], self.width, self.height)
+
+    def cell(self, x, y):
+        """Return the (col, row) cell of a point."""
+        return int(x // self.cell_w), int((y - Top_Offset) // self.cell_h)
+
+    def home(self, index):
+        """Return the cell a block is indexed under, the one holding its centre."""
+        return self.cell(self.x[index] + self.width // 2, self.y[index] + self.height // 2)
+
+    def _build_grid(self):
+        """Rebuild the flat cell -> block index grid after blocks were added."""
+        cells = [self.home(i) for i in range(len(self.x))]
+        self._cols = max((col for col, row in cells), default=-1) + 1
+        self._rows = max((row for col, row in cells), default=-1) + 1
+        self._grid = array('i', [-1]) * (self._cols * self._rows)
+        for index, (col, row) in enumerate(cells):
+            if not self.alive[index]:
+                continue
+            if col < 0 or row < 0:
+                raise ValueError('BlockField blocks must lie inside the grid')
+            if self._grid[row * self._cols + col] != -1:
+                raise ValueError('BlockField holds one block per grid cell')
+            self._grid[row * self._cols + col] = index
+
+    def bounds(self):
+        """Return a rect containing every live block, not shrunk as blocks die."""
+        if self._bounds is None:
+            rects = [self.rect(i) for i in range(len(self.x)) if self.alive[i]]
+            self._bounds = rects[0].unionall(rects) if rects else pygame.Rect(0, 0, 0, 0)
+        return self._bounds
+
+    def damage(self, index, dam):
+        """Reduce the health of a block when hit, like Block.get_damage."""
+        self.health[index] -= dam
+
+        if self.health[index] > 0:
+            self.type[index] -= 1
+            self.touch(BlockView(self, index))
+        else:
+            if self.drop[index]:
+                rect = self.rect(index)
+                self.create_upgrade(rect.midbottom, UPGRADES[self.drop_type[index]])
+            self.remove(index)
+
+    def remove(self, index):
+        """Remove a block, like Block.kill(); removing a dead block does nothing."""
+        if not self.alive[index]:
+            return
+        self.alive[index] = 0
+        self._count -= 1
+        if self._grid is not None:
+            col, row = self.home(index)
+            self._grid[row * self._cols + col] = -1
+        self.touch(BlockView(self, index))
+
+    def touch(self, block):
+        """Record that a block changed its image, in changed if changes are tracked."""
+        self.revision += 1
+        if self.changed is not None:
+            self.changed.append(block.rect)
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def __iter__(self):
+        alive = self.alive
+        return (BlockView(self, index) for index in range(len(alive)) if alive[index])
+
+    def sprites(self):
+        """Return views of every live block."""
+        return list(self)
+
+    def collide(self, rect):
+        """Return the live blocks colliding with a rect, in the order they were added."""
+        if self._grid is None:
+            self._build_grid()
+        #the centre of a block overlapping the rect lies less than half a block outside it
+        half_w, half_h = self.width // 2, self.height // 2
+        col_0, row_0 = self.cell(rect.left - self.width + 1 + half_w, rect.top - self.height + 1 + half_h)
+        col_1, row_1 = self.cell(rect.right - 1 + half_w, rect.bottom - 1 + half_h)
+        col_0, row_0 = max(col_0, 0), max(row_0, 0)
+        col_1, row_1 = min(col_1, self._cols - 1), min(row_1, self._rows - 1)
+
+        found = []
+        for row in range(row_0, row_1 + 1):
+            base = row * self._cols
+            for col in range(col_0, col_1 + 1):
+                index = self._grid[base + col]
+                if index != -1:
+                    x, y = self.x[index], self.y[index]
+                    if rect.left < x + self.width and x < rect.right and rect.top < y + self.height and y < rect.bottom:
+                        found.append(index)
+        found.sort()
+        return [BlockView(self, index) for index in found]
+
+    def spritecollide(self, sprite, dokill=False):
+        """Index backed drop-in for pygame.sprite.spritecollide(sprite, self, dokill)."""
+        found = self.collide(sprite.rect)
+        if dokill:
+            for block in found:
+                block.kill()
+        return found
+
+    def draw(self, surface):
+        """Draw every live block."""
+        for block in self:
+            surface.blit(block.image, block.rect)
\ No newline at end of file
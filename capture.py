@@ -0,0 +1,230 @@
+"""Gameplay capture without stalling the game loop.
+
+FrameCapture copies the pixels of the screen into one slot of a ring of
+preallocated frame buffers in shared memory and hands the slot to a worker
+process, which writes it out as a PNG sequence or a raw video file and
+hands the slot back. Copying a frame takes under a millisecond; when every
+slot is still waiting for the worker the frame is dropped instead of
+waiting, unless the capture was made blocking.
+
+PNG frames are named after the captured frame count and each one records
+its game frame, so drops show up as gaps. Raw video is the bare pixels of
+every captured frame in the screen's pixel format; ffmpeg reads it with the
+command printed by python capture.py.
+
+Usage:
+    python main.py --capture frames/ | --capture game.raw
+    python capture.py frames/|game.raw [frames] [seed]
+"""
+import os
+import sys
+import time
+import zlib
+import struct
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import pygame
+from settings import *
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_HEADER = struct.Struct('>IIBBBBB')
+
+def png_chunk(kind, data):
+    """Return a PNG chunk with its length and CRC."""
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+def encode_png(rgb, size, level=Capture_Level):
+    """Return PNG file bytes for packed RGB pixels, written without row filters.
+
+    Args:
+        rgb (bytes): Rows of packed RGB pixels.
+        size (tuple): The (width, height) of the image.
+        level (int, optional): The zlib level, low levels trade size for speed. Defaults to Capture_Level.
+
+    """
+    width, height = size
+    stride = width * 3
+    #every row starts with its filter type, 0 for none
+    rows = b''.join(b'\0' + rgb[row * stride:(row + 1) * stride] for row in range(height))
+    return (PNG_SIGNATURE + png_chunk(b'IHDR', PNG_HEADER.pack(width, height, 8, 2, 0, 0, 0))
+            + png_chunk(b'IDAT', zlib.compress(rows, level)) + png_chunk(b'IEND', b''))
+
+def pixel_format(surface):
+    """Return the frombuffer format of a 32 bit surface, 'BGRA' or 'RGBA'."""
+    if surface.get_bytesize() != 4 or surface.get_pitch() != surface.get_width() * 4:
+        raise ValueError('only 32 bit surfaces without row padding can be captured')
+    return 'BGRA' if surface.get_masks()[0] == 0xFF0000 else 'RGBA'
+
+def _worker(name, slots, frame_bytes, size, fmt, path, conn):
+    """Write the frames handed over by a FrameCapture until it sends None."""
+    memory = shared_memory.SharedMemory(name=name)
+    raw = None if os.path.isdir(path) else open(path, 'wb')
+    try:
+        while True:
+            job = conn.recv()
+            if job is None:
+                break
+            slot, number, frame = job
+            pixels = memory.buf[slot * frame_bytes:(slot + 1) * frame_bytes]
+            if raw:
+                raw.write(pixels)
+            else:
+                rgb = pygame.image.tobytes(pygame.image.frombuffer(bytes(pixels), size, fmt), 'RGB')
+                with open(os.path.join(path, f'frame_{number:06d}_{frame:07d}.png'), 'wb') as file:
+                    file.write(encode_png(rgb, size))
+            pixels.release()
+            conn.send(slot)
+    finally:
+        if raw:
+            raw.close()
+        memory.close()
+        conn.close()
+
+class FrameCapture:
+    """Captures frames of a surface through a ring of shared frame buffers.
+
+    Attributes:
+        surface (Surface): The surface captured, normally the display.
+        path (str): The PNG directory (a path ending with a slash or an existing
+            directory) or the raw video file.
+        slots (int): Frame buffers in the ring.
+        block (bool): Indicates whether capture() waits for a free slot instead of dropping the frame.
+        captured (int): Frames copied into the ring.
+        dropped (int): Frames dropped because every slot was busy.
+        written (int): Frames the worker has written.
+        max_depth (int): The most frames ever waiting for the worker at once.
+
+    Methods:
+        capture(frame): Copy the current surface into the ring.
+        depth(): Return the frames waiting for the worker.
+        stats(): Return the capture counters.
+        close(): Write the remaining frames and stop the worker.
+
+    """
+
+    def __init__(self, surface, path, slots=Capture_Slots, block=False):
+        """Initialize the FrameCapture object and start its worker.
+
+        Args:
+            surface (Surface): The 32 bit surface to capture.
+            path (str): A directory for PNG frames (created when it ends with a slash) or a raw video file.
+            slots (int, optional): Frame buffers in the ring. Defaults to Capture_Slots.
+            block (bool, optional): Wait for a free slot instead of dropping frames. Defaults to False.
+
+        """
+        self.surface = surface
+        self.path = path
+        self.slots = slots
+        self.block = block
+        self.format = pixel_format(surface)
+        self.size = surface.get_size()
+        self.frame_bytes = self.size[0] * self.size[1] * 4
+        if path.endswith(('/', os.sep)):
+            os.makedirs(path, exist_ok=True)
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.max_depth = 0
+
+        self._memory = shared_memory.SharedMemory(create=True, size=slots * self.frame_bytes)
+        self._buffers = [self._memory.buf[i * self.frame_bytes:(i + 1) * self.frame_bytes] for i in range(slots)]
+        #touch every page now, not on the first copy into each slot
+        blank = bytes(self.frame_bytes)
+        for buffer in self._buffers:
+            buffer[:] = blank
+        self._free = list(range(slots))
+        #a spawned worker does not inherit the display and pygame's signal handlers
+        context = mp.get_context('spawn')
+        self._conn, child = context.Pipe()
+        self._process = context.Process(target=_worker, daemon=True,
+                                        args=(self._memory.name, slots, self.frame_bytes, self.size, self.format, path, child))
+        self._process.start()
+        child.close()
+
+    def _reclaim(self):
+        """Take back the slots the worker has finished with."""
+        while self._process is not None and self._conn.poll():
+            self._free.append(self._conn.recv())
+            self.written += 1
+
+    def capture(self, frame=0):
+        """Copy the current surface into a free slot for the worker.
+
+        Args:
+            frame (int, optional): The game frame, recorded in PNG names. Defaults to 0.
+
+        Returns:
+            bool: True if the frame was queued, False if it was dropped.
+
+        """
+        self._reclaim()
+        if not self._free:
+            if not self.block:
+                self.dropped += 1
+                return False
+            self._free.append(self._conn.recv())
+            self.written += 1
+        slot = self._free.pop()
+        self._buffers[slot][:] = memoryview(self.surface.get_view('1')).cast('B')
+        self._conn.send((slot, self.captured, frame))
+        self.captured += 1
+        self.max_depth = max(self.max_depth, self.depth())
+        return True
+
+    def depth(self):
+        """Return the frames waiting for or being written by the worker."""
+        return self.slots - len(self._free)
+
+    def stats(self):
+        """Return the capture counters as a dict."""
+        self._reclaim()
+        return {'captured': self.captured, 'dropped': self.dropped, 'written': self.written,
+                'depth': self.depth(), 'max_depth': self.max_depth}
+
+    def ffmpeg(self, fps=FPS):
+        """Return the ffmpeg command that turns a raw capture into a video."""
+        return (f'ffmpeg -f rawvideo -pixel_format {self.format.lower()} -video_size {self.size[0]}x{self.size[1]} '
+                f'-framerate {fps} -i {self.path} {os.path.splitext(self.path)[0]}.mp4')
+
+    def close(self):
+        """Wait for the worker to write the frames in the ring, then stop it and free the ring."""
+        if self._process is None:
+            return
+        while self.depth():
+            self._free.append(self._conn.recv())
+            self.written += 1
+        self._conn.send(None)
+        self._process.join()
+        self._conn.close()
+        self._process = None
+        for buffer in self._buffers:
+            buffer.release()
+        self._memory.close()
+        self._memory.unlink()
+
+def record(path, frames=600, seed=1):
+    """Play a game without a window and capture every frame at full simulation speed."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from main import Game
+    from headless import track_ball, game_state
+    game = Game(seed=seed)
+    capture = FrameCapture(game.screen, path, block=True)
+    start = time.perf_counter()
+    try:
+        for _ in range(frames):
+            if game_state(game) != 'running':
+                break
+            game.serve()
+            game.run(track_ball(game))
+            capture.capture(game.frame)
+    finally:
+        capture.close()
+    elapsed = time.perf_counter() - start
+    stats = capture.stats()
+    print(f"captured {stats['captured']} frames in {elapsed:.2f} s, {stats['captured'] / elapsed:.0f} fps, "
+          f"{stats['dropped']} dropped, queue depth up to {stats['max_depth']} of {capture.slots}")
+    if not os.path.isdir(path):
+        print(capture.ffmpeg())
+
+if __name__ == '__main__':
+    record(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 600, int(sys.argv[3]) if len(sys.argv) > 3 else 1)
\ No newline at end of file
@@ -2,6 +2,9 @@ from typing import Any
 import pygame
 import random
 from settings import *
+from assets import tiles
+from physics import sweep_circle_aabb, lerp_rect
+from pool import SpritePool
 
 class Player(pygame.sprite.Sprite):
     """A class representing the player character in the game.
@@ -11,19 +14,23 @@ class Player(pygame.sprite.Sprite):
         rect (Rect): The rectangular area occupied by the player character.
         speed (int): The movement speed of the player character.
         hearts (int): The number of hearts/lives the player has.
-        blocks (Group): The group of blocks in the game.
+        blocks (BlockGroup): The spatially indexed group of blocks in the game.
         no_lasers (int): The number of lasers available to the player.
         lasers_grp (Group): The group of lasers fired by the player.
+        laser_pool (SpritePool): Reusable Laser sprites.
         start_laser (bool): Indicates whether the player can fire lasers.
         laser_time (int): The time when the last laser was fired.
         laser_cooldown (int): The cooldown time between laser shots.
         ready (bool): Indicates whether the player is ready to fire a laser.
+        get_ticks (function): The clock used for laser cooldowns, in milliseconds.
+        last_rect (Rect): The rect before the last update, for render interpolation.
 
     Methods:
         constraint(): Ensures that the player character stays within the game window.
-        get_input(): Gets the user input to move the player character.
+        get_input(direction): Gets the user input to move the player character.
         upgrade(upgrade_type): Upgrades the player character based on the given upgrade type.
         laser_recharge(): Recharges the laser ability of the player.
+        render_rect(alpha): Returns the rect to draw between the last two updates.
         update(): Updates the player character's state and behavior.
 
     """
@@ -33,16 +40,16 @@ class Player(pygame.sprite.Sprite):
 
         Args:
             pos (tuple): The initial position of the player character (x, y).
-            blocks (Group): The group of blocks in the game.
+            blocks (BlockGroup): The spatially indexed group of blocks in the game.
             speed (int, optional): The movement speed of the player character. Defaults to 5.
 
         """
         super().__init__()
 
         #sprite setup
-        self.image = pygame.image.load('PNG/51-Breakout-Tiles.png').convert_alpha()
-        self.image = pygame.transform.rotozoom(self.image, 0, Scale_Fac).convert_alpha()
+        self.image = tiles.get(51, Scale_Fac)
         self.rect = self.image.get_rect(center = pos)
+        self.last_rect = self.rect.copy()
 
         self.speed = speed
         self.hearts = 3
@@ -53,10 +60,12 @@ class Player(pygame.sprite.Sprite):
         #lasers setup
         self.no_lasers = 10
         self.lasers_grp = pygame.sprite.Group()
+        self.laser_pool = SpritePool(Laser)
         self.start_laser = False
         self.laser_time = 0
         self.laser_cooldown = 2000
         self.ready = True
+        self.get_ticks = pygame.time.get_ticks
  
     def constraint(self):
         """Ensure that the player character stays within the game window."""
@@ -65,15 +74,24 @@ class Player(pygame.sprite.Sprite):
         if self.rect.right >= Width:
             self.rect.right = Width
 
-    def get_input(self):
-        """Get the user input to move the player character."""
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_RIGHT]:
-            self.rect.x += self.speed
-        if keys[pygame.K_LEFT]:
-            self.rect.x -= self.speed
+    def get_input(self, direction=None):
+        """Get the user input to move the player character.
+
+        Args:
+            direction (int, optional): -1 for left, 1 for right, 0 to stay. Reads the keyboard when None.
+
+        """
+        self.last_rect = self.rect.copy()
+        if direction is None:
+            keys = pygame.key.get_pressed()
+            direction = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
+        self.rect.x += direction * self.speed
         self.constraint()
 
+    def render_rect(self, alpha):
+        """Return the rect to draw a fraction alpha of the way through the last update."""
+        return lerp_rect(self.last_rect, self.rect, alpha)
+
     def upgrade(self, upgrade_type):
         """Upgrade the player character based on the given upgrade type.
 
@@ -97,7 +115,7 @@ class Player(pygame.sprite.Sprite):
         """Recharge the laser ability of the player."""
 
         if not self.ready:
-            current_time = pygame.time.get_ticks()
+            current_time = self.get_ticks()
             if (current_time - self.laser_time) >= self.laser_cooldown:
                 self.ready = True
 
@@ -108,17 +126,13 @@ class Player(pygame.sprite.Sprite):
 
         # Update laser
         if self.start_laser and self.ready:
-            self.laser_time = pygame.time.get_ticks()
-            L = Laser(self.rect, self.blocks)
+            self.laser_time = self.get_ticks()
+            L = self.laser_pool.acquire(self.rect, self.blocks)
             self.lasers_grp.add(L)
             self.ready = False
             self.no_lasers -= 1
 
-            #remove laser if it goes outside window
-            for sprite in self.lasers_grp:
-                if sprite.rect.y < -100:
-                    sprite.kill()
-
+        #lasers remove themselves once they leave the window
         self.lasers_grp.update()            
 
 class Ball(pygame.sprite.Sprite):
@@ -129,11 +143,25 @@ class Ball(pygame.sprite.Sprite):
         rect (Rect): The rectangular area occupied by the ball.
         velocity (list): The velocity of the ball in the (x, y) direction.
         player (Player): The player object representing the paddle.
-        blocks (Group): The group of blocks in the game.
+        blocks (BlockGroup): The spatially indexed group of blocks in the game.
         active (Bool): Indicates whether the ball is in motion.
+        swept (bool): Use swept collisions instead of overlap tests after the move.
+        center (Vector2): The exact ball centre used by swept collisions.
+        last_rect (Rect): The rect before the last update, for render interpolation.
+        balls (BallGroup): The balls in play with this one, None outside a BallGroup.
+        near_blocks (bool): False when the BallGroup found no block within reach this frame.
+        near_paddle (bool): False when the BallGroup found the paddle out of reach this frame.
+        pool (SpritePool): The pool the ball returns to when killed, None if not pooled.
 
     Methods:
+        reset(pos, player, blocks, vel): Sets up the ball resting on the paddle.
+        launch(center, vel): Puts the ball in play at a point.
+        lost(): Handles the ball falling out of the window.
+        kill(): Removes the ball and returns it to its pool.
         update(): Updates the ball's position and handles collisions.
+        sweep(): Moves the ball with swept circle versus box collisions.
+        first_impact(delta): Returns the earliest block or paddle hit along a move.
+        render_rect(alpha): Returns the rect to draw between the last two updates.
         check_paddle_collision(): Checks for collision with the paddle.
         check_block_collision(): Checks for collision with blocks.
         handle_paddle_collision(): Handles collision with the paddle.
@@ -142,32 +170,69 @@ class Ball(pygame.sprite.Sprite):
 
     """
     
+    pool = None
+
     def __init__(self, pos, player, blocks, vel = [2, -2]) -> None:
         """Initialize the Ball object.
 
         Args:
             pos (tuple): The initial position of the ball (x, y).
             player (Player): The player object representing the paddle.
-            blocks (Group): The group of blocks in the game.
+            blocks (BlockGroup): The spatially indexed group of blocks in the game.
 
         """
         super().__init__()
-        self.player = player
-        self.blocks = blocks
 
         #sprite setup
-        self.image = pygame.image.load('PNG/58-Breakout-Tiles.png').convert_alpha()
-        self.image = pygame.transform.rotozoom(self.image, 0, Ball_Scale).convert_alpha()
-        self.rect = self.image.get_rect(midbottom = self.player.rect.midtop)
+        self.image = tiles.get(58, Ball_Scale)
+        self.rect = self.image.get_rect()
+
+        self.swept = Swept_Collision
+        self.center = pygame.Vector2()
+        self.balls = None
+        self.near_blocks = True
+        self.near_paddle = True
+        self.reset(pos, player, blocks, vel)
+
+    def reset(self, pos, player, blocks, vel = [2, -2]):
+        """Set up the ball resting on the paddle, for a new or a reused pooled ball."""
+        self.player = player
+        self.blocks = blocks
+        self.rect.midbottom = self.player.rect.midtop
 
         self.pos = pos
-        self.velocity = vel
+        self.velocity = list(vel)
         self.active = False
+        self.center.update(self.rect.center)
+        self.last_rect = self.rect.copy()
+
+    def launch(self, center, vel):
+        """Put the ball in play centred on a point with a velocity."""
+        self.rect.center = (round(center[0]), round(center[1]))
+        self.center.update(center)
+        self.last_rect = self.rect.copy()
+        self.velocity = list(vel)
+        self.active = True
+
+    def lost(self):
+        """Drop the ball once it leaves the window, taking a heart only when it was the last one."""
+        if self.balls is not None and len(self.balls) > 1:
+            self.kill()
+        else:
+            self.player.hearts -= 1
+            self.ball_restart(self.pos)
+
+    def kill(self):
+        """Remove the ball from its groups and return it to its pool."""
+        pooled = self.pool is not None and self.alive()
+        super().kill()
+        if pooled:
+            self.pool.release(self)
 
     def ball_movement(self):
         if self.rect.bottom >= Height:
-            self.player.hearts -= 1
-            self.ball_restart(self.pos)
+            self.lost()
+            return
         if self.rect.top <= 0:
             self.velocity[1] *= -1
         if self.rect.left <= 0 or self.rect.right >= Width:
@@ -177,10 +242,12 @@ class Ball(pygame.sprite.Sprite):
         self.active = False
         self.velocity = [2, -2]
         self.rect.center = pos
+        self.center.update(self.rect.center)
+        self.last_rect = self.rect.copy()
 
     def collision(self):
         
-        overlap_sprites = pygame.sprite.spritecollide(self, self.blocks, False)
+        overlap_sprites = self.blocks.spritecollide(self)
         
         #player and ball collision
         if self.rect.colliderect(self.player.rect):
@@ -227,14 +294,147 @@ class Ball(pygame.sprite.Sprite):
                     if getattr(sprite,'health',None):
                         sprite.get_damage(Damage)
                 
+    def first_impact(self, delta):
+        """Return the earliest (time, normal, sprite) hit along a move, or None.
+
+        The side and top walls are hits with sprite None.
+
+        Args:
+            delta (tuple): The displacement of the ball centre over the move.
+
+        """
+        first = None
+        x, y = self.center
+        walls = []
+        if delta[0] < 0:
+            walls.append(((Ball_Radius - x) / delta[0], (1, 0)))
+        if delta[0] > 0:
+            walls.append(((Width - Ball_Radius - x) / delta[0], (-1, 0)))
+        if delta[1] < 0:
+            walls.append(((Ball_Radius - y) / delta[1], (0, 1)))
+        for time, normal in walls:
+            if time <= 1 and (first is None or time < first[0]):
+                first = (max(time, 0.0), normal, None)
+
+        candidates = [self.player] if self.near_paddle else []
+        if self.near_blocks:
+            path = pygame.Rect(0, 0, 2 * Ball_Radius, 2 * Ball_Radius)
+            path.center = (round(x), round(y))
+            path.union_ip(path.move(round(delta[0]), round(delta[1])))
+            candidates = self.blocks.collide(path.inflate(4, 4)) + candidates
+        for sprite in candidates:
+            hit = sweep_circle_aabb(self.center, delta, Ball_Radius, sprite.rect)
+            if hit and (first is None or hit[0] < first[0]):
+                first = (hit[0], hit[1], sprite)
+        return first
+
+    def sweep(self):
+        """Move the ball with swept collisions, so fast balls cannot tunnel through blocks."""
+        remaining = 1.0
+        for _ in range(4):
+            delta = (self.velocity[0] * remaining, self.velocity[1] * remaining)
+            hit = self.first_impact(delta)
+            if hit is None:
+                self.center += delta
+                break
+
+            time, normal, sprite = hit
+            self.center += (delta[0] * time, delta[1] * time)
+            if normal[0]:
+                self.velocity[0] = abs(self.velocity[0]) * normal[0]
+            if normal[1]:
+                self.velocity[1] = abs(self.velocity[1]) * normal[1]
+            if getattr(sprite,'health',None):
+                sprite.get_damage(Damage)
+            remaining *= 1 - time
+
+        self.rect.center = (round(self.center.x), round(self.center.y))
+        if self.rect.bottom >= Height:
+            self.lost()
+
+    def render_rect(self, alpha):
+        """Return the rect to draw a fraction alpha of the way through the last update."""
+        return lerp_rect(self.last_rect, self.rect, alpha)
+
     def update(self) -> None:
-        if self.active:
+        self.last_rect = self.rect.copy()
+        if self.active and self.swept:
+            self.sweep()
+        elif self.active:
             self.rect.x += self.velocity[0]
             self.rect.y += self.velocity[1]
             self.ball_movement()
             self.collision()
         else:
             self.rect.midbottom = self.player.rect.midtop
+            self.center.update(self.rect.center)
+
+class BallGroup(pygame.sprite.Group):
+    """The balls in play.
+
+    The first ball is the one served from the paddle and is the group's
+    sprite, like a GroupSingle. Balls that fall out of the window leave the
+    group until only one is left, and that one costs a heart instead.
+
+    update() runs a broad phase for all balls at once before moving them:
+    every ball's reach for the frame is tested against the bounds of the
+    block field and the paddle in two collidelistall calls, and balls out of
+    reach skip the block query or the paddle sweep.
+
+    Methods:
+        sprite: The first ball in the group.
+        update(): Move every ball after a batched broad phase.
+
+    """
+
+    @property
+    def sprite(self):
+        """The first ball in the group, None when it is empty."""
+        return next(iter(self.spritedict), None)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        sprite.balls = self
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        sprite.balls = None
+
+    def update(self):
+        """Move every ball, testing block and paddle reach for all of them in one pass."""
+        balls = self.sprites()
+        if len(balls) > 1:
+            #a ball moves at most one velocity per frame, whatever it bounces off
+            reach = []
+            for ball in balls:
+                step = 2 * max(abs(ball.velocity[0]), abs(ball.velocity[1])) + 4
+                reach.append(ball.rect.inflate(step, step))
+            ball = balls[0]
+            near_blocks = set(ball.blocks.bounds().collidelistall(reach))
+            near_paddle = set(ball.player.rect.collidelistall(reach))
+            for i, ball in enumerate(balls):
+                ball.near_blocks = i in near_blocks
+                ball.near_paddle = i in near_paddle
+        else:
+            for ball in balls:
+                ball.near_blocks = ball.near_paddle = True
+        for ball in balls:
+            ball.update()
+
+def roll_drop(rng=random, drop_prob=Drop_prob, drops=None):
+    """Return the upgrade type a new block drops, or None.
+
+    Args:
+        rng (Random, optional): Random generator for the drop. Defaults to the random module.
+        drop_prob (int, optional): A drop happens when randint(0, 10) is above it. Defaults to Drop_prob.
+        drops (dict, optional): Upgrade type weights. Defaults to None for an even choice of Default_Drops.
+
+    """
+    if rng.randint(0,10) > drop_prob:
+        if drops is None:
+            return rng.choice(Default_Drops)
+        return rng.choices(list(drops), list(drops.values()))[0]
+    return None
 
 class Block(pygame.sprite.Sprite):
     """A class representing a block in the game.
@@ -245,6 +445,7 @@ class Block(pygame.sprite.Sprite):
         type (int): The type of the block.
         health (int): The health or durability of the block.
         drop (bool): Indicates whether the blocks contains upgrade drop.
+        drop_type (str): The upgrade type dropped by the block, rolled together with drop.
         create_upgrade (function) : A function passed from main file to create upgrade/drop animation.
 
     Methods:
@@ -252,28 +453,34 @@ class Block(pygame.sprite.Sprite):
         check_drop(): Create a drop for a block with 0.3 probability.
 
     """
-    def __init__(self, num, pos_x, pos_y, groups, create_up):
+    def __init__(self, num, pos_x, pos_y, groups, create_up, rng=random, drop_prob=Drop_prob, drops=None):
         """Initialize the Block object.
 
         Args:
             pos (tuple): The initial position of the block (x, y).
             block_type (int): The type of the block.
             create_up (function): create_upgrade function.
+            rng (Random, optional): Random generator for the drop. Defaults to the random module.
+            drop_prob (int, optional): Drop threshold of the level. Defaults to Drop_prob.
+            drops (dict, optional): Upgrade type weights of the level. Defaults to None for an even choice.
 
         """
-        super().__init__(groups)
+        super().__init__()
 
         self.type = 2*num
         self.health = (num) * 100 
         
 
         #sprite setup
-        self.image = pygame.image.load('PNG/'+ Block_Type[self.type] + '-Breakout-Tiles.png').convert_alpha()
-        self.image = pygame.transform.rotozoom(self.image, 0, Scale_Fac).convert_alpha()
+        self.image = tiles.get(Block_Type[self.type], Scale_Fac)
         self.rect = self.image.get_rect(topleft = (pos_x, pos_y))
 
+        #join groups once the rect exists so a BlockGroup can index it
+        self.add(groups)
+
         self.drop = False
-        self.check_drop()
+        self.drop_type = None
+        self.check_drop(rng, drop_prob, drops)
 
         #player upgrade
         self.create_upgrade = create_up
@@ -284,18 +491,20 @@ class Block(pygame.sprite.Sprite):
 
         if self.health > 0:
             self.type -= 1
-            #update block
-            self.image = pygame.image.load('PNG/'+ Block_Type[self.type] + '-Breakout-Tiles.png').convert_alpha()
-            self.image = pygame.transform.rotozoom(self.image, 0, Scale_Fac).convert_alpha()
+            #update block, damage states are shared surfaces from the texture cache
+            self.image = tiles.get(Block_Type[self.type], Scale_Fac)
+            for group in self.groups():
+                if hasattr(group, 'touch'):
+                    group.touch(self)
         else:
             if self.drop:
-                self.create_upgrade(self.rect.midbottom, random.choice(['slow','fast','laser','heart']))
+                self.create_upgrade(self.rect.midbottom, self.drop_type)
             self.kill()
 
-    def check_drop(self):
+    def check_drop(self, rng=random, drop_prob=Drop_prob, drops=None):
         """Check the drop inside block"""
-        if random.randint(0,10) > Drop_prob:
-            self.drop = True
+        self.drop_type = roll_drop(rng, drop_prob, drops)
+        self.drop = self.drop_type is not None
     
 class Laser(pygame.sprite.Sprite):
     """A class representing lasers in the game.
@@ -304,34 +513,51 @@ class Laser(pygame.sprite.Sprite):
         image (Surface): The image representing the laser.
         rect (Rect): The rectangular area occupied by the laser.
         speed (int): The speed at which the laser moves.
-        blocks (Group): The group of blocks in the game.
+        blocks (BlockGroup): The spatially indexed group of blocks in the game.
+        pool (SpritePool): The pool the laser returns to when killed, None if not pooled.
 
     Methods:
+        reset(ply_rect, blocks): Places the laser for a new shot.
+        kill(): Removes the laser and returns it to its pool.
         update(): Updates the laser's position and handles collisions.
         collision(): Checks for collision and handles collision with a block.
 
     """
+    pool = None
+
     def __init__(self, ply_rect : pygame.Rect, blocks) -> None:
         """Initialize the Laser object.
 
         Args:
             player_rect (Rect): The rectangular area occupied by the player.
-            blocks (Group): The group of blocks in the game.
+            blocks (BlockGroup): The spatially indexed group of blocks in the game.
 
         """
         super().__init__()
 
         #sprite setup
-        self.image = pygame.image.load('PNG/61-Breakout-Tiles.png').convert_alpha()
+        self.image = tiles.get(61)
         #self.image = pygame.transform.rotozoom(self.image, 0, 5*Scale_Fac)
-        self.rect = self.image.get_rect(midbottom = ply_rect.midtop)
+        self.rect = self.image.get_rect()
 
         self.speed = 2
+        self.reset(ply_rect, blocks)
+
+    def reset(self, ply_rect, blocks):
+        """Place the laser above the player, for a new or a reused pooled laser."""
+        self.rect.midbottom = ply_rect.midtop
         self.blocks = blocks
+
+    def kill(self):
+        """Remove the laser from its groups and return it to its pool."""
+        pooled = self.pool is not None and self.alive()
+        super().kill()
+        if pooled:
+            self.pool.release(self)
        
     def collision(self):
         """Checks for collision and handles collision with a block."""
-        overlap_sprites = pygame.sprite.spritecollide(self, self.blocks, False)
+        overlap_sprites = self.blocks.spritecollide(self)
         if overlap_sprites:
             self.kill()
             for sprite in overlap_sprites:
@@ -340,7 +566,11 @@ class Laser(pygame.sprite.Sprite):
     def update(self):
         """Update the laser's position and handle collisions."""
         self.rect.y -= self.speed
-        self.collision()
+        #cull as soon as the laser is above the window
+        if self.rect.bottom < 0:
+            self.kill()
+        else:
+            self.collision()
 
 class Upgrade(pygame.sprite.Sprite):
     """A class representing upgrades in the game.
@@ -350,11 +580,16 @@ class Upgrade(pygame.sprite.Sprite):
         rect (Rect): The rectangular area occupied by the upgrade.
         up_type (str): The type of upgrade.
         speed (int): The speed at which the upgrade moves.
+        pool (SpritePool): The pool the upgrade returns to when killed, None if not pooled.
 
     Methods:
+        reset(pos, up_type, groups): Sets up the upgrade for a new drop.
+        kill(): Removes the upgrade and returns it to its pool.
         update(): Updates the upgrade's position.
 
     """
+    pool = None
+
     def __init__(self, pos, up_type, groups) -> None:
         """Initialize the Upgrade object.
 
@@ -363,15 +598,27 @@ class Upgrade(pygame.sprite.Sprite):
             up_type (str): The type of upgrade.
 
         """
-        super().__init__(groups)
+        super().__init__()
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.speed = 3
+        self.reset(pos, up_type, groups)
+
+    def reset(self, pos, up_type, groups):
+        """Set up the upgrade for a new drop, for a new or a reused pooled upgrade."""
         self.up_type = up_type
 
         #sprite setup
-        self.image = pygame.image.load(f'PNG/{Upgrade_Type[up_type]}-Breakout-Tiles.png').convert_alpha()
-        self.image = pygame.transform.rotozoom(self.image, 0, Upgrade_Scale).convert_alpha()
-        self.rect = self.image.get_rect(midtop = pos)
-
-        self.speed = 3
+        self.image = tiles.get(Upgrade_Type[up_type], Upgrade_Scale)
+        self.rect.size = self.image.get_size()
+        self.rect.midtop = pos
+        self.add(groups)
+
+    def kill(self):
+        """Remove the upgrade from its groups and return it to its pool."""
+        pooled = self.pool is not None and self.alive()
+        super().kill()
+        if pooled:
+            self.pool.release(self)
 
     def update(self):
         """Update the upgrade's position."""
@@ -0,0 +1,322 @@
+"""Gym-style environment API for training paddle agents.
+
+BreakoutEnv wraps a headless Game with reset(seed) and step(action) and
+returns compact observations instead of screen pixels. ParallelEnv steps
+many environments in worker processes; observations, rewards and done
+flags are written into shared memory, so only a short command travels
+through the pipes each step.
+
+Actions are 0 (stay), 1 (left) and 2 (right); the ball is served
+automatically. The observation is a float32 vector: the OBS_FIELDS below
+(positions scaled to the window, velocities in pixels per frame) followed
+by the block grid row by row, each cell holding the remaining health of its
+block in tiers (health / 100, 0 for no block). The reward is the block
+health destroyed in tiers plus the change in hearts, and an episode is done
+when the hearts run out or the last block is gone, like the main loop.
+
+Usage:
+    python env.py bench [envs] [max_workers]
+
+Requires NumPy.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys
+import time
+import random
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from settings import *
+
+ACTIONS = (0, -1, 1)
+OBS_FIELDS = ('paddle_x', 'ball_x', 'ball_y', 'ball_vx', 'ball_vy', 'ball_active', 'balls',
+              'hearts', 'paddle_speed', 'lasers', 'laser_on', 'upgrades_falling')
+
+class BreakoutEnv:
+    """A single headless Breakout game behind reset() and step().
+
+    Attributes:
+        level (Level): The level played, None for the built-in board.
+        balls (int): Balls served at once.
+        frame_skip (int): Frames simulated per step with the same action.
+        max_steps (int): Steps before an episode is cut short.
+        game (Game): The game of the current episode.
+        rows, cols (int): The size of the block grid in the observation.
+        obs_size (int): The length of an observation.
+        steps (int): Steps taken in the current episode.
+
+    Methods:
+        reset(seed): Start a new episode and return its first observation.
+        step(action): Advance the game and return (obs, reward, done, info).
+        observe(): Return the observation of the current state.
+
+    """
+
+    def __init__(self, level=None, balls=1, frame_skip=1, max_steps=60 * 60 * 10, seed=None):
+        """Initialize the BreakoutEnv object.
+
+        Args:
+            level (Level, optional): The level to play. Defaults to None for the built-in board.
+            balls (int, optional): Balls served at once. Defaults to 1.
+            frame_skip (int, optional): Frames simulated per step. Defaults to 1.
+            max_steps (int, optional): Steps before an episode is cut short. Defaults to ten minutes of frames.
+            seed (int, optional): Seed for the boards of episodes reset without a seed. Defaults to None.
+
+        """
+        self.level = level
+        self.balls = balls
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.rng = random.Random(seed)
+        grid = level.grid if level else Shape
+        self.rows, self.cols = len(grid), len(grid[0])
+        self.obs_size = len(OBS_FIELDS) + self.rows * self.cols
+        self.game = None
+        self.steps = 0
+
+    def reset(self, seed=None):
+        """Start a new episode and return its first observation.
+
+        Args:
+            seed (int, optional): Seed of the board and drops. Drawn from the env seed when None.
+
+        """
+        from main import Game
+        if seed is None:
+            seed = self.rng.randrange(2**32)
+        self.game = Game(headless=True, seed=seed, level=self.level, balls=self.balls)
+        self.steps = 0
+        self._grid = np.zeros(self.rows * self.cols, np.float32)
+        self._cells = self._block_cells()
+        self._health = self._block_health()
+        self._hearts = self.game.player.sprite.hearts
+        self._return = 0.0
+        return self.observe()
+
+    def _block_cells(self):
+        """Return the flat grid cell of every block, in block order."""
+        cell_w = Block_Size[0] + Block_Offset
+        cell_h = Block_Size[1] + Block_Offset
+        blocks = self.game.block_grp
+        if hasattr(blocks, 'alive'):
+            #BlockField: the arrays are read in place, dead blocks included
+            x, y = np.frombuffer(blocks.x, np.int32), np.frombuffer(blocks.y, np.int32)
+        else:
+            self._sprites = blocks.sprites()
+            x = np.array([block.rect.x for block in self._sprites])
+            y = np.array([block.rect.y for block in self._sprites])
+        cols = np.rint(x / cell_w).astype(np.intp)
+        rows = np.rint((y - Top_Offset) / cell_h).astype(np.intp)
+        return rows * self.cols + cols
+
+    def _block_health(self):
+        """Return the remaining health of every block, 0 once it is destroyed."""
+        blocks = self.game.block_grp
+        if hasattr(blocks, 'alive'):
+            health = np.frombuffer(blocks.health, np.int32)
+            return np.maximum(health, 0) * np.frombuffer(blocks.alive, np.uint8)
+        return np.array([max(block.health, 0) if block.alive() else 0 for block in self._sprites])
+
+    def observe(self):
+        """Return the observation of the current state as a float32 vector."""
+        game = self.game
+        player, ball = game.player.sprite, game.ball.sprite
+        head = (player.rect.centerx / Width, ball.rect.centerx / Width, ball.rect.centery / Height,
+                ball.velocity[0], ball.velocity[1], ball.active, len(game.ball),
+                player.hearts, player.speed, player.no_lasers if player.start_laser else 0,
+                player.start_laser, len(game.upgrade_sprites))
+        self._grid[:] = 0
+        self._grid[self._cells] = self._health / 100
+        return np.concatenate((np.array(head, np.float32), self._grid))
+
+    def step(self, action):
+        """Advance the game by frame_skip frames with one action.
+
+        Args:
+            action (int): 0 to stay, 1 to move left, 2 to move right.
+
+        Returns:
+            tuple: (observation, reward, done, info), info holding the result, the episode
+            return and length once done and 'truncated' when max_steps cut the episode.
+
+        """
+        from headless import game_state
+        game = self.game
+        for _ in range(self.frame_skip):
+            game.serve()
+            game.update(ACTIONS[action])
+            if game_state(game) != 'running':
+                break
+        self.steps += 1
+
+        health = self._block_health()
+        hearts = game.player.sprite.hearts
+        reward = float(self._health.sum() - health.sum()) / 100 + hearts - self._hearts
+        self._health, self._hearts = health, hearts
+        self._return += reward
+
+        result = game_state(game)
+        done = result != 'running' or self.steps >= self.max_steps
+        info = {}
+        if done:
+            info = {'result': result, 'return': self._return, 'length': self.steps,
+                    'truncated': result == 'running'}
+        return self.observe(), reward, done, info
+
+def _worker(name, n, obs_size, start, stop, seed, env_kwargs, conn):
+    """Run envs start..stop of a ParallelEnv, writing into its shared memory."""
+    memory = shared_memory.SharedMemory(name=name)
+    obs, rewards, dones, actions = _views(memory.buf, n, obs_size)
+    envs = [BreakoutEnv(**env_kwargs, seed=None if seed is None else seed + i) for i in range(start, stop)]
+    try:
+        while True:
+            command, arg = conn.recv()
+            if command == 'reset':
+                for i, env in enumerate(envs, start):
+                    obs[i] = env.reset(None if arg is None else arg[i])
+                conn.send(None)
+            elif command == 'step':
+                finished = []
+                for i, env in enumerate(envs, start):
+                    obs[i], rewards[i], dones[i], info = env.step(actions[i])
+                    if dones[i]:
+                        #the next episode starts at once, its first observation replaces the last one
+                        finished.append(info)
+                        obs[i] = env.reset()
+                conn.send(finished)
+            else:
+                break
+    finally:
+        del obs, rewards, dones, actions
+        memory.close()
+        conn.close()
+
+def _views(buffer, n, obs_size):
+    """Return the (obs, rewards, dones, actions) arrays laid out in a shared buffer."""
+    obs = np.ndarray((n, obs_size), np.float32, buffer)
+    rewards = np.ndarray(n, np.float32, buffer, offset=obs.nbytes)
+    dones = np.ndarray(n, np.bool_, buffer, offset=obs.nbytes + rewards.nbytes)
+    actions = np.ndarray(n, np.int8, buffer, offset=obs.nbytes + rewards.nbytes + n)
+    return obs, rewards, dones, actions
+
+class ParallelEnv:
+    """Many BreakoutEnvs stepped together in worker processes.
+
+    The envs are split into one contiguous slice per worker. Observations,
+    rewards, done flags and actions live in one shared memory block, so a
+    step only sends a command to each worker and waits for the replies.
+    Envs that finish an episode reset at once; step() reports the finished
+    episodes' info dicts.
+
+    Attributes:
+        n (int): The number of envs.
+        workers (int): The number of worker processes.
+        obs_size (int): The length of an observation.
+        obs (ndarray): Observations, shape (n, obs_size), shared with the workers.
+        rewards (ndarray): Rewards of the last step.
+        dones (ndarray): Done flags of the last step.
+
+    Methods:
+        reset(seeds): Reset every env and return the observations.
+        step(actions): Step every env and return (obs, rewards, dones, finished).
+        close(): Stop the workers and free the shared memory.
+
+    """
+
+    def __init__(self, n, workers=None, seed=None, **env_kwargs):
+        """Initialize the ParallelEnv object.
+
+        Args:
+            n (int): The number of envs.
+            workers (int, optional): Worker processes. Defaults to the number of CPUs.
+            seed (int, optional): Env i draws its episode seeds from seed + i. Defaults to None.
+            **env_kwargs: Passed to every BreakoutEnv.
+
+        """
+        self.n = n
+        self.workers = max(1, min(workers or os.cpu_count() or 1, n))
+        self.obs_size = BreakoutEnv(**env_kwargs).obs_size
+        self._memory = shared_memory.SharedMemory(create=True, size=n * (4 * self.obs_size + 4 + 2))
+        self.obs, self.rewards, self.dones, self._actions = _views(self._memory.buf, n, self.obs_size)
+
+        bounds = np.linspace(0, n, self.workers + 1).astype(int)
+        self._pipes = []
+        self._processes = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            parent, child = mp.Pipe()
+            process = mp.Process(target=_worker, daemon=True,
+                                 args=(self._memory.name, n, self.obs_size, start, stop, seed, env_kwargs, child))
+            process.start()
+            child.close()
+            self._pipes.append(parent)
+            self._processes.append(process)
+
+    def _call(self, command, arg=None):
+        """Send a command to every worker and return their replies."""
+        for pipe in self._pipes:
+            pipe.send((command, arg))
+        return [pipe.recv() for pipe in self._pipes]
+
+    def reset(self, seeds=None):
+        """Reset every env, with seeds[i] for env i when given, and return the observations."""
+        self._call('reset', seeds)
+        return self.obs
+
+    def step(self, actions):
+        """Step every env with actions[i] for env i.
+
+        Returns:
+            tuple: (obs, rewards, dones, finished). The arrays are shared and overwritten by the
+            next step; finished lists the info dicts of the episodes that ended.
+
+        """
+        self._actions[:] = actions
+        finished = self._call('step')
+        return self.obs, self.rewards, self.dones, [info for infos in finished for info in infos]
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+        try:
+            for pipe in self._pipes:
+                pipe.send(('close', None))
+        except BrokenPipeError:
+            pass
+        for process in self._processes:
+            process.join()
+        del self.obs, self.rewards, self.dones, self._actions
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def track_ball(obs):
+    """Policy that moves every paddle towards its ball, from a batch of observations."""
+    offset = obs[:, OBS_FIELDS.index('ball_x')] - obs[:, OBS_FIELDS.index('paddle_x')]
+    return np.where(offset > 4 / Width, 2, np.where(offset < -4 / Width, 1, 0))
+
+def bench(envs, max_workers, steps=2000):
+    """Print env steps per second for 1 to max_workers worker processes."""
+    base = None
+    workers = 1
+    while workers <= max_workers:
+        with ParallelEnv(envs, workers=workers, seed=0) as env:
+            obs = env.reset()
+            start = time.perf_counter()
+            for _ in range(steps):
+                obs, rewards, dones, finished = env.step(track_ball(obs))
+            rate = envs * steps / (time.perf_counter() - start)
+        base = base or rate
+        print(f'{workers:3d} workers: {rate:10.0f} env steps/s, {rate / base:5.2f}x')
+        workers *= 2
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'bench'
+    if command == 'bench':
+        envs = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+        bench(envs, int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1)
\ No newline at end of file
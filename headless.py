@@ -0,0 +1,107 @@
+"""Headless simulation of the Breakout game.
+
+Runs the game logic without a window, blitting or frame limiter, with paddle
+input coming from a policy instead of the keyboard.
+
+Usage:
+    python headless.py [games] [max_frames]
+"""
+import sys
+import time
+from settings import *
+from main import Game
+
+def track_ball(game):
+    """Policy that moves the paddle towards the lowest falling ball, or the first ball."""
+    falling = [ball for ball in game.ball if ball.active and ball.velocity[1] > 0]
+    ball = max(falling, key=lambda ball: ball.rect.bottom) if falling else game.ball.sprite
+    ball_x = ball.rect.centerx
+    paddle_x = game.player.sprite.rect.centerx
+    if ball_x > paddle_x + 4:
+        return 1
+    if ball_x < paddle_x - 4:
+        return -1
+    return 0
+
+class ScriptedInput:
+    """A policy that replays a fixed list of paddle directions.
+
+    Attributes:
+        actions (list): Paddle directions (-1, 0 or 1), one per frame.
+        default (int): Direction used once the script runs out.
+
+    """
+
+    def __init__(self, actions, default=0):
+        """Initialize the ScriptedInput object.
+
+        Args:
+            actions (iterable): Paddle directions, one per frame.
+            default (int, optional): Direction once the script runs out. Defaults to 0.
+
+        """
+        self.actions = list(actions)
+        self.default = default
+
+    def __call__(self, game):
+        """Return the direction for the frame the game is about to simulate."""
+        if game.frame < len(self.actions):
+            return self.actions[game.frame]
+        return self.default
+
+def game_state(game):
+    """Return 'won', 'lost' or 'running' using the checks of the main loop."""
+    if game.player.sprite.hearts == 0:
+        return 'lost'
+    if len(game.block_grp) == 0:
+        return 'won'
+    return 'running'
+
+def simulate(policy=track_ball, max_frames=60 * 60 * 10, auto_serve=True, game=None, seed=None):
+    """Play one game headless as fast as the CPU allows.
+
+    Args:
+        policy (function, optional): Called with the game every frame, returns the paddle direction.
+        max_frames (int, optional): Frame limit for the game. Defaults to ten simulated minutes.
+        auto_serve (bool, optional): Launch the ball whenever it rests on the paddle, like pressing space.
+        game (Game, optional): A headless game to continue. A new one is created when None.
+        seed (int, optional): Seed for the board of a new game, for reproducible runs.
+
+    Returns:
+        dict: The result, frames simulated, wall time and simulated frames per second.
+
+    """
+    if game is None:
+        game = Game(headless=True, seed=seed)
+
+    start = time.perf_counter()
+    frames = 0
+    while frames < max_frames and game_state(game) == 'running':
+        if auto_serve:
+            game.serve()
+        game.run(policy(game))
+        frames += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        'result': game_state(game),
+        'frames': frames,
+        'blocks': len(game.block_grp),
+        'hearts': game.player.sprite.hearts,
+        'seconds': elapsed,
+        'fps': frames / elapsed if elapsed else float('inf'),
+    }
+
+if __name__ == '__main__':
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    max_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 60 * 60 * 10
+
+    total_frames = 0
+    total_seconds = 0
+    for i in range(games):
+        stats = simulate(max_frames=max_frames)
+        total_frames += stats['frames']
+        total_seconds += stats['seconds']
+        print(f"game {i}: {stats['result']:<7} frames={stats['frames']:<7} blocks={stats['blocks']:<4} "
+              f"hearts={stats['hearts']} fps={stats['fps']:.0f}")
+    print(f'simulated {total_frames} frames at {total_frames / total_seconds:.0f} fps')
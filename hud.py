@@ -0,0 +1,220 @@
+"""The status line: score, lasers, laser cooldown, paddle speed and upgrades.
+
+font.render is slow and allocates a new surface every call, so nothing here
+renders text per frame. Numbers are composed from a GlyphAtlas, one surface
+holding every digit and sign rendered once, and labels and upgrade names
+come from a TextCache of strings rendered once per value. HUD.update() reads
+the values every frame but recomposes its surface only when one of them
+changed, and the renderers blit that surface, repainting the region around
+it only then in dirty mode.
+
+The line is composed into a transparent surface with premultiplied alpha
+(glyphs blitted onto zeroed pixels), so it is drawn with BLEND_PREMULTIPLIED
+and the antialiased edges keep their full brightness.
+
+Usage:
+    python benchmark.py hud
+"""
+import pygame
+from settings import *
+
+GLYPHS = '0123456789.-x/s'
+
+class GlyphAtlas:
+    """Characters of a font rendered once into a single surface.
+
+    Attributes:
+        surface (Surface): Every glyph side by side.
+        areas (dict): The area of every character in the surface.
+        height (int): The line height.
+
+    Methods:
+        width(text): Return the width of a string of atlas characters.
+        blits(text, x, y): Return the blit sequence that draws a string.
+
+    """
+
+    def __init__(self, font, color, chars=GLYPHS):
+        """Initialize the GlyphAtlas object.
+
+        Args:
+            font (Font): The font to render with.
+            color (tuple): The text color.
+            chars (str, optional): The characters in the atlas. Defaults to GLYPHS.
+
+        """
+        glyphs = [font.render(char, True, color) for char in chars]
+        self.height = font.get_linesize()
+        self.surface = pygame.Surface((sum(glyph.get_width() for glyph in glyphs), self.height), pygame.SRCALPHA)
+        self.areas = {}
+        x = 0
+        for char, glyph in zip(chars, glyphs):
+            self.surface.blit(glyph, (x, 0))
+            self.areas[char] = pygame.Rect(x, 0, glyph.get_width(), self.height)
+            x += glyph.get_width()
+
+    def width(self, text):
+        """Return the width of a string of atlas characters."""
+        return sum(self.areas[char].width for char in text)
+
+    def blits(self, text, x, y):
+        """Return (surface, position, area) triples that draw a string at x, y."""
+        sequence = []
+        for char in text:
+            area = self.areas[char]
+            sequence.append((self.surface, (x, y), area))
+            x += area.width
+        return sequence
+
+class TextCache:
+    """Strings rendered once and kept by value.
+
+    Attributes:
+        font (Font): The font to render with.
+        color (tuple): The text color.
+        size (int): The most strings kept; the cache starts over when it is full.
+        surfaces (dict): The rendered surface per string.
+
+    Methods:
+        get(text): Return the surface of a string, rendering it the first time.
+
+    """
+
+    def __init__(self, font, color, size=64):
+        """Initialize the TextCache object.
+
+        Args:
+            font (Font): The font to render with.
+            color (tuple): The text color.
+            size (int, optional): The most strings kept. Defaults to 64.
+
+        """
+        self.font = font
+        self.color = color
+        self.size = size
+        self.surfaces = {}
+
+    def get(self, text):
+        """Return the surface of a string, rendering it the first time it is asked for."""
+        surface = self.surfaces.get(text)
+        if surface is None:
+            if len(self.surfaces) >= self.size:
+                self.surfaces.clear()
+            surface = self.surfaces[text] = self.font.render(text, True, self.color)
+        return surface
+
+class HUD:
+    """The status line in the top right corner of the window.
+
+    Attributes:
+        game (Game): The game shown.
+        rect (Rect): Where the line is drawn.
+        surface (Surface): The composed line, premultiplied alpha.
+        area (Rect): The part of the surface the line uses.
+        values (tuple): The values the surface shows.
+        score (int): The score, read again only when the blocks' revision moved.
+        damaged (Rect): The region to repaint because the line changed, None when it did not.
+        composed (int): The number of times the line was composed.
+
+    Methods:
+        read(): Return the current values.
+        update(): Recompose the line if a value changed.
+        draw(surface): Blit the line and return its rect.
+
+    """
+
+    def __init__(self, game, size=Hud_Font_Size, color=Hud_Color):
+        """Initialize the HUD object.
+
+        Args:
+            game (Game): The game to show.
+            size (int, optional): The font size. Defaults to Hud_Font_Size.
+            color (tuple, optional): The text color. Defaults to Hud_Color.
+
+        """
+        self.game = game
+        font = pygame.font.SysFont(None, size)
+        self.atlas = GlyphAtlas(font, color)
+        self.text = TextCache(font, color)
+        self.gap = font.size('  ')[0]
+        self.rect = pygame.Rect(0, 0, Width // 2, self.atlas.height)
+        self.rect.topright = (Width - 5, 3)
+        self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        self.area = pygame.Rect(self.rect.width, 0, 0, self.rect.height)
+        self.base_speed = game.player.sprite.speed
+        self.values = None
+        self.score = 0
+        self.revision = None
+        self.damaged = None
+        self.composed = 0
+
+    def read(self):
+        """Return (score, lasers, cooldown, speed, upgrades) of the game now."""
+        game = self.game
+        player = game.player.sprite
+        #the score only moves when the blocks change, whether or not the line was updated meanwhile
+        if game.block_grp.revision != self.revision:
+            self.revision = game.block_grp.revision
+            self.score = game.score()
+        lasers = player.no_lasers if player.start_laser else None
+        cooldown = None
+        if player.start_laser and not player.ready and player.no_lasers > 0:
+            #tenths of a second left, rounded up
+            cooldown = -(-(player.laser_cooldown - (game.ticks() - player.laser_time)) // 100)
+        upgrades = []
+        if player.start_laser:
+            upgrades.append('LASER')
+        if player.speed != self.base_speed:
+            upgrades.append('FAST' if player.speed > self.base_speed else 'SLOW')
+        if len(game.ball) > 1:
+            upgrades.append(f'MULTI x{len(game.ball)}')
+        return self.score, lasers, cooldown, player.speed, tuple(upgrades)
+
+    def update(self):
+        """Recompose the line if one of its values changed.
+
+        Returns:
+            bool: True if the line changed; damaged then holds the region to repaint.
+
+        """
+        values = self.read()
+        if values == self.values:
+            return False
+        self.values = values
+        self.compose()
+        self.damaged = self.rect.copy()
+        return True
+
+    def compose(self):
+        """Lay out the fields right-aligned from cached labels and atlas glyphs."""
+        score, lasers, cooldown, speed, upgrades = self.values
+        fields = [('SCORE ', str(score)), ('SPEED ', str(speed))]
+        if lasers is not None:
+            fields.append(('LASERS ', str(lasers)))
+        if lasers:
+            fields.append(('COOLDOWN ', f'{cooldown // 10}.{cooldown % 10}s' if cooldown else None))
+        parts = []
+        for label, number in fields:
+            parts.append(self.text.get(label))
+            parts.append(number if number is not None else self.text.get('READY'))
+        parts += [self.text.get(upgrade) for upgrade in upgrades]
+
+        widths = [self.atlas.width(part) if isinstance(part, str) else part.get_width() for part in parts]
+        x = self.rect.width - sum(widths) - self.gap * (len(upgrades) + len(fields) - 1)
+        self.area.update(x, 0, self.rect.width - x, self.rect.height)
+        sequence = []
+        for i, (part, width) in enumerate(zip(parts, widths)):
+            if isinstance(part, str):
+                sequence += self.atlas.blits(part, x, 0)
+            else:
+                sequence.append((part, (x, 0)))
+            #a gap after every number and upgrade, none between a label and its number
+            x += width + (self.gap if i % 2 or i >= 2 * len(fields) else 0)
+        self.surface.fill((0, 0, 0, 0))
+        self.surface.blits(sequence, doreturn=False)
+        self.composed += 1
+
+    def draw(self, surface):
+        """Blit the composed line and return its rect."""
+        return surface.blit(self.surface, self.rect.move(self.area.x, 0), self.area,
+                            special_flags=pygame.BLEND_PREMULTIPLIED)
\ No newline at end of file
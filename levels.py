@@ -0,0 +1,298 @@
+"""Level files and level packs for the Breakout game.
+
+Levels are written by hand as text files:
+
+    # comments start with a hash
+    name: Pyramid
+    drop_prob: 7
+    drops: slow=1 fast=1 laser=2 heart=1
+    grid:
+    . . . . 5 5 . . . .
+    . . . 4 4 4 4 . . .
+    . . 3 3 3 3 3 3 . .
+
+Each grid cell is a block tier from 1 to 10 (the blocks_setup tiers of
+Block_Type) or '.' for an empty cell. A block drops an upgrade when
+randint(0, 10) > drop_prob; drops weights the upgrade types and defaults to
+an even choice of Default_Drops, so multi balls only drop where a level asks
+for them. compile validates text levels and packs them into one binary
+file, which LevelPack memory-maps and decodes one level at a time, so
+opening a large pack only reads its index.
+
+Usage:
+    python levels.py compile levels.brkpack levels/*.lvl
+    python levels.py info levels.brkpack
+    python main.py --level levels/pyramid.lvl
+    python main.py --level levels.brkpack:2
+"""
+import sys
+import mmap
+import struct
+from settings import *
+
+MAGIC = b'BRKPAK'
+VERSION = 2
+HEADER = struct.Struct('<6sBI')
+ENTRY = struct.Struct('<II')
+LEVEL = struct.Struct(f'<HHBB{len(Upgrade_Type)}B')
+UPGRADES = list(Upgrade_Type)
+MAX_TIER = max(Block_Type) // 2
+#the last column has to end inside the window
+MAX_COLS = int(round((Width + Block_Offset) / (Block_Size[0] + Block_Offset), 6))
+#the last row has to end above the ball resting on the paddle
+PADDLE_TOP = Paddle_Y - Block_Size[1] / 2
+MAX_ROWS = int(round((PADDLE_TOP - 2 * Ball_Radius - Top_Offset + Block_Offset) / (Block_Size[1] + Block_Offset), 6))
+
+class LevelError(ValueError):
+    """Raised when a level file or a level pack is invalid."""
+
+class Level:
+    """A block layout with its drop table.
+
+    Attributes:
+        name (str): The level name.
+        grid (list): Rows of block tiers, 0 for an empty cell.
+        drop_prob (int): A block drops an upgrade when randint(0, 10) is above it.
+        drops (dict): Upgrade type weights, None for an even choice.
+
+    Methods:
+        validate(): Check the level fits the game.
+        blocks(): Return the number of blocks.
+
+    """
+
+    def __init__(self, name, grid, drop_prob=Drop_prob, drops=None):
+        """Initialize the Level object.
+
+        Args:
+            name (str): The level name.
+            grid (list): Rows of block tiers, 0 for an empty cell.
+            drop_prob (int, optional): Drop threshold. Defaults to Drop_prob.
+            drops (dict, optional): Upgrade type weights. Defaults to None for an even choice.
+
+        """
+        self.name = name
+        self.grid = grid
+        self.drop_prob = drop_prob
+        self.drops = drops
+
+    def __repr__(self):
+        return f'Level({self.name!r}, {len(self.grid)}x{len(self.grid[0]) if self.grid else 0}, {self.blocks()} blocks)'
+
+    def blocks(self):
+        """Return the number of blocks in the level."""
+        return sum(1 for row in self.grid for tier in row if tier)
+
+    def validate(self):
+        """Raise LevelError unless the level can be played."""
+        if not self.grid or not self.blocks():
+            raise LevelError(f'{self.name}: the level has no blocks')
+        cols = len(self.grid[0])
+        if any(len(row) != cols for row in self.grid):
+            raise LevelError(f'{self.name}: every grid row needs the same number of cells')
+        if cols > MAX_COLS:
+            raise LevelError(f'{self.name}: {cols} columns, at most {MAX_COLS} fit in the window')
+        if len(self.grid) > MAX_ROWS:
+            raise LevelError(f'{self.name}: {len(self.grid)} rows, at most {MAX_ROWS} fit above the paddle')
+        if any(not 0 <= tier <= MAX_TIER for row in self.grid for tier in row):
+            raise LevelError(f'{self.name}: block tiers go from 1 to {MAX_TIER}')
+        if not 0 <= self.drop_prob <= 10:
+            raise LevelError(f'{self.name}: drop_prob goes from 0 to 10')
+        if self.drops is not None:
+            if set(self.drops) - set(UPGRADES):
+                raise LevelError(f'{self.name}: unknown upgrades {sorted(set(self.drops) - set(UPGRADES))}')
+            if not all(0 <= weight <= 255 for weight in self.drops.values()) or not any(self.drops.values()):
+                raise LevelError(f'{self.name}: drop weights go from 0 to 255 and one must be set')
+
+def parse_level(text, name='level'):
+    """Parse a hand-written level and return the validated Level.
+
+    Args:
+        text (str): The level file contents.
+        name (str, optional): The level name used until a name: line sets it. Defaults to 'level'.
+
+    """
+    fields = {}
+    grid = None
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        try:
+            if grid is not None:
+                grid.append([0 if cell == '.' else int(cell) for cell in line.split()])
+            elif line == 'grid:':
+                grid = []
+            else:
+                key, value = (part.strip() for part in line.split(':', 1))
+                fields[key] = value
+        except ValueError:
+            raise LevelError(f'{name}:{number}: cannot read {line!r}') from None
+
+    unknown = set(fields) - {'name', 'drop_prob', 'drops'}
+    if unknown:
+        raise LevelError(f'{name}: unknown fields {sorted(unknown)}')
+    drops = None
+    try:
+        if 'drops' in fields:
+            drops = {key: int(weight) for key, weight in (item.split('=') for item in fields['drops'].split())}
+        level = Level(fields.get('name', name), grid or [], int(fields.get('drop_prob', Drop_prob)), drops)
+    except ValueError:
+        raise LevelError(f'{name}: drop_prob and drops need whole numbers, as in drops: slow=1 laser=2') from None
+    level.validate()
+    return level
+
+def read_level(path):
+    """Read and validate a hand-written level file."""
+    with open(path) as file:
+        return parse_level(file.read(), path)
+
+def pack_level(level):
+    """Return the binary record of a level."""
+    name = level.name.encode()[:255]
+    weights = [level.drops.get(up_type, 0) for up_type in UPGRADES] if level.drops else [0] * len(UPGRADES)
+    cells = bytes(tier for row in level.grid for tier in row)
+    return LEVEL.pack(len(level.grid), len(level.grid[0]), level.drop_prob, len(name), *weights) + name + cells
+
+def compile_pack(path, levels):
+    """Validate levels and write them into a level pack.
+
+    Args:
+        path (str): The pack to write.
+        levels (list): Level objects.
+
+    """
+    records = []
+    for level in levels:
+        level.validate()
+        records.append(pack_level(level))
+    offset = HEADER.size + ENTRY.size * len(records)
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        for record in records:
+            file.write(ENTRY.pack(offset, len(record)))
+            offset += len(record)
+        for record in records:
+            file.write(record)
+
+class LevelPack:
+    """A memory-mapped level pack that decodes levels on demand.
+
+    Only the header is read when the pack is opened; indexing a pack decodes
+    that one level from the mapped file.
+
+    Attributes:
+        path (str): The pack file.
+
+    Methods:
+        name(index): Return the name of a level without decoding its grid.
+        close(): Unmap and close the pack.
+
+    """
+
+    def __init__(self, path):
+        """Initialize the LevelPack object.
+
+        Args:
+            path (str): The pack file to open.
+
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self._count = HEADER.unpack_from(self._data)
+        except (ValueError, struct.error):
+            self._file.close()
+            raise LevelError(f'{path} is not a level pack') from None
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise LevelError(f'{path} is not a version {VERSION} level pack')
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        """Decode and validate a level, since a pack may not come from compile_pack."""
+        offset, (rows, cols, drop_prob, name_len, *weights) = self._record(index)
+        if offset + LEVEL.size + name_len + rows * cols > len(self._data):
+            raise LevelError(f'{self.path}: level {index} runs past the end of the pack')
+        name = self._name(index, offset, name_len)
+        offset += LEVEL.size + name_len
+        cells = self._data[offset:offset + rows * cols]
+        grid = [list(cells[row * cols:(row + 1) * cols]) for row in range(rows)]
+        drops = dict(zip(UPGRADES, weights)) if any(weights) else None
+        level = Level(name, grid, drop_prob, drops)
+        level.validate()
+        return level
+
+    def _record(self, index):
+        """Return the file offset and the unpacked LEVEL header of a level record.
+
+        Raises:
+            IndexError: The pack has no such level.
+            LevelError: The index entry or the record header lies past the end of the pack.
+
+        """
+        if not -self._count <= index < self._count:
+            raise IndexError(f'{self.path} has {self._count} levels')
+        entry = HEADER.size + ENTRY.size * (index % self._count)
+        if entry + ENTRY.size > len(self._data):
+            raise LevelError(f'{self.path}: the index of level {index} is cut off')
+        offset = ENTRY.unpack_from(self._data, entry)[0]
+        if offset + LEVEL.size > len(self._data):
+            raise LevelError(f'{self.path}: level {index} starts past the end of the pack')
+        return offset, LEVEL.unpack_from(self._data, offset)
+
+    def _name(self, index, offset, name_len):
+        """Return the decoded name of the level record at offset."""
+        start = offset + LEVEL.size
+        if start + name_len > len(self._data):
+            raise LevelError(f'{self.path}: the name of level {index} runs past the end of the pack')
+        try:
+            return self._data[start:start + name_len].decode()
+        except UnicodeDecodeError:
+            raise LevelError(f'{self.path}: the name of level {index} is not UTF-8') from None
+
+    def name(self, index):
+        """Return the name of a level without decoding its grid."""
+        offset, header = self._record(index)
+        return self._name(index, offset, header[3])
+
+    def close(self):
+        """Unmap and close the pack."""
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_level(spec):
+    """Load a level from a text file or from a pack as 'pack.brkpack:index' (index 0 by default)."""
+    if spec.endswith('.lvl'):
+        return read_level(spec)
+    path, _, index = spec.partition(':')
+    try:
+        index = int(index or 0)
+    except ValueError:
+        raise LevelError(f'{spec}: the level index has to be a number') from None
+    with LevelPack(path) as pack:
+        return pack[index]
+
+if __name__ == '__main__':
+    command, path = sys.argv[1:3]
+    try:
+        if command == 'compile':
+            levels = [read_level(source) for source in sys.argv[3:]]
+            compile_pack(path, levels)
+            print(f'wrote {len(levels)} levels to {path}')
+        elif command == 'info':
+            with LevelPack(path) as pack:
+                for index in range(len(pack)):
+                    print(index, pack[index])
+    except LevelError as error:
+        print(error)
+        sys.exit(1)
\ No newline at end of file
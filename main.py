@@ -1,11 +1,33 @@
-import pygame, time
-from sys import exit
+import pygame, time, os, random, zlib, threading
+from array import array
+from sys import exit, argv
 from classes import *
-from random import choice
+from assets import tiles, read_bundle
+from spatial import BlockGroup
+from blockfield import BlockField
+from render import BlockLayer, DirtyRenderer, ScaledRenderer
+from physics import FixedTimestep
+from pacing import FramePacer
+from hud import HUD
+from replay import Recorder
+from spectator import Broadcaster, parse_address
+from capture import FrameCapture
+from snapshot import snapshot as take_snapshot, restore as restore_snapshot, RewindBuffer
+try:
+    from particles import ParticleSystem
+except ImportError:
+    #the effects need NumPy, the game runs without them
+    ParticleSystem = None
+from levels import load_level, LevelError
+from profiler import FrameProfiler, AllocationProfiler
+from pool import SpritePool
 from settings import *
 import warnings
 warnings.filterwarnings("ignore")
 
+#launch velocities of added balls, used in turn
+SPREAD = [(-2, -2), (2, -2), (-1, -3), (1, -3), (-3, -1), (3, -1)]
+
 class Game:
     """
     Breakout Game
@@ -20,56 +42,132 @@ class Game:
         blocks (pygame.sprite.Group): A sprite group containing the blocks in the game.
         upgrades (pygame.sprite.Group): A sprite group containing the upgrades in the game.
         can_shoot (bool): Laser shooting indication.
-        block_grp (pygame.sprite.Group) = A sprite group containing the blocks in the game.
+        block_grp (BlockField) = The blocks in the game, a BlockGroup of Block sprites without Compact_Blocks.
+        all_blocks (list) = Every Block sprite in setup order, None with Compact_Blocks.
+        block_health (int) = The health of all blocks at the start, for the score.
         player (pygame.sprite.GroupSingle) = A sprite groupsingle containing player sprite.
         ball_sprite (Ball) = Ball object.
-        ball (pygame.sprite.GroupSingle) = A sprite groupsingle containing ball sprite.
+        ball (BallGroup) = The balls in play, ball.sprite is the one served from the paddle.
+        ball_pool (SpritePool) = Reusable extra balls.
+        serve_balls (int) = Balls put in play by a serve.
         heart_surf (pygame.Surface) = Image of heart.
         upgrade_sprites (pygame.sprite.Group) = Sprite group containing upgrade sprites.
+        upgrade_pool (SpritePool) = Reusable upgrade sprites.
         game_over (bool) = Flag indicating if the game is over.
         font (pygame.font.SysFont) = Font type.
         game_over_text (pygame.Surface) = Game Over text.
         text_rect (pygame.Rect) = Rectangle for Game Over text.
+        headless (bool) = Flag indicating the game runs without a window or blitting.
+        frame (int) = Number of frames simulated so far.
+        seed (int) = Seed of the board, None for the global random state.
+        rng (random.Random) = Random generator for the board and drops.
+        level (Level) = The level being played, None for the built-in Shape board.
+        shape (list) = Block tiers of the board, 0 for an empty cell.
+        bg_img (pygame.Surface) = Background image.
+        block_layer (BlockLayer) = Background and blocks cached in one surface.
+        renderer (DirtyRenderer) = Dirty-rectangle or ScaledRenderer, None for full-screen redraws.
+        pixels_pushed (int) = Pixels passed to the display by the last present().
+        vsync (bool) = Indicates whether the display waits for the monitor refresh.
+        shedding (bool) = Indicates whether optional work is off because the frame pacer is behind.
+        particles (ParticleSystem) = Block hit and kill effects, None when off or headless.
+        hud (HUD) = Score, lasers, cooldown, speed and upgrades line, None when headless.
+        alpha (float) = Fraction of a step to interpolate the paddle and ball by when drawing.
+        profiler (FrameProfiler) = Per-phase frame timer, off until enabled.
 
     Methods:
         __init__(self): Initializes the Game object.
         game_over_display(self): Display game over text.
         create_upgrade(self, pos, up_type): create upgrade sprites.
+        pool_stats(self): Sizes and high-water marks of the sprite pools.
         upgrade_collide(self): updating the game for upgrade collision with player.
+        serve(self): Launch the ball resting on the paddle.
+        add_balls(self, count, source): Put more balls in play.
         block_setup(self): Display blocks on the screen.
         display_hearts(self): Display hearts on the screen.
-        run(self): Runs the game loop.
+        update(self, direction): Update the game state for one frame.
+        draw(self): Draw the game sprites on the screen.
+        emit_particles(self): Spawn block hit and kill effects and move the particles.
+        draw_profiler(self): Draw the profiler HUD.
+        shed(self, on): Turn optional work off or back on.
+        run(self, direction): Runs one frame of the game loop.
+        state_hash(self): Checksum of the simulation state.
+        score(self): Points for the damage dealt to blocks.
+        snapshot(self): The simulation state as a bytes blob.
+        restore(self, blob): Go back to the state of a snapshot.
+        present(self): Push the drawn frame to the display.
     """
-    def __init__(self): 
+    def __init__(self, headless=False, dirty=False, seed=None, level=None, balls=1, scale=None, smooth=False, dynamic=False,
+                 particles=None, vsync=False): 
         """
         Initialize the Game object.
 
         Creates the game window, sets up game objects, and initializes flags.
+
+        Args:
+            headless (bool, optional): Run without a window, blitting or wall clock. Defaults to False.
+            dirty (bool, optional): Redraw only the changed screen regions. Defaults to False.
+            seed (int, optional): Seed for a reproducible board and drops. Defaults to None.
+            level (Level, optional): Level to play instead of the Shape board. Defaults to None.
+            balls (int, optional): Balls put in play by every serve, for stress tests. Defaults to 1.
+            scale (float, optional): Compose frames on a canvas this size and upscale them once. Defaults to None.
+            smooth (bool, optional): Filter the upscale of a scaled canvas. Defaults to False.
+            dynamic (bool, optional): Lower the canvas scale while drawing is over budget. Defaults to False.
+            particles (bool, optional): Show block hit and kill effects. Defaults to None for the Particles setting.
+            vsync (bool, optional): Ask for a display synchronised with the monitor refresh. Defaults to False.
         """
+        self.headless = headless
+        self.frame = 0
+        self.seed = seed
+        self.rng = random if seed is None else random.Random(seed)
+        self.level = level
+        if level:
+            self.shape = level.grid
+        else:
+            self.shape = Shape if seed is None else make_shape(self.rng)
+        if headless:
+            #SDL still needs a (hidden) display for convert_alpha
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+
         pygame.init()
         pygame.display.set_caption('Breakout')
 
-        self.screen = pygame.display.set_mode((Width, Height))
+        self.vsync = False
+        if vsync and not headless:
+            #SDL only synchronises displays drawn through its renderer, which needs SCALED
+            try:
+                self.screen = pygame.display.set_mode((Width, Height), pygame.SCALED, vsync=1)
+                self.vsync = True
+            except pygame.error:
+                pass
+        if not self.vsync:
+            self.screen = pygame.display.set_mode((1, 1) if headless else (Width, Height))
         
         self.can_shoot = True
 
-        #Block sprite
-        self.block_grp = pygame.sprite.Group()
+        #Blocks
+        self.block_grp = BlockField(self.create_upgrade, self.rng) if Compact_Blocks else BlockGroup()
         self.blocks_setup()
+        #every Block sprite in setup order, destroyed ones included; the BlockField keeps its own arrays
+        self.all_blocks = None if Compact_Blocks else self.block_grp.sprites()
+        self.block_health = sum(block.health for block in self.block_grp)
 
         #Player sprite
-        self.player = pygame.sprite.GroupSingle(Player((Width/2, Height - 50), self.block_grp, speed=5 ))
+        self.player = pygame.sprite.GroupSingle(Player((Width/2, Paddle_Y), self.block_grp, speed=5 ))
+        #laser cooldowns run on simulated time, so headless games and replays behave the same
+        self.player.sprite.get_ticks = self.ticks
  
         #Ball Sprite
         self.ball_sprite = Ball((Width/2,Height-80), self.player.sprite, self.block_grp, vel= [2,-2])
-        self.ball = pygame.sprite.GroupSingle(self.ball_sprite) 
+        self.ball = BallGroup(self.ball_sprite)
+        self.ball_pool = SpritePool(Ball)
+        self.serve_balls = balls
 
         #Heart display
-        self.heart_surf = pygame.image.load('PNG/60-Breakout-Tiles.png').convert_alpha()
-        self.heart_surf = pygame.transform.rotozoom(self.heart_surf, 0, Heart_Scale).convert_alpha()
+        self.heart_surf = tiles.get(60, Heart_Scale)
 
         #Upgrade sprite
         self.upgrade_sprites = pygame.sprite.Group()
+        self.upgrade_pool = SpritePool(Upgrade)
 
         #Game over setup
         self.game_over = False
@@ -80,32 +178,106 @@ class Game:
         #Winner Text
         self.winner_text = self.font.render('Winner', True, (0,255,0))
         self.winner_text_rect = self.winner_text.get_rect(center=(Width // 2, Height // 2))
+
+        #Rendering
+        self.bg_img = None if headless else tiles.background()
+        self.block_layer = None if headless else BlockLayer(self.bg_img, self.block_grp)
+        self.renderer = None
+        if dirty and not headless:
+            self.renderer = DirtyRenderer(self, self.block_layer)
+        elif (scale or dynamic) and not headless:
+            #dynamic resolution starts at full size unless a scale is given
+            self.renderer = ScaledRenderer(self, self.block_layer, scale or 1.0, smooth,
+                                           Render_Budget / FPS if dynamic else None)
+        self.pixels_pushed = 0
+        self.alpha = 1.0
+        if particles is None:
+            particles = Particles
+        self.particles = ParticleSystem() if particles and ParticleSystem and not headless else None
+        self.particles_frame = 0
+        self.shedding = False
+        self.shed_particles = None
+
+        #Status line
+        self.hud = None if headless else HUD(self)
+
+        #Profiling
+        self.profiler = FrameProfiler()
+        self.hud_font = None
+        self.hud_rect = None
     
     def game_over_display(self):
         """Display game over text."""
-        self.screen.blit(self.game_over_text, self.text_rect)
+        if self.renderer:
+            self.renderer.overlay(self.game_over_text, self.text_rect)
+        else:
+            self.screen.blit(self.bg_img, (0, 0))
+            self.screen.blit(self.game_over_text, self.text_rect)
        
     def Winner(self):
         """Display Winner text."""
-        self.screen.blit(self.winner_text, self.winner_text_rect)
+        if self.renderer:
+            self.renderer.overlay(self.winner_text, self.winner_text_rect)
+        else:
+            self.screen.blit(self.bg_img, (0, 0))
+            self.screen.blit(self.winner_text, self.winner_text_rect)
       
     def create_upgrade(self, pos, up_type):
         """Upgrade player."""
-        Upgrade(pos, up_type, self.upgrade_sprites)
+        self.upgrade_pool.acquire(pos, up_type, self.upgrade_sprites)
+
+    def pool_stats(self):
+        """Return the size and high-water mark of the laser, upgrade and ball pools."""
+        return {'lasers': self.player.sprite.laser_pool.stats(), 'upgrades': self.upgrade_pool.stats(),
+                'balls': self.ball_pool.stats()}
 
     def upgrade_collide(self):
         """Updating the game for upgrade collision with player."""
         overlap_sprite = pygame.sprite.spritecollide(self.player.sprite, self.upgrade_sprites, True)
         for sprite in overlap_sprite:
-            self.player.sprite.upgrade(sprite.up_type)
+            if sprite.up_type == 'multi':
+                for ball in self.ball.sprites():
+                    self.add_balls(Multi_Ball, ball)
+            else:
+                self.player.sprite.upgrade(sprite.up_type)
+
+    def serve(self):
+        """Launch the ball resting on the paddle, together with the extra balls of serve_balls."""
+        ball = self.ball.sprite
+        if not ball.active:
+            ball.active = True
+            self.add_balls(self.serve_balls - 1, ball)
+
+    def add_balls(self, count, source=None):
+        """Put up to count more balls in play, fanned out upwards from a ball.
+
+        Args:
+            count (int): The number of balls to add, capped at Max_Balls in play.
+            source (Ball, optional): The ball they start from. Defaults to the first ball.
+        """
+        source = source or self.ball.sprite
+        player = self.player.sprite
+        for i in range(min(count, Max_Balls - len(self.ball))):
+            ball = self.ball_pool.acquire(source.pos, player, self.block_grp)
+            ball.swept = source.swept
+            #later rounds of the fan start a little to the side so the balls do not stack up
+            spread, offset = SPREAD[i % len(SPREAD)], 3 * (i // len(SPREAD) % 8)
+            ball.launch((source.center.x + offset, source.center.y), spread)
+            self.ball.add(ball)
 
     def blocks_setup(self):
         """Display blocks on the screen."""
-        for row_index, row in enumerate(Shape):
+        drop_prob, drops = (self.level.drop_prob, self.level.drops) if self.level else (Drop_prob, None)
+        for row_index, row in enumerate(self.shape):
             for col_index, col in enumerate(row):
+                if not col:
+                    continue
                 pos_x = col_index * (Block_Size[0] + Block_Offset)
                 pos_y = Top_Offset + row_index * (Block_Size[1] + Block_Offset)
-                Block(col, pos_x, pos_y, self.block_grp, self.create_upgrade)
+                if Compact_Blocks:
+                    self.block_grp.add_block(col, pos_x, pos_y, drop_prob, drops)
+                else:
+                    Block(col, pos_x, pos_y, self.block_grp, self.create_upgrade, self.rng, drop_prob, drops)
 
     def display_hearts(self):
         """Display hearts on the screen."""
@@ -113,69 +285,379 @@ class Game:
         for i in range(self.player.sprite.hearts):
             self.screen.blit(self.heart_surf, ( i * (heart_width + 2) + 5, 5 ))
 
-    def run(self):
-        """Update all the game sprites"""
+    def ticks(self):
+        """Return the simulated time in milliseconds."""
+        return self.frame * 1000 // FPS
 
-        #Blocks Setup
-        self.block_grp.draw(self.screen)
+    def update(self, direction=None):
+        """Update all the game sprites for one frame.
 
-        #Hearts Setup
-        self.display_hearts()
+        Args:
+            direction (int, optional): Paddle direction (-1, 0 or 1). Reads the keyboard when None.
+        """
+        self.frame += 1
+        lap = self.profiler.lap
+        lap('other')
 
         #Upgrades
         self.upgrade_sprites.update()
-        self.upgrade_sprites.draw(self.screen)
+        lap('upgrade update')
         self.upgrade_collide()
+        lap('upgrade collide')
 
         #Player Setup
-        self.player.sprite.get_input()
+        self.player.sprite.get_input(direction)
         self.player.update()
-        self.player.draw(self.screen)
+        lap('player input')
         
         #Laser Update
         if self.ball.sprite.active:
             self.player.sprite.laser_update()
+        lap('laser update')
 
         #Ball Setup
         self.ball.update()
-        self.ball.draw(self.screen)
+        lap('ball update')
+
+    def draw(self):
+        """Draw all the game sprites"""
+        lap = self.profiler.lap
+        lap('other')
+        if self.hud and not self.shedding:
+            self.hud.update()
+            lap('hud update')
+        if self.particles:
+            self.emit_particles()
+            lap('particle update')
+        if self.renderer:
+            self.renderer.draw()
+            lap('renderer draw')
+            return
+
+        #Background and blocks, patched only where blocks changed
+        self.block_layer.update()
+        self.screen.blit(self.block_layer.surface, (0, 0))
+        lap('block draw')
+
+        #Hearts Setup
+        self.display_hearts()
+        lap('hearts draw')
+
+        #Upgrades
+        self.upgrade_sprites.draw(self.screen)
+        lap('upgrade draw')
+
+        #Player Setup
+        self.screen.blit(self.player.sprite.image, self.player.sprite.render_rect(self.alpha))
+
+        #Ball Setup
+        for ball in self.ball:
+            self.screen.blit(ball.image, ball.render_rect(self.alpha))
+        lap('paddle/ball draw')
 
         #Lasers
         self.player.sprite.lasers_grp.draw(self.screen)
-        
+        lap('laser draw')
+
+        #Particles
+        if self.particles:
+            self.particles.draw(self.screen)
+            lap('particle draw')
+
+        #Status line, on top of everything
+        if self.hud:
+            self.hud.draw(self.screen)
+            lap('hud draw')
+
+    def emit_particles(self):
+        """Spawn effects for the blocks hit or destroyed since the last frame and move the particles."""
+        #None after a restore: the changed rects are the board repaint, not hits
+        if self.particles_frame is not None:
+            #read before the block layer patches these rects, while it still shows the old blocks
+            for rect in dict.fromkeys(tuple(rect) for rect in self.block_grp.changed):
+                rect = pygame.Rect(rect)
+                if any(block.rect == rect for block in self.block_grp.collide(rect)):
+                    self.particles.sparks(rect)
+                else:
+                    self.particles.debris(rect, pygame.transform.average_color(self.block_layer.surface, rect))
+            self.particles.update(self.frame - self.particles_frame)
+        self.particles_frame = self.frame
+
+    def draw_profiler(self):
+        """Draw the profiler HUD in the top right corner while it is shown."""
+        if self.hud_rect and self.renderer:
+            #last frame's HUD, erased in dirty mode
+            self.renderer.restore(self.hud_rect)
+            self.hud_rect = None
+        if not self.profiler.show:
+            return
+        if self.hud_font is None:
+            self.hud_font = pygame.font.SysFont('monospace', 14)
+        hud = self.profiler.overlay(self.hud_font, refresh=not self.shedding)
+        self.hud_rect = self.screen.blit(hud, hud.get_rect(topright=(Width - 5, 5)))
+        if self.renderer:
+            self.renderer.rects.append(self.hud_rect)
+        self.profiler.lap('profiler hud')
+
+    def shed(self, on):
+        """Turn optional work off or back on: particle effects, status line and profiler HUD refreshes."""
+        if on == self.shedding:
+            return
+        self.shedding = on
+        if on:
+            #the particles are put aside, the renderers erase the last ones drawn
+            self.shed_particles, self.particles = self.particles, None
+            if self.shed_particles:
+                self.shed_particles.clear()
+        else:
+            self.particles, self.shed_particles = self.shed_particles, None
+            self.particles_frame = self.frame
+
+    def run(self, direction=None):
+        """Update all the game sprites and draw them unless headless."""
+        self.update(direction)
+        if not self.headless:
+            self.draw()
+
+    def state_hash(self):
+        """Return a CRC32 of the simulation state, to detect diverging replays."""
+        player, ball = self.player.sprite, self.ball.sprite
+        values = [self.frame, *player.rect, player.speed, player.hearts, player.no_lasers,
+                  player.start_laser, player.laser_time, player.ready,
+                  *ball.rect, *ball.center, *ball.velocity, ball.active]
+        for extra in self.ball.sprites()[1:]:
+            values += [*extra.rect, *extra.center, *extra.velocity]
+        values += [block.health for block in self.block_grp]
+        for sprite in self.upgrade_sprites:
+            values += sprite.rect
+        for sprite in player.lasers_grp:
+            values += sprite.rect
+        return zlib.crc32(array('d', values).tobytes())
+
+    def score(self):
+        """Return the points scored, Score_Per_Hit for every Damage dealt to the blocks."""
+        blocks = self.block_grp
+        if self.all_blocks is None:
+            left = sum(health for health, live in zip(blocks.health, blocks.alive) if live)
+        else:
+            left = sum(block.health for block in blocks)
+        return (self.block_health - left) // Damage * Score_Per_Hit
+
+    def snapshot(self):
+        """Return the simulation state as a compact bytes blob, without any surfaces."""
+        return take_snapshot(self)
+
+    def restore(self, blob):
+        """Go back to the state of a snapshot of this game or of a game with the same seed and level."""
+        restore_snapshot(self, blob)
+        if self.particles:
+            #the effects belonged to the abandoned future
+            self.particles.clear()
+            self.particles_frame = None
+
+    def present(self):
+        """Push the drawn frame, or only its changed regions, to the display."""
+        if self.renderer:
+            rects = self.renderer.flush()
+            pygame.display.update(rects)
+            self.pixels_pushed = self.renderer.pixels
+        else:
+            pygame.display.update()
+            self.pixels_pushed = Width * Height
+
+def preload():
+    """Read the asset bundle and scan the system fonts on a thread behind a loading screen."""
+    pygame.init()
+    pygame.display.set_caption('Breakout')
+    screen = pygame.display.set_mode((Width, Height))
+    loaded = {}
+
+    def load():
+        loaded['surfaces'] = read_bundle(tiles.bundle) if tiles.bundle else {}
+        #the first SysFont call scans the installed fonts, the result is cached
+        pygame.font.get_fonts()
+
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    bar = pygame.Rect(0, 0, Width // 4, 8)
+    bar.center = (Width // 2, Height // 2)
+    frame = 0
+    while thread.is_alive():
+        pygame.event.pump()
+        screen.fill((0, 0, 0))
+        pygame.draw.rect(screen, (90, 90, 90), bar, 1)
+        pygame.draw.rect(screen, (200, 200, 200), (bar.x + frame % (bar.width - 20), bar.y, 20, bar.height))
+        pygame.display.flip()
+        thread.join(1 / FPS)
+        frame += 4
+    if loaded.get('surfaces'):
+        tiles.add(loaded['surfaces'])
 
 if __name__ == '__main__':
     
-    game = Game()
+    #python main.py [--dirty] [--record game.brk] [--profile frames.csv|frames.json] [--level file.lvl|pack.brkpack:n] [--balls n]
+    #               [--no-bundle] [--startup] [--scale 0.5] [--smooth] [--dynamic] [--spectate [host:]port|unix:path]
+    #               [--capture frames/|game.raw] [--alloc] [--no-pacing] [--vsync]
+    #hold Backspace to rewind the last Rewind_Seconds of play, except while recording a replay
+    start = time.perf_counter()
+    if '--no-bundle' in argv:
+        tiles.bundle = None
+    preload()
+    record = argv[argv.index('--record') + 1] if '--record' in argv else None
+    profile = argv[argv.index('--profile') + 1] if '--profile' in argv else None
+    balls = int(argv[argv.index('--balls') + 1]) if '--balls' in argv else 1
+    if record and ('--level' in argv or balls != 1):
+        exit('--record replays the built-in single ball game and cannot be combined with --level or --balls')
+    level = None
+    if '--level' in argv:
+        try:
+            level = load_level(argv[argv.index('--level') + 1])
+        except (LevelError, OSError, IndexError) as error:
+            exit(str(error))
+    seed = random.randrange(2**32) if record else None
+    scale = float(argv[argv.index('--scale') + 1]) if '--scale' in argv else None
+    if '--dirty' in argv and (scale or '--dynamic' in argv):
+        exit('--dirty redraws changed regions at full size and cannot be combined with --scale or --dynamic')
+    try:
+        game = Game(dirty='--dirty' in argv, seed=seed, level=level, balls=balls,
+                    scale=scale, smooth='--smooth' in argv, dynamic='--dynamic' in argv, vsync='--vsync' in argv)
+    except ValueError as error:
+        exit(str(error))
+    recorder = Recorder(record, seed) if record else None
+    #a replay is one line of play, so recording games cannot be rewound
+    rewind = None if recorder else RewindBuffer(game)
+    broadcaster = None
+    if '--spectate' in argv:
+        try:
+            broadcaster = Broadcaster(game, parse_address(argv[argv.index('--spectate') + 1])).start()
+        except (OSError, ValueError, IndexError) as error:
+            exit(f'--spectate: {error}')
+    capture = None
+    if '--capture' in argv:
+        try:
+            capture = FrameCapture(game.screen, argv[argv.index('--capture') + 1])
+        except (OSError, ValueError, IndexError) as error:
+            exit(f'--capture: {error}')
+    if '--alloc' in argv:
+        #bytes, memory blocks and gc pauses per phase, reported on exit; tracing slows the game down
+        game.profiler = AllocationProfiler()
+    profiler = game.profiler
+    profiler.enabled = profile is not None or '--alloc' in argv
 
     clock = pygame.time.Clock()
+    timestep = FixedTimestep()
+    pacer = FramePacer() if Frame_Pacing and '--no-pacing' not in argv else None
+    pacing_changes = 0
+    max_steps = timestep.max_steps
     
-    #Background_img
-    bg_img = pygame.image.load('PNG/bg_image.png').convert_alpha()
-    # game loop
+    # game loop, the simulation runs in fixed steps whatever the frame rate
     while True:
-        #game.screen.fill((51, 51, 51))
-        game.screen.blit(bg_img, (0,0))
+        profiler.frame()
+        dt = clock.tick(FPS)
+        #behind schedule the pacer sheds the effects and then draws only some frames,
+        #which catch up with the time of the drawn ones
+        drawing = pacer.begin() if pacer else True
+        if pacer:
+            game.shed(pacer.shedding)
+            timestep.max_steps = pacer.catch_up(max_steps)
+        steps = timestep.advance(dt / 1000)
+        serve = False
+        profiler.lap('clock tick')
+
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if recorder:
+                    recorder.close()
+                if broadcaster:
+                    broadcaster.close()
+                if capture:
+                    capture.close()
+                    stats = capture.stats()
+                    print(f"captured {stats['captured']} frames, {stats['dropped']} dropped, "
+                          f"queue depth up to {stats['max_depth']} of {capture.slots}")
+                if profile:
+                    profiler.export(profile)
+                if '--alloc' in argv:
+                    print(profiler.report())
+                    profiler.close()
+                if pacer:
+                    stats = pacer.stats()
+                    print(f"pacing: {stats['drawn']} frames drawn, {stats['skipped']} skipped, {stats['shed']} shed, "
+                          f"{stats['changes']} mode changes, {timestep.dropped:.2f} s of play dropped")
                 pygame.quit()
                 exit()
                  
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
-                    game.ball.sprite.active = True
-        
-        if game.player.sprite.hearts == 0:
+                    game.serve()
+                    serve = True
+                #F3 toggles the profiler HUD (and starts profiling)
+                if event.key == pygame.K_F3:
+                    profiler.show = not profiler.show
+                    profiler.enabled = profiler.enabled or profiler.show
+        profiler.lap('events')
+
+        keys = pygame.key.get_pressed()
+        playing = False
+        if rewind and keys[pygame.K_BACKSPACE]:
+            if steps:
+                rewind.rewind(Rewind_Speed * steps)
+            profiler.lap('rewind')
+            playing = True
+
+        elif game.player.sprite.hearts == 0:
             game.game_over_display()
         
         elif len(game.block_grp) == 0:    
             game.Winner()
 
         else:
-            game.run()
+            direction = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
+            done = 0
+            while done < steps:
+                game.update(direction)
+                done += 1
+                if game.player.sprite.hearts == 0 or len(game.block_grp) == 0:
+                    break
+            if recorder:
+                recorder.record(dt, done, direction, serve, game.state_hash())
+            if rewind:
+                rewind.record()
+                profiler.lap('rewind')
+            game.alpha = timestep.alpha
+            playing = True
+
+        draw_seconds = waited = 0.0
+        if drawing:
+            drawn = time.perf_counter()
+            if playing:
+                game.draw()
+            game.draw_profiler()
+            presented = time.perf_counter()
+            game.present()
+            if game.vsync:
+                #waiting for the monitor refresh is not load
+                waited = time.perf_counter() - presented
+            draw_seconds = time.perf_counter() - drawn - waited
+            profiler.lap('display update')
 
-        pygame.display.update()
-        clock.tick(60)      
-    game.game_over_display()
+        if broadcaster:
+            broadcaster.publish()
+            profiler.lap('spectator publish')
+        if capture and drawing:
+            capture.capture(game.frame)
+            profiler.lap('capture')
+        if pacer:
+            pacer.end(draw_seconds, waited)
+            if pacer.changes != pacing_changes:
+                pacing_changes = pacer.changes
+                mode = pacer.mode if pacer.mode != 'skip' else f'skip {pacer.skip}'
+                pygame.display.set_caption('Breakout' if pacer.mode == 'full' else f'Breakout ({mode})')
 
-   
+        #--startup reports the time to the first frame and quits
+        if '--startup' in argv:
+            print(f'first frame {(time.perf_counter() - start) * 1000:.1f} ms after start-up, '
+                  f'tiles {"from the bundle" if tiles.bundled else "from PNG files"}')
+            pygame.quit()
+            exit()
+    game.game_over_display()
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""Allocation regression check for the game loop.
+
+Plays seeded games with an AllocationProfiler and compares the steady-state
+allocations per frame with a recorded baseline. Two games are measured:
+'update' runs Game.update headless and 'draw' also runs Game.draw through
+SDL's dummy video driver (particles off, their random spawns would make the
+numbers vary). The first Memcheck_Warmup frames fill the sprite pools and
+caches and are not measured.
+
+check exits with status 1 when a game or one of its phases allocates more
+peak bytes per frame than the baseline allows (Memcheck_Tolerance plus a
+small slack), keeps more memory blocks per frame, or triggers more garbage
+collections. Record a new baseline after changes that allocate more on
+purpose. Numbers depend on the Python version, which the baseline records.
+
+Usage:
+    python memcheck.py check [baseline.json]
+    python memcheck.py record [baseline.json]
+    python memcheck.py report
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys
+import json
+import platform
+from settings import *
+
+BASELINE = 'memcheck.json'
+FRAMES = 600
+SLACK_BYTES = 256
+SLACK_BLOCKS = 0.5
+
+def measure(draw, frames=FRAMES, warmup=Memcheck_Warmup, seed=3):
+    """Play a seeded game and return its AllocationProfiler after frames measured frames."""
+    import pygame
+    from main import Game
+    from headless import track_ball
+    from profiler import AllocationProfiler
+    if draw:
+        pygame.init()
+        pygame.display.set_mode((Width, Height))
+    game = Game(headless=not draw, seed=seed, balls=3, particles=False)
+    for _ in range(warmup):
+        game.serve()
+        game.run(track_ball(game))
+    profiler = game.profiler = AllocationProfiler(size=frames + 1)
+    profiler.enabled = True
+    try:
+        for _ in range(frames + 1):
+            profiler.frame()
+            game.serve()
+            game.run(track_ball(game))
+            profiler.lap('other')
+    finally:
+        profiler.close()
+    return profiler
+
+def summary(profiler):
+    """Return the stats of a measured game as the baseline stores them."""
+    stats = profiler.allocation_stats()
+    collections, pause = stats.pop('gc')
+    return {'collections': collections, 'phases': {name: {'bytes': allocated, 'blocks': blocks}
+                                                   for name, (allocated, blocks) in stats.items()}}
+
+def run():
+    """Measure both games and return {game: summary}."""
+    return {name: summary(measure(draw)) for name, draw in (('update', False), ('draw', True))}
+
+def compare(baseline, current, tolerance=Memcheck_Tolerance):
+    """Return a list of regressions of current against baseline, empty when within limits."""
+    failures = []
+    for game, expected in baseline['games'].items():
+        measured = current[game]
+        if measured['collections'] > expected['collections'] * (1 + tolerance) + 1 / FRAMES:
+            failures.append(f'{game}: {measured["collections"] * 1000:.1f} collections per 1000 frames, '
+                            f'baseline {expected["collections"] * 1000:.1f}')
+        for phase, limits in expected['phases'].items():
+            got = measured['phases'].get(phase)
+            if got is None:
+                continue
+            if got['bytes'] > limits['bytes'] * (1 + tolerance) + SLACK_BYTES:
+                failures.append(f'{game} {phase}: {got["bytes"]:.0f} bytes per frame, baseline {limits["bytes"]:.0f}')
+            if got['blocks'] > limits['blocks'] + SLACK_BLOCKS:
+                failures.append(f'{game} {phase}: {got["blocks"]:.2f} blocks kept per frame, '
+                                f'baseline {limits["blocks"]:.2f}')
+    return failures
+
+def record(path=BASELINE):
+    """Measure both games and write the baseline."""
+    games = run()
+    with open(path, 'w') as file:
+        json.dump({'python': platform.python_version(), 'frames': FRAMES, 'games': games}, file, indent=1)
+    for game, stats in games.items():
+        print(f'{game}: {stats["phases"]["frame"]["bytes"]:.0f} bytes, {stats["phases"]["frame"]["blocks"]:.2f} blocks '
+              f'and {stats["collections"] * 1000:.1f} collections per 1000 frames')
+    print(f'baseline written to {path}')
+
+def check(path=BASELINE):
+    """Measure both games against the baseline, print the result and return True if within limits."""
+    with open(path) as file:
+        baseline = json.load(file)
+    if baseline['python'] != platform.python_version():
+        print(f'warning: the baseline was recorded with Python {baseline["python"]}, '
+              f'this is {platform.python_version()}')
+    failures = compare(baseline, run())
+    for failure in failures:
+        print('regression:', failure)
+    print(f'{len(failures)} allocation regressions' if failures else 'allocations within the baseline')
+    return not failures
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    path = sys.argv[2] if len(sys.argv) > 2 else BASELINE
+    if command == 'record':
+        record(path)
+    elif command == 'report':
+        for name, draw in (('update', False), ('draw', True)):
+            print(f'--- {name}')
+            print(measure(draw).report())
+    else:
+        sys.exit(0 if check(path) else 1)
\ No newline at end of file
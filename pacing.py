@@ -0,0 +1,216 @@
+"""Adaptive frame pacing for the game loop.
+
+The simulation runs in fixed steps and the ball speed is in pixels per
+step, so a loop that cannot keep up plays in slow motion once FixedTimestep
+has to drop time. FramePacer measures the real cost of every frame (the
+busy time between two clock ticks, without vsync waits) and of drawing, and
+while the average cost stays over the frame budget it steps through the
+pacing modes, one level at a time:
+
+    full   draw every frame
+    shed   draw every frame, without the optional work: particle effects
+           and profiler HUD refreshes
+    skip   shed, and draw only one frame in skip + 1, simulating the others,
+           with skip going up to Max_Frame_Skip
+
+After two seconds of headroom, with the cost of one more draw per cycle
+fitting in Pacing_Headroom of the budget, it steps back a level.
+
+FixedTimestep already runs several steps in a long frame, but it drops the
+time of a frame longer than its max_steps and the game slows down. Drawing
+one frame in skip + 1 lets the skipped frames catch up: catch_up() scales
+max_steps with the draw cycle, so only a load that does not fit into a
+whole cycle costs game time.
+
+Usage:
+    python main.py [--no-pacing] [--vsync]
+    python pacing.py [balls] [slowdown] [seconds]
+"""
+import os
+import sys
+import time
+from settings import *
+
+class FramePacer:
+    """Decides per frame whether to draw and which optional work to shed.
+
+    Attributes:
+        budget (float): Seconds a frame may take.
+        max_skip (int): The most frames simulated without drawing between two drawn ones.
+        headroom (float): The share of the budget the projected cost must fit before stepping back.
+        level (int): 0 for full, 1 for shed, 1 + skip for skip.
+        cost (float): The average busy seconds per frame.
+        draw_cost (float): The average seconds a drawn frame spends drawing and presenting.
+        frames, drawn, skipped, shed (int): Frames paced, drawn, simulated without drawing and
+            run without the optional work.
+        changes (int): Mode changes so far.
+
+    Methods:
+        begin(): Start a frame and return whether to draw it.
+        catch_up(max_steps): Return the steps a frame may run in the current mode.
+        end(draw_seconds, waited): Finish a frame and adapt the mode.
+        stats(): Return the pacing metrics.
+
+    """
+
+    def __init__(self, budget=1 / FPS, max_skip=Max_Frame_Skip, headroom=Pacing_Headroom):
+        """Initialize the FramePacer object.
+
+        Args:
+            budget (float, optional): Seconds a frame may take. Defaults to 1 / FPS.
+            max_skip (int, optional): The most frames skipped in a row. Defaults to Max_Frame_Skip.
+            headroom (float, optional): Share of the budget to fit before stepping back. Defaults to Pacing_Headroom.
+
+        """
+        self.budget = budget
+        self.max_skip = max_skip
+        self.headroom = headroom
+        self.level = 0
+        self.cost = 0.0
+        self.draw_cost = 0.0
+        self.frames = 0
+        self.drawn = 0
+        self.skipped = 0
+        self.shed = 0
+        self.changes = 0
+        self.drawing = True
+        self._start = 0.0
+        self._cycle = 0
+        self._slow = 0
+        self._fast = 0
+
+    @property
+    def mode(self):
+        """The pacing mode: 'full', 'shed' or 'skip'."""
+        return ('full', 'shed')[self.level] if self.level < 2 else 'skip'
+
+    @property
+    def skip(self):
+        """Frames simulated without drawing after every drawn frame."""
+        return max(0, self.level - 1)
+
+    @property
+    def shedding(self):
+        """Indicates whether the optional work is off."""
+        return self.level > 0
+
+    def begin(self):
+        """Start timing a frame and return True if it is to be drawn."""
+        self._start = time.perf_counter()
+        self.drawing = self._cycle == 0
+        self._cycle = (self._cycle + 1) % (self.skip + 1)
+        return self.drawing
+
+    def catch_up(self, max_steps):
+        """Return the simulation steps a frame may run, max_steps for every frame of the draw cycle."""
+        return max_steps * (self.skip + 1)
+
+    def end(self, draw_seconds=0.0, waited=0.0):
+        """Finish a frame, add its cost and adapt the mode.
+
+        Args:
+            draw_seconds (float, optional): Seconds the frame spent drawing and presenting. Defaults to 0.0.
+            waited (float, optional): Seconds blocked on vsync, left out of the cost. Defaults to 0.0.
+
+        """
+        cost = time.perf_counter() - self._start - waited
+        self.frames += 1
+        if self.drawing:
+            self.drawn += 1
+            self.draw_cost = self.draw_cost * 0.9 + draw_seconds * 0.1
+        else:
+            self.skipped += 1
+        if self.shedding:
+            self.shed += 1
+        self.cost = self.cost * 0.9 + cost * 0.1
+        self._adapt()
+
+    def _adapt(self):
+        """Step a level up after a quarter second over budget, or down after two seconds of headroom."""
+        if self.cost > self.budget:
+            self._fast = 0
+            self._slow += 1
+            if self._slow >= FPS // 4 and self.level < 1 + self.max_skip:
+                self._set(self.level + 1)
+            return
+        self._slow = 0
+        #the cost once every cycle draws one more frame
+        projected = self.cost
+        if self.skip:
+            projected += self.draw_cost * (1 / self.skip - 1 / (self.skip + 1))
+        self._fast = self._fast + 1 if projected < self.budget * self.headroom else 0
+        if self._fast >= FPS * 2 and self.level:
+            self._set(self.level - 1)
+
+    def _set(self, level):
+        """Switch to a pacing level and start its draw cycle with a drawn frame."""
+        self.level = level
+        self.changes += 1
+        self._cycle = 0
+        self._slow = self._fast = 0
+
+    def stats(self):
+        """Return the pacing metrics as a dict."""
+        return {'mode': self.mode, 'skip': self.skip, 'frames': self.frames, 'drawn': self.drawn,
+                'skipped': self.skipped, 'shed': self.shed, 'changes': self.changes,
+                'cost_ms': self.cost * 1000, 'draw_ms': self.draw_cost * 1000}
+
+def _stall(seconds):
+    """Keep the CPU busy for a number of seconds."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def bench(balls=100, slowdown=40.0, seconds=5.0):
+    """Play a game that draws too slowly with and without pacing and print how fast game time runs.
+
+    Args:
+        balls (int, optional): Balls served at once. Defaults to 100.
+        slowdown (float, optional): Draw as if on a machine this many times slower, by stretching
+            every draw with busy waiting. Defaults to 40.0.
+        seconds (float, optional): Wall time played per run. Defaults to 5.0.
+
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from main import Game
+    from headless import track_ball
+    from physics import FixedTimestep
+    pygame.init()
+    pygame.display.set_mode((Width, Height))
+    for paced in (False, True):
+        game = Game(seed=1, balls=balls)
+        pacer = FramePacer() if paced else None
+        timestep = FixedTimestep()
+        max_steps = timestep.max_steps
+        clock = pygame.time.Clock()
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            dt = clock.tick(FPS)
+            drawing = pacer.begin() if pacer else True
+            if pacer:
+                game.shed(pacer.shedding)
+                timestep.max_steps = pacer.catch_up(max_steps)
+            for _ in range(timestep.advance(dt / 1000)):
+                game.serve()
+                game.update(track_ball(game))
+            drawn = time.perf_counter()
+            if drawing:
+                game.alpha = timestep.alpha
+                game.draw()
+                game.present()
+                _stall((time.perf_counter() - drawn) * (slowdown - 1))
+            if pacer:
+                pacer.end(time.perf_counter() - drawn)
+        elapsed = time.perf_counter() - start
+        line = f'{"paced" if paced else "unpaced":<8} game time {game.frame / FPS / elapsed:5.2f}x real time, ' \
+               f'{timestep.dropped:5.2f} s dropped'
+        if pacer:
+            stats = pacer.stats()
+            line += (f", mode {stats['mode']} (skip {stats['skip']}), {stats['drawn']} drawn, "
+                     f"{stats['skipped']} skipped, {stats['changes']} mode changes")
+        print(line)
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 100, float(sys.argv[2]) if len(sys.argv) > 2 else 40.0,
+          float(sys.argv[3]) if len(sys.argv) > 3 else 5.0)
\ No newline at end of file
@@ -0,0 +1,103 @@
+import math
+from settings import *
+
+def sweep_circle_aabb(center, delta, radius, rect):
+    """Sweep a circle along delta against a rect and return the time of impact.
+
+    The rect is expanded by the radius on every side and the circle centre is
+    cast against it as a ray (slab method), so the corners are treated as
+    square. A circle that already overlaps the rect is not moved: it hits at
+    t = 0 with the normal of the nearest side when it moves into that side,
+    so the caller reflects its velocity out of the box, and misses otherwise.
+
+    Args:
+        center (tuple): The circle centre (x, y) at the start of the move.
+        delta (tuple): The displacement (dx, dy) over the whole move.
+        radius (float): The circle radius.
+        rect (Rect): The box to test against.
+
+    Returns:
+        tuple: (t, (nx, ny)) with t in [0, 1] as the fraction of delta travelled
+        before contact and the surface normal, or None when there is no hit.
+
+    """
+    left, right = rect.left - radius, rect.right + radius
+    top, bottom = rect.top - radius, rect.bottom + radius
+    if left < center[0] < right and top < center[1] < bottom:
+        #already overlapping: a hit at t = 0 on the nearest side's normal, only when moving into it
+        depth, normal = min((center[0] - left, (-1, 0)), (right - center[0], (1, 0)),
+                            (center[1] - top, (0, -1)), (bottom - center[1], (0, 1)))
+        if delta[0] * normal[0] + delta[1] * normal[1] < 0:
+            return 0.0, normal
+        return None
+
+    t_enter = -math.inf
+    t_exit = math.inf
+    normal = (0, 0)
+    for axis, low, high in ((0, left, right), (1, top, bottom)):
+        start, move = center[axis], delta[axis]
+        if move == 0:
+            if not low < start < high:
+                return None
+            continue
+        t_low = (low - start) / move
+        t_high = (high - start) / move
+        near, far = min(t_low, t_high), max(t_low, t_high)
+        if near > t_enter:
+            t_enter = near
+            normal = (-1 if move > 0 else 1, 0) if axis == 0 else (0, -1 if move > 0 else 1)
+        t_exit = min(t_exit, far)
+
+    if t_enter == -math.inf or t_enter > t_exit or t_exit <= 0 or t_enter > 1:
+        return None
+    return max(t_enter, 0.0), normal
+
+def lerp_rect(last, rect, alpha):
+    """Return the rect drawn a fraction alpha of the way from last to rect."""
+    return rect.move(round((last.x - rect.x) * (1 - alpha)), round((last.y - rect.y) * (1 - alpha)))
+
+class FixedTimestep:
+    """An accumulator that turns variable frame times into fixed simulation steps.
+
+    Attributes:
+        step (float): The simulation step in seconds.
+        max_steps (int): The most steps run for one frame, so a stall cannot spiral.
+        accumulator (float): Time not yet simulated, in seconds.
+        dropped (float): Time given up because frames needed more than max_steps, in seconds.
+
+    Methods:
+        advance(dt): Add a frame time and return the number of steps to run.
+        alpha: Fraction of a step between the last two simulated states.
+
+    """
+
+    def __init__(self, step=1 / FPS, max_steps=5):
+        """Initialize the FixedTimestep object.
+
+        Args:
+            step (float, optional): The simulation step in seconds. Defaults to 1 / FPS.
+            max_steps (int, optional): The most steps run for one frame. Defaults to 5.
+
+        """
+        self.step = step
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.dropped = 0.0
+
+    def advance(self, dt):
+        """Add the real time of a frame and return the number of steps to simulate."""
+        self.accumulator += dt
+        steps = int(self.accumulator // self.step)
+        if steps > self.max_steps:
+            #drop the time we cannot catch up with
+            steps = self.max_steps
+            self.dropped += self.accumulator - steps * self.step
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.step
+        return steps
+
+    @property
+    def alpha(self):
+        """Fraction of a step between the last two simulated states, for render interpolation."""
+        return min(self.accumulator / self.step, 1.0)
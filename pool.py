@@ -0,0 +1,58 @@
+class SpritePool:
+    """A pool of reusable sprites of one class.
+
+    acquire() hands out a free sprite re-initialised through its reset()
+    method, which takes the same arguments as the constructor, and only
+    creates a new sprite when the pool is empty. Pooled sprites call
+    release() from kill(), so a long session allocates no more sprites than
+    were ever alive at once.
+
+    Attributes:
+        cls (type): The sprite class.
+        free (list): Sprites ready for reuse.
+        in_use (int): Sprites handed out and not yet released.
+        high_water (int): The most sprites ever in use at once.
+        created (int): Sprites constructed by the pool.
+
+    Methods:
+        acquire(*args): Return a sprite reset with args.
+        release(sprite): Put a killed sprite back into the pool.
+        stats(): Return the pool size and high-water mark.
+
+    """
+
+    def __init__(self, cls):
+        """Initialize the SpritePool object.
+
+        Args:
+            cls (type): The sprite class, with a reset() matching its constructor.
+
+        """
+        self.cls = cls
+        self.free = []
+        self.in_use = 0
+        self.high_water = 0
+        self.created = 0
+
+    def acquire(self, *args):
+        """Return a sprite initialised with args, reusing a free one when possible."""
+        if self.free:
+            sprite = self.free.pop()
+            sprite.reset(*args)
+        else:
+            sprite = self.cls(*args)
+            sprite.pool = self
+            self.created += 1
+        self.in_use += 1
+        self.high_water = max(self.high_water, self.in_use)
+        return sprite
+
+    def release(self, sprite):
+        """Put a killed sprite back into the pool."""
+        self.in_use -= 1
+        self.free.append(sprite)
+
+    def stats(self):
+        """Return the pool size, usage and high-water mark as a dict."""
+        return {'size': self.in_use + len(self.free), 'in_use': self.in_use,
+                'high_water': self.high_water, 'created': self.created}
@@ -0,0 +1,272 @@
+import gc
+import sys
+import json
+import time
+import tracemalloc
+from array import array
+import pygame
+
+class FrameProfiler:
+    """A low overhead per-phase frame timer backed by ring buffers.
+
+    The game calls frame() once at the start of every frame and lap(name) at
+    the end of every phase; the time since the previous lap is added to that
+    phase. Each phase keeps the durations of the last size frames. While
+    disabled, frame() and lap() return at once.
+
+    Attributes:
+        enabled (bool): Indicates whether frames are being timed.
+        show (bool): Indicates whether the HUD overlay is drawn.
+        size (int): The number of frames kept.
+        phases (dict): Durations in seconds per phase name, in first-lap order.
+        starts (array): Start time of every frame in the ring.
+        count (int): The number of frames started.
+
+    Methods:
+        frame(): Start timing a new frame.
+        lap(name): Add the time since the last lap to a phase.
+        stats(): Return p50/p95/p99 per phase.
+        overlay(font): Return the HUD surface.
+        export_csv(path): Write the frames as CSV.
+        export_trace(path): Write the frames as Chrome trace JSON.
+        export(path): Write CSV or trace JSON depending on the file extension.
+
+    """
+
+    def __init__(self, size=600):
+        """Initialize the FrameProfiler object.
+
+        Args:
+            size (int, optional): The number of frames kept. Defaults to 600 (ten seconds).
+
+        """
+        self.enabled = False
+        self.show = False
+        self.size = size
+        self.phases = {}
+        self.starts = array('d', bytes(8 * size))
+        self.count = 0
+        self._last = 0.0
+        self._hud = None
+        self._hud_frame = 0
+
+    def frame(self):
+        """Start timing a new frame."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.count += 1
+        i = self.count % self.size
+        self.starts[i] = now
+        for durations in self.phases.values():
+            durations[i] = 0.0
+        self._last = now
+
+    def lap(self, name):
+        """Add the time since the last lap (or the frame start) to a phase."""
+        if not self.enabled or not self.count:
+            return
+        now = time.perf_counter()
+        durations = self.phases.get(name)
+        if durations is None:
+            durations = self.phases[name] = array('d', bytes(8 * self.size))
+        durations[self.count % self.size] += now - self._last
+        self._last = now
+
+    def frames(self):
+        """Return the ring indices of the completed frames, oldest first."""
+        done = min(self.count - 1, self.size - 1)
+        return [(self.count - done + k) % self.size for k in range(done)]
+
+    def stats(self):
+        """Return {phase: (p50, p95, p99)} in milliseconds, with 'frame' for the totals."""
+        indices = self.frames()
+        if not indices:
+            return {}
+        columns = {name: [durations[i] for i in indices] for name, durations in self.phases.items()}
+        columns['frame'] = [sum(values) for values in zip(*columns.values())]
+        result = {}
+        for name, values in columns.items():
+            values.sort()
+            pick = lambda p: values[int(p * (len(values) - 1))] * 1000
+            result[name] = (pick(0.50), pick(0.95), pick(0.99))
+        return result
+
+    def overlay(self, font, refresh=True):
+        """Return the HUD surface, re-rendered twice a second unless refresh is False."""
+        if self._hud is None or refresh and self.count - self._hud_frame >= 30:
+            self._hud_frame = self.count
+            lines = [f'{"phase":<16}{"p50":>7}{"p95":>7}{"p99":>7} ms']
+            for name, (p50, p95, p99) in self.stats().items():
+                lines.append(f'{name:<16}{p50:7.2f}{p95:7.2f}{p99:7.2f}')
+            height = font.get_linesize()
+            width = max(font.size(line)[0] for line in lines)
+            self._hud = pygame.Surface((width + 8, height * len(lines) + 8))
+            self._hud.fill((20, 20, 20))
+            for row, line in enumerate(lines):
+                self._hud.blit(font.render(line, True, (230, 230, 230)), (4, 4 + row * height))
+        return self._hud
+
+    def export_csv(self, path):
+        """Write one row per completed frame with the phase durations in ms."""
+        names = list(self.phases)
+        with open(path, 'w') as file:
+            file.write(','.join(['start_ms'] + names + ['frame']) + '\n')
+            for i in self.frames():
+                values = [self.phases[name][i] * 1000 for name in names]
+                file.write(','.join(f'{value:.4f}' for value in [self.starts[i] * 1000] + values + [sum(values)]) + '\n')
+
+    def export_trace(self, path):
+        """Write the completed frames as Chrome trace JSON (chrome://tracing, Perfetto)."""
+        events = []
+        for i in self.frames():
+            start = self.starts[i] * 1e6
+            events.append({'name': 'frame', 'ph': 'X', 'ts': start, 'pid': 1, 'tid': 1,
+                           'dur': sum(durations[i] for durations in self.phases.values()) * 1e6})
+            #phases are contiguous laps, in the order they first appeared
+            for name, durations in self.phases.items():
+                if durations[i]:
+                    events.append({'name': name, 'ph': 'X', 'ts': start, 'dur': durations[i] * 1e6, 'pid': 1, 'tid': 2})
+                start += durations[i] * 1e6
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+    def export(self, path):
+        """Write CSV for a .csv path and Chrome trace JSON otherwise."""
+        if path.endswith('.csv'):
+            self.export_csv(path)
+        else:
+            self.export_trace(path)
+
+class AllocationProfiler(FrameProfiler):
+    """A FrameProfiler that also measures memory per phase and garbage collections per frame.
+
+    Every lap records two numbers for its phase besides the time: the bytes
+    the phase had allocated at its peak (tracemalloc's peak above the lap
+    start, so short-lived garbage counts even though it is freed again) and
+    the net change in allocated memory blocks (objects kept minus objects
+    freed). A gc callback adds the collections and their pause time to the
+    frame they happen in. Tracing starts with the first timed frame and
+    slows the game down, so frame times are only comparable between runs
+    with allocation profiling.
+
+    Attributes:
+        allocated (dict): Peak bytes allocated per phase name, per frame in the ring.
+        blocks (dict): Net memory blocks per phase name, per frame in the ring.
+        collections (array): Garbage collections per frame in the ring.
+        pauses (array): Seconds spent in garbage collections per frame in the ring.
+        generations (array): Collections per generation since tracing started.
+
+    Methods:
+        allocation_stats(): Return the means per frame of every phase and the gc totals.
+        report(): Return the allocation stats as text.
+        close(): Stop tracing.
+
+    """
+
+    def __init__(self, size=600):
+        """Initialize the AllocationProfiler object.
+
+        Args:
+            size (int, optional): The number of frames kept. Defaults to 600 (ten seconds).
+
+        """
+        super().__init__(size)
+        self.allocated = {}
+        self.blocks = {}
+        self.collections = array('i', bytes(4 * size))
+        self.pauses = array('d', bytes(8 * size))
+        self.generations = [0, 0, 0]
+        self._blocks = 0
+        self._gc_start = 0.0
+
+    def _collected(self, phase, info):
+        """gc callback: time every collection and count it in the current frame."""
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+        elif self.count:
+            i = self.count % self.size
+            self.collections[i] += 1
+            self.pauses[i] += time.perf_counter() - self._gc_start
+            self.generations[info['generation']] += 1
+
+    def frame(self):
+        """Start timing and measuring a new frame, starting the tracing on the first one."""
+        if not self.enabled:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            gc.callbacks.append(self._collected)
+        super().frame()
+        i = self.count % self.size
+        for values in (*self.allocated.values(), *self.blocks.values()):
+            values[i] = 0
+        self.collections[i] = 0
+        self.pauses[i] = 0.0
+        del i
+        tracemalloc.reset_peak()
+        self._blocks = sys.getallocatedblocks()
+        self._last = time.perf_counter()
+
+    def lap(self, name):
+        """Add the time, peak bytes and net blocks since the last lap to a phase."""
+        if not self.enabled or not self.count:
+            return
+        #blocks first, before the readings below create objects of their own
+        blocks = sys.getallocatedblocks()
+        current, peak = tracemalloc.get_traced_memory()
+        now = time.perf_counter()
+        durations = self.phases.get(name)
+        if durations is None:
+            durations = self.phases[name] = array('d', bytes(8 * self.size))
+            self.allocated[name] = array('q', bytes(8 * self.size))
+            self.blocks[name] = array('q', bytes(8 * self.size))
+        i = self.count % self.size
+        durations[i] += now - self._last
+        self.allocated[name][i] += peak - current
+        self.blocks[name][i] += blocks - self._blocks
+        #the bookkeeping above is left out of the next phase's memory and time
+        del now, current, peak, blocks, durations, i
+        tracemalloc.reset_peak()
+        self._blocks = sys.getallocatedblocks()
+        self._last = time.perf_counter()
+
+    def allocation_stats(self):
+        """Return per frame means over the completed frames.
+
+        Returns:
+            dict: {phase: (peak bytes, net blocks)} with 'frame' for the totals, and 'gc' for
+            (collections, pause ms) per frame.
+
+        """
+        indices = self.frames()
+        if not indices:
+            return {}
+        result = {name: (sum(self.allocated[name][i] for i in indices) / len(indices),
+                         sum(self.blocks[name][i] for i in indices) / len(indices)) for name in self.phases}
+        result['frame'] = (sum(value[0] for value in result.values()), sum(value[1] for value in result.values()))
+        result['gc'] = (sum(self.collections[i] for i in indices) / len(indices),
+                        sum(self.pauses[i] for i in indices) / len(indices) * 1000)
+        return result
+
+    def report(self):
+        """Return the allocation stats as a table."""
+        stats = self.allocation_stats()
+        if not stats:
+            return 'no frames profiled'
+        collections, pause = stats.pop('gc')
+        indices = self.frames()
+        lines = [f'{"phase":<20}{"bytes/frame":>12}{"blocks/frame":>14}']
+        for name, (allocated, blocks) in stats.items():
+            lines.append(f'{name:<20}{allocated:12.0f}{blocks:14.2f}')
+        lines.append(f'gc: {collections * 1000:.1f} collections per 1000 frames, {pause:.3f} ms per frame, '
+                     f'longest frame pause {max(self.pauses[i] for i in indices) * 1000:.2f} ms, '
+                     f'generations {self.generations}')
+        return '\n'.join(lines)
+
+    def close(self):
+        """Stop tracing and remove the gc callback."""
+        if self._collected in gc.callbacks:
+            gc.callbacks.remove(self._collected)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
\ No newline at end of file
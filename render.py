@@ -0,0 +1,368 @@
+import time
+from fractions import Fraction
+import pygame
+from settings import *
+
+def merge_rects(rects):
+    """Union overlapping rects so no pixel is pushed twice."""
+    merged = []
+    for rect in rects:
+        rect = rect.clip(pygame.Rect(0, 0, Width, Height))
+        if not rect.width or not rect.height:
+            continue
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+class BlockLayer:
+    """The background with every live block pre-rendered into one surface.
+
+    The block field only changes when a block is damaged or removed, so the
+    layer is composed once and afterwards only the tiles reported in
+    BlockGroup.changed are patched. A frame then starts with a single blit of
+    the layer instead of a background blit plus one blit per block.
+
+    Attributes:
+        background (Surface): The background image.
+        blocks (BlockGroup): The blocks drawn into the layer.
+        surface (Surface): The composed layer, opaque and screen sized.
+
+    Methods:
+        patch(rect): Recompose the layer inside a rect.
+        update(): Patch every block changed since the last update.
+
+    """
+
+    def __init__(self, background, blocks):
+        """Initialize the BlockLayer object.
+
+        Args:
+            background (Surface): The background image.
+            blocks (BlockGroup): The blocks drawn into the layer.
+
+        """
+        self.background = background
+        self.blocks = blocks
+        self.surface = pygame.Surface((Width, Height)).convert()
+
+        #ask the block group to report damaged and removed blocks
+        blocks.changed = []
+        self.patch(self.surface.get_rect())
+
+    def patch(self, rect):
+        """Recompose the background and the blocks inside a rect."""
+        self.surface.set_clip(rect)
+        self.surface.blit(self.background, rect, rect)
+        for block in self.blocks.collide(rect):
+            self.surface.blit(block.image, block.rect)
+        self.surface.set_clip(None)
+
+    def update(self):
+        """Patch every block changed since the last update and return the patched rects."""
+        rects = merge_rects(self.blocks.changed)
+        self.blocks.changed.clear()
+        for rect in rects:
+            self.patch(rect)
+        return rects
+
+class DirtyRenderer:
+    """A renderer that redraws only the screen regions that changed.
+
+    The block layer, the hearts and the status line are static between hits,
+    so they are only restored under the regions the moving sprites (paddle,
+    ball, lasers and upgrades) left or entered, under damaged or removed
+    blocks, under the hearts when their number changes and under the status
+    line when it was recomposed.
+
+    Attributes:
+        game (Game): The game being drawn.
+        screen (Surface): The display surface.
+        layer (BlockLayer): The cached background and blocks.
+        last (list): Rects drawn by moving sprites in the previous frame.
+        rects (list): Regions changed in the current frame.
+        pixels (int): Pixels pushed to the display by the last flush.
+        full (bool): Indicates whether the next frame must redraw the whole screen.
+
+    Methods:
+        restore(rect): Redraw the static layers inside a rect.
+        draw(): Draw the changed regions of the current frame.
+        overlay(surf, rect): Show a message on top of the background.
+        flush(): Return the changed regions for pygame.display.update.
+
+    """
+
+    def __init__(self, game, layer):
+        """Initialize the DirtyRenderer object.
+
+        Args:
+            game (Game): The game being drawn.
+            layer (BlockLayer): The cached background and blocks.
+
+        """
+        self.game = game
+        self.screen = game.screen
+        self.layer = layer
+        self.last = []
+        self.rects = []
+        self.pixels = 0
+        self.full = True
+        self.hearts = None
+        self.shown = None
+
+    def hearts_rect(self, hearts):
+        """Return the rect covered by a number of hearts."""
+        heart_w, heart_h = self.game.heart_surf.get_size()
+        return pygame.Rect(5, 5, hearts * (heart_w + 2), heart_h)
+
+    def restore(self, rect):
+        """Redraw the block layer, the hearts and the status line inside a rect."""
+        self.screen.set_clip(rect)
+        self.screen.blit(self.layer.surface, rect, rect)
+        if rect.colliderect(self.hearts_rect(self.game.player.sprite.hearts)):
+            self.game.display_hearts()
+        if self.game.hud and rect.colliderect(self.game.hud.rect):
+            self.game.hud.draw(self.screen)
+        self.screen.set_clip(None)
+        self.rects.append(rect)
+
+    def draw(self):
+        """Draw the changed regions of the current frame."""
+        game = self.game
+        changed = self.layer.update()
+        hearts = game.player.sprite.hearts
+
+        if self.full:
+            #back in play after a message, for example rewound out of a game over
+            self.full = False
+            self.shown = None
+            self.restore(self.screen.get_rect())
+        else:
+            for rect in merge_rects(self.last + changed):
+                self.restore(rect)
+            if hearts != self.hearts:
+                self.restore(self.hearts_rect(max(hearts, self.hearts)))
+        self.hearts = hearts
+        hud = game.hud
+        if hud and hud.damaged:
+            self.restore(hud.damaged)
+            hud.damaged = None
+
+        #moving sprites, drawn every frame in the order of Game.draw
+        self.last = []
+        for group in (game.upgrade_sprites, game.player, game.ball, game.player.sprite.lasers_grp):
+            for sprite in group:
+                rect = sprite.render_rect(game.alpha) if hasattr(sprite, 'render_rect') else sprite.rect.copy()
+                self.screen.blit(sprite.image, rect)
+                self.last.append(rect)
+        if game.particles:
+            rect = game.particles.draw(self.screen)
+            if rect:
+                self.last.append(rect)
+        self.rects.extend(self.last)
+
+        #the status line stays on top of the sprites crossing it
+        if hud and hud.rect.collidelist(self.last) != -1:
+            hud.draw(self.screen)
+
+    def overlay(self, surf, rect):
+        """Show a message such as Game Over on top of the bare background."""
+        if self.shown is not surf:
+            self.shown = surf
+            self.screen.blit(self.layer.background, (0, 0))
+            self.screen.blit(surf, rect)
+            self.rects.append(self.screen.get_rect())
+            self.last = []
+            self.full = True
+
+    def flush(self):
+        """Return the changed regions of this frame for pygame.display.update."""
+        rects = merge_rects(self.rects)
+        self.rects = []
+        self.pixels = sum(rect.width * rect.height for rect in rects)
+        return rects
+
+class ScaledRenderer:
+    """A renderer that composes each frame on a smaller canvas and upscales it once.
+
+    The block layer, hearts and moving sprites are drawn at canvas scale, from
+    copies of their images shrunk once and cached, and the finished canvas is
+    stretched into the window with a single scale (or smoothscale) per frame,
+    so the blits of a frame touch scale**2 of the pixels. At scale 1 the frame
+    is drawn straight into the window, exactly like the full-screen path.
+
+    With a budget set the scale is dynamic: when drawing takes longer than the
+    budget for a run of frames the canvas steps down through Render_Scales, and
+    it steps back up after a longer run well inside the budget. The average
+    draw time of every scale tried is kept, so the canvas does not stay small
+    where the upscale costs more than the smaller canvas saves.
+
+    Attributes:
+        game (Game): The game being drawn.
+        screen (Surface): The display surface.
+        layer (BlockLayer): The full-size background and blocks.
+        scale (float): The current canvas scale.
+        canvas (Surface): The surface frames are composed on, the screen at scale 1.
+        smooth (bool): Indicates whether the upscale filters instead of repeating pixels.
+        budget (float): Seconds drawing may take per frame, None for a fixed scale.
+        costs (dict): Average seconds to draw a frame per scale tried.
+        rects (list): Regions drawn on the screen besides the frame, like the profiler HUD.
+        pixels (int): Pixels pushed to the display by the last flush.
+
+    Methods:
+        set_scale(scale): Switch to another canvas scale.
+        image(surf): Return a surface shrunk to the canvas scale.
+        draw(): Compose the frame on the canvas and upscale it to the screen.
+        overlay(surf, rect): Show a message on top of the background.
+        restore(rect): Nothing to do, every frame is redrawn in full.
+        flush(): Return the screen rect for pygame.display.update.
+
+    """
+
+    def __init__(self, game, layer, scale=0.5, smooth=False, budget=None):
+        """Initialize the ScaledRenderer object.
+
+        Args:
+            game (Game): The game being drawn.
+            layer (BlockLayer): The cached background and blocks.
+            scale (float, optional): The canvas scale, at most 1. Defaults to 0.5.
+            smooth (bool, optional): Filter the upscale with smoothscale. Defaults to False.
+            budget (float, optional): Seconds drawing may take per frame before the scale
+                drops. Defaults to None for a fixed scale.
+
+        """
+        self.game = game
+        self.screen = game.screen
+        self.layer = layer
+        self.smooth = smooth
+        self.budget = budget
+        self.rects = []
+        self.pixels = 0
+        self.costs = {}
+        self.slow = 0
+        self.fast = 0
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        """Switch to another canvas scale and rebuild the scaled layer."""
+        if not 0 < scale <= 1:
+            raise ValueError('the canvas scale goes from 0 to 1')
+        #layer patches are aligned to a grid that maps to whole canvas pixels
+        self.align = Fraction(scale).limit_denominator(64).denominator
+        if Width % self.align or Height % self.align:
+            raise ValueError(f'a canvas scale of {scale} does not divide the window into whole pixels')
+        self.scale = scale
+        self.images = {}
+        if scale == 1:
+            self.canvas = self.screen
+            self.small = self.layer.surface
+        else:
+            self.canvas = pygame.Surface((round(Width * scale), round(Height * scale))).convert()
+            self.small = pygame.transform.smoothscale(self.layer.surface, self.canvas.get_size())
+
+    def image(self, surf):
+        """Return surf shrunk to the canvas scale, cached per surface."""
+        scaled = self.images.get(surf)
+        if scaled is None:
+            if self.scale == 1:
+                scaled = surf
+            else:
+                width, height = surf.get_size()
+                scaled = pygame.transform.smoothscale(surf, (max(1, round(width * self.scale)),
+                                                             max(1, round(height * self.scale))))
+            self.images[surf] = scaled
+        return scaled
+
+    def to_canvas(self, rect):
+        """Return the canvas position of a screen position or rect."""
+        return (round(rect[0] * self.scale), round(rect[1] * self.scale))
+
+    def patch(self, rect):
+        """Shrink a patched region of the block layer into the scaled layer."""
+        left = rect.left // self.align * self.align
+        top = rect.top // self.align * self.align
+        right = min(-(-rect.right // self.align) * self.align, Width)
+        bottom = min(-(-rect.bottom // self.align) * self.align, Height)
+        region = pygame.Rect(left, top, right - left, bottom - top)
+        size = (round(region.width * self.scale), round(region.height * self.scale))
+        self.small.blit(pygame.transform.smoothscale(self.layer.surface.subsurface(region), size),
+                        self.to_canvas(region))
+
+    def draw(self):
+        """Compose the frame on the canvas and upscale it to the screen."""
+        start = time.perf_counter()
+        game = self.game
+        for rect in self.layer.update():
+            if self.scale != 1:
+                self.patch(rect)
+        canvas = self.canvas
+        canvas.blit(self.small, (0, 0))
+
+        #hearts and moving sprites, in the order of Game.draw
+        heart = self.image(game.heart_surf)
+        heart_width = game.heart_surf.get_width()
+        for i in range(game.player.sprite.hearts):
+            canvas.blit(heart, self.to_canvas((i * (heart_width + 2) + 5, 5)))
+        for group in (game.upgrade_sprites, game.player, game.ball, game.player.sprite.lasers_grp):
+            for sprite in group:
+                rect = sprite.render_rect(game.alpha) if hasattr(sprite, 'render_rect') else sprite.rect
+                canvas.blit(self.image(sprite.image), self.to_canvas(rect))
+
+        if game.particles:
+            game.particles.draw(canvas, self.scale)
+
+        #the one upscale of the frame
+        if self.scale != 1:
+            if self.smooth:
+                pygame.transform.smoothscale(canvas, (Width, Height), self.screen)
+            else:
+                pygame.transform.scale(canvas, (Width, Height), self.screen)
+        #the status line goes on the screen at full size, sharp at any canvas scale
+        if game.hud:
+            game.hud.draw(self.screen)
+        if self.budget:
+            self.adapt(time.perf_counter() - start)
+
+    def adapt(self, seconds):
+        """Step the canvas scale down or up from the time the last frame took to draw."""
+        scales = sorted(set(Render_Scales) | {self.scale}, reverse=True)
+        level = scales.index(self.scale)
+        cost = self.costs[self.scale] = self.costs.get(self.scale, seconds) * 0.9 + seconds * 0.1
+        if seconds > self.budget:
+            self.slow += 1
+            self.fast = 0
+        elif seconds < self.budget / 2:
+            self.fast += 1
+            self.slow = 0
+        else:
+            self.slow = self.fast = 0
+
+        #drop quickly when over budget, come back slowly so the scale does not flicker
+        if self.slow >= FPS // 4:
+            self.slow = 0
+            if level + 1 < len(scales) and scales[level + 1] not in self.costs:
+                self.set_scale(scales[level + 1])
+            else:
+                #every smaller canvas was tried, settle on the one that drew fastest
+                best = min(self.costs, key=self.costs.get)
+                if self.costs[best] < cost:
+                    self.set_scale(best)
+        elif self.fast >= FPS * 2 and level > 0:
+            self.set_scale(scales[level - 1])
+            self.fast = 0
+
+    def overlay(self, surf, rect):
+        """Show a message such as Game Over on top of the full-size background."""
+        self.screen.blit(self.layer.background, (0, 0))
+        self.screen.blit(surf, rect)
+
+    def restore(self, rect):
+        """Do nothing: the next frame redraws the whole screen anyway."""
+
+    def flush(self):
+        """Return the screen rect for pygame.display.update."""
+        self.rects = []
+        self.pixels = Width * Height
+        return [self.screen.get_rect()]
\ No newline at end of file
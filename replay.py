@@ -0,0 +1,180 @@
+"""Deterministic recording and replay of Breakout games.
+
+A log starts with a header (magic, version, seed, FPS) followed by one
+8-byte record per rendered frame: the frame time in ms, the number of
+simulation steps, an input byte (paddle direction and serve) and a CRC32 of
+the game state after the frame. Replays rebuild the board from the seed and
+re-run the steps headless as fast as possible, checking the state hash of
+every frame.
+
+Usage:
+    python main.py --record game.brk
+    python replay.py game.brk [frame]
+"""
+import sys
+import time
+import struct
+from settings import *
+
+MAGIC = b'BRKLOG'
+VERSION = 1
+HEADER = struct.Struct('<6sBQH')
+FRAME = struct.Struct('<HBBI')
+SERVE = 4
+
+class ReplayDivergence(Exception):
+    """Raised when a replayed frame does not reproduce the recorded state."""
+
+    def __init__(self, frame, expected, actual):
+        super().__init__(f'replay diverged at frame {frame}: state {actual:08x}, recorded {expected:08x}')
+        self.frame = frame
+        self.expected = expected
+        self.actual = actual
+
+def pack_input(direction, serve):
+    """Pack a paddle direction (-1, 0 or 1) and the serve flag into one byte."""
+    return (direction + 1) | (SERVE if serve else 0)
+
+def unpack_input(byte):
+    """Return the (direction, serve) packed by pack_input."""
+    return (byte & 3) - 1, bool(byte & SERVE)
+
+class Recorder:
+    """Writes the seed and the per-frame input and timing of a game to a log.
+
+    Attributes:
+        file (file): The log file.
+        frames (int): Frames recorded so far.
+
+    Methods:
+        record(dt, steps, direction, serve, state): Append one frame.
+        close(): Flush and close the log.
+
+    """
+
+    def __init__(self, path, seed):
+        """Initialize the Recorder object.
+
+        Args:
+            path (str): The log file to write.
+            seed (int): The seed the game was created with.
+
+        """
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, FPS))
+        self.frames = 0
+
+    def record(self, dt, steps, direction, serve, state):
+        """Append one rendered frame.
+
+        Args:
+            dt (int): The frame time in milliseconds.
+            steps (int): The simulation steps run for the frame.
+            direction (int): The paddle direction used for those steps.
+            serve (bool): Indicates whether the ball was launched this frame.
+            state (int): Game.state_hash() after the steps.
+
+        """
+        self.file.write(FRAME.pack(min(dt, 0xFFFF), steps, pack_input(direction, serve), state))
+        self.frames += 1
+
+    def close(self):
+        """Flush and close the log."""
+        self.file.close()
+
+class Replay:
+    """Re-runs a recorded game headless and checks it frame by frame.
+
+    Attributes:
+        seed (int): The seed of the recorded game.
+        fps (int): The simulation rate the game was recorded at.
+        frames (list): (dt, steps, input, state) per recorded frame.
+        game (Game): The headless game being replayed.
+        frame (int): The next recorded frame to replay.
+
+    Methods:
+        restart(): Start the replay over from the first frame.
+        step(): Replay one recorded frame.
+        seek(frame): Fast-forward (or restart and fast-forward) to a frame.
+        run(): Replay every frame and return timing stats.
+
+    """
+
+    def __init__(self, path):
+        """Initialize the Replay object.
+
+        Args:
+            path (str): The log file to read.
+
+        """
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, self.seed, self.fps = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} Breakout log')
+        if self.fps != FPS:
+            raise ValueError(f'{path} was recorded at {self.fps} steps per second, settings use {FPS}')
+        #a log cut short by a crash ends with a partial record
+        body = data[HEADER.size:]
+        body = body[:len(body) - len(body) % FRAME.size]
+        self.frames = list(FRAME.iter_unpack(body))
+        self.game = None
+        self.restart()
+
+    def restart(self):
+        """Start the replay over from the first frame."""
+        from main import Game
+        self.game = Game(headless=True, seed=self.seed)
+        self.frame = 0
+
+    def step(self):
+        """Replay one recorded frame and check its state hash."""
+        dt, steps, byte, expected = self.frames[self.frame]
+        direction, serve = unpack_input(byte)
+        if serve:
+            self.game.serve()
+        for _ in range(steps):
+            self.game.update(direction)
+        actual = self.game.state_hash()
+        if actual != expected:
+            raise ReplayDivergence(self.frame, expected, actual)
+        self.frame += 1
+
+    def seek(self, frame):
+        """Fast-forward to a frame, restarting first when it lies behind the current one."""
+        frame = min(frame, len(self.frames))
+        if frame < self.frame:
+            self.restart()
+        while self.frame < frame:
+            self.step()
+
+    def run(self):
+        """Replay every remaining frame and return timing stats."""
+        start = time.perf_counter()
+        first_step = self.game.frame
+        self.seek(len(self.frames))
+        elapsed = time.perf_counter() - start
+        steps = self.game.frame - first_step
+        return {
+            'frames': len(self.frames),
+            'steps': steps,
+            'recorded_seconds': sum(record[0] for record in self.frames) / 1000,
+            'seconds': elapsed,
+            'speedup': steps / FPS / elapsed if elapsed else float('inf'),
+        }
+
+if __name__ == '__main__':
+    replay = Replay(sys.argv[1])
+    try:
+        if len(sys.argv) > 2:
+            replay.seek(int(sys.argv[2]))
+            game = replay.game
+            print(f'frame {replay.frame}: hearts={game.player.sprite.hearts} blocks={len(game.block_grp)} '
+                  f'ball={tuple(game.ball.sprite.rect)}')
+        else:
+            stats = replay.run()
+            print(f"replayed {stats['frames']} frames ({stats['steps']} steps, {stats['recorded_seconds']:.1f} s of play) "
+                  f"in {stats['seconds']:.2f} s, {stats['speedup']:.0f}x real time")
+    except ReplayDivergence as error:
+        print(error)
+        sys.exit(1)
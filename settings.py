@@ -2,6 +2,7 @@ import random
 
 Width = 1280
 Height = 800 
+FPS = 60
 Scale_Fac = (Width - 3 * 9)/(384 * 10) #for scaling blocks
 Upgrade_Scale = 0.09 * Width/485
 Top_Offset = 25  #top offset for blocks
@@ -9,28 +10,62 @@ Block_Offset = 3  #Horizontal block offset
 Block_Size = [Scale_Fac*384, Scale_Fac*128] 
 Ball_Scale = 0.25
 Ball_Radius = Ball_Scale * 128 / 2
+Paddle_Y = Height - 50  #paddle centre; its tile is as tall as a block tile
 Heart_Scale = 0.15
 Damage = 50
+Swept_Collision = True  #swept ball collisions, False for the original overlap tests
+Compact_Blocks = True  #array backed BlockField, False for one Block sprite per block
 Drop_prob = 7
 
 Block_Type = { 2 : '01', 1 : '02', 4 : '03', 3 : '04', 6 : '05', 5 :'06', 8 : '07', 7 : '08', 10 : '09', 9 : '10' , 
               12 : '11', 11 : '12',  14 : '13', 13 : '14', 16 : '15', 15 : '16', 18 : '17', 17 : '18',  20 : '19', 19 : '20'}
 
-Upgrade_Type = { 'slow' : 41, 'fast' : 42, 'laser' : 53, 'heart' : 60}
-
-#creating a shape for block display
-Shape = []
-for i in range(5):
-    l_1 = []
-    l_2 = []
-    for j in range(10):
-        l_1.append(5 - i)
-        l_2.append(5 - i)
-    Shape.append(l_1)
-    Shape.append(l_2)
-
-#adding random blocks of different colors in each row
-for i in range(5):
-    Shape[2*i+1][random.randint(0,7)] = 5 + (5- i)
+Upgrade_Type = { 'slow' : 41, 'fast' : 42, 'laser' : 53, 'heart' : 60, 'multi' : 43}
+#upgrades blocks drop unless a level has its own drops table
+Default_Drops = ['slow', 'fast', 'laser', 'heart']
+Multi_Ball = 2  #balls added for every ball in play by a multi upgrade
+Max_Balls = 500
+Asset_Bundle = 'PNG/assets.bundle'  #pre-scaled tiles, built with python assets.py
+Render_Scales = (1.0, 0.75, 0.5)  #canvas scales dynamic resolution steps through
+Spectator_Port = 5790  #default port of python main.py --spectate and spectator.py view
+Render_Budget = 0.5  #share of a frame drawing may take before dynamic resolution lowers the canvas
+Capture_Slots = 8  #frame buffers in the capture ring
+Capture_Level = 1  #zlib level of captured PNG frames
+Particles = True  #block hit and kill effects, they need NumPy
+Particle_Cap = 4000
+Particle_Budget = 2  #ms per frame for moving and drawing particles before effects are thinned out
+Particle_Size = 2
+Particle_Gravity = 0.15
+Spark_Count = 6  #particles per block hit
+Debris_Count = 24  #particles per destroyed block
+Rewind_Seconds = 10  #seconds of play kept for rewinding with Backspace
+Rewind_Speed = 2  #recorded frames stepped back per frame while rewinding
+Memcheck_Warmup = 300  #frames played before memcheck.py measures allocations
+Memcheck_Tolerance = 0.1  #growth in bytes per frame memcheck.py accepts over its baseline
+Frame_Pacing = True  #shed effects and skip drawing frames while the game loop falls behind
+Max_Frame_Skip = 3  #the most frames simulated without drawing between two drawn ones
+Pacing_Headroom = 0.75  #share of a frame the cost must fit in before pacing steps back
+Hud_Font_Size = 24
+Hud_Color = (230, 230, 230)
+Score_Per_Hit = 10  #points for every Damage dealt to a block
+
+def make_shape(rng=random):
+    """Create a shape for block display, using rng for the random blocks."""
+    shape = []
+    for i in range(5):
+        l_1 = []
+        l_2 = []
+        for j in range(10):
+            l_1.append(5 - i)
+            l_2.append(5 - i)
+        shape.append(l_1)
+        shape.append(l_2)
+
+    #adding random blocks of different colors in each row
+    for i in range(5):
+        shape[2*i+1][rng.randint(0,7)] = 5 + (5- i)
+    return shape
+
+Shape = make_shape()
 
 
@@ -0,0 +1,249 @@
+"""Snapshots of the simulation state and an in-memory rewind buffer.
+
+snapshot(game) packs everything the simulation reads into one bytes blob:
+the frame count, the player (position, speed, hearts and laser state), every
+ball, the falling upgrades, the flying lasers and the health, tile and live
+flag of every block. No surfaces are stored; images come back from the
+texture cache on restore. The board layout, drops and settings are not
+stored either, so a snapshot restores into the game it was taken from or a
+game created with the same seed and level, and the game then plays on
+exactly as it did (the state hash matches frame for frame).
+
+RewindBuffer keeps the snapshots of the last Rewind_Seconds of play in a
+ring, so jumping back is a single restore.
+
+Usage:
+    python snapshot.py [frames]
+"""
+import sys
+import struct
+from array import array
+from collections import deque
+import pygame
+from settings import *
+from assets import tiles
+
+MAGIC = b'BRKS'
+VERSION = 1
+HEADER = struct.Struct('<4sBIIHHH')
+PLAYER = struct.Struct('<hhiiiq??')
+BALL = struct.Struct('<hhdddddd?')
+UPGRADE = struct.Struct('<Bhh')
+LASER = struct.Struct('<hh')
+UPGRADES = list(Upgrade_Type)
+
+def block_state(game):
+    """Return the (type, health, alive) arrays of every block of the board, in setup order."""
+    blocks = game.block_grp
+    if game.all_blocks is None:
+        return blocks.type, blocks.health, blocks.alive
+    return (array('h', [block.type for block in game.all_blocks]),
+            array('i', [block.health for block in game.all_blocks]),
+            bytes(block.alive() for block in game.all_blocks))
+
+def snapshot(game):
+    """Return the simulation state of a game as a compact bytes blob."""
+    player = game.player.sprite
+    balls = game.ball.sprites()
+    upgrades = game.upgrade_sprites.sprites()
+    lasers = player.lasers_grp.sprites()
+    types, health, alive = block_state(game)
+
+    parts = [HEADER.pack(MAGIC, VERSION, game.frame, len(alive), len(balls), len(upgrades), len(lasers)),
+             PLAYER.pack(player.rect.x, player.rect.y, player.speed, player.hearts, player.no_lasers,
+                         player.laser_time, player.start_laser, player.ready)]
+    for ball in balls:
+        parts.append(BALL.pack(ball.rect.x, ball.rect.y, ball.center.x, ball.center.y,
+                               ball.velocity[0], ball.velocity[1], ball.pos[0], ball.pos[1], ball.active))
+    for upgrade in upgrades:
+        parts.append(UPGRADE.pack(UPGRADES.index(upgrade.up_type), upgrade.rect.x, upgrade.rect.y))
+    for laser in lasers:
+        parts.append(LASER.pack(laser.rect.x, laser.rect.y))
+    parts += [types.tobytes(), health.tobytes(), alive]
+    return b''.join(parts)
+
+def _number(value):
+    """Return a stored velocity as the int it was unless it had a fraction."""
+    return int(value) if value.is_integer() else value
+
+def restore(game, blob):
+    """Put a game back into the state of a snapshot taken from it or from a game with the same board.
+
+    Raises:
+        ValueError: The blob is not a snapshot of this board.
+
+    """
+    magic, version, frame, block_count, ball_count, upgrade_count, laser_count = HEADER.unpack_from(blob)
+    types, health, alive = block_state(game)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'not a version {VERSION} snapshot')
+    if block_count != len(alive):
+        raise ValueError(f'the snapshot has {block_count} blocks, the board {len(alive)}')
+    offset = HEADER.size
+    game.frame = frame
+
+    player = game.player.sprite
+    x, y, player.speed, player.hearts, player.no_lasers, player.laser_time, player.start_laser, player.ready = \
+        PLAYER.unpack_from(blob, offset)
+    offset += PLAYER.size
+    player.rect.topleft = (x, y)
+    player.last_rect = player.rect.copy()
+
+    #balls: the first one is the served ball, the others come from the pool
+    for ball in game.ball.sprites():
+        ball.kill()
+    for i in range(ball_count):
+        x, y, center_x, center_y, vx, vy, pos_x, pos_y, active = BALL.unpack_from(blob, offset + i * BALL.size)
+        if i == 0:
+            ball = game.ball_sprite
+            ball.reset((pos_x, pos_y), player, game.block_grp)
+        else:
+            ball = game.ball_pool.acquire((pos_x, pos_y), player, game.block_grp)
+            ball.swept = game.ball_sprite.swept
+        ball.rect.topleft = (x, y)
+        ball.center.update(center_x, center_y)
+        ball.velocity = [_number(vx), _number(vy)]
+        ball.active = active
+        ball.last_rect = ball.rect.copy()
+        game.ball.add(ball)
+    offset += ball_count * BALL.size
+
+    for upgrade in game.upgrade_sprites.sprites():
+        upgrade.kill()
+    for i in range(upgrade_count):
+        kind, x, y = UPGRADE.unpack_from(blob, offset + i * UPGRADE.size)
+        upgrade = game.upgrade_pool.acquire((0, 0), UPGRADES[kind], game.upgrade_sprites)
+        upgrade.rect.topleft = (x, y)
+    offset += upgrade_count * UPGRADE.size
+
+    for laser in player.lasers_grp.sprites():
+        laser.kill()
+    for i in range(laser_count):
+        laser = player.laser_pool.acquire(player.rect, game.block_grp)
+        laser.rect.topleft = LASER.unpack_from(blob, offset + i * LASER.size)
+        player.lasers_grp.add(laser)
+    offset += laser_count * LASER.size
+
+    saved_types = array('h', blob[offset:offset + 2 * block_count])
+    offset += 2 * block_count
+    saved_health = array('i', blob[offset:offset + 4 * block_count])
+    offset += 4 * block_count
+    saved_alive = blob[offset:offset + block_count]
+    restore_blocks(game, saved_types, saved_health, saved_alive)
+
+def restore_blocks(game, types, health, alive):
+    """Set the tile, health and live flag of every block and have the block layer redrawn."""
+    blocks = game.block_grp
+    if game.all_blocks is None:
+        blocks.type[:] = types
+        blocks.health[:] = health
+        blocks.alive[:] = alive
+        blocks._count = sum(alive)
+        blocks._grid = None
+        blocks._bounds = None
+    else:
+        revived = False
+        for block, block_type, block_health, live in zip(game.all_blocks, types, health, alive):
+            if block.type != block_type:
+                block.type = block_type
+                block.image = tiles.get(Block_Type[block_type], Scale_Fac)
+            block.health = block_health
+            if live and not block.alive():
+                revived = True
+            elif not live and block.alive():
+                block.kill()
+        if revived:
+            #collisions are resolved in insertion order, so the live blocks go back in setup order
+            blocks.empty()
+            blocks.add(*[block for block, live in zip(game.all_blocks, alive) if live])
+    blocks.revision += 1
+    if blocks.changed is not None:
+        blocks.changed.append(pygame.Rect(0, 0, Width, Height))
+
+class RewindBuffer:
+    """A ring of the snapshots of the last seconds of play.
+
+    Attributes:
+        game (Game): The game recorded.
+        capacity (int): The most snapshots kept.
+        snapshots (deque): (frame, blob) per recorded frame, oldest first.
+
+    Methods:
+        record(): Snapshot the current frame.
+        rewind(frames): Go back a number of recorded frames.
+        seconds(): Return the seconds of play that can be rewound.
+
+    """
+
+    def __init__(self, game, seconds=Rewind_Seconds):
+        """Initialize the RewindBuffer object.
+
+        Args:
+            game (Game): The game to record.
+            seconds (float, optional): Seconds of simulated play kept. Defaults to Rewind_Seconds.
+
+        """
+        self.game = game
+        self.capacity = max(1, int(seconds * FPS))
+        self.snapshots = deque(maxlen=self.capacity)
+
+    def record(self):
+        """Snapshot the current frame, unless it is already the newest one kept."""
+        if not self.snapshots or self.snapshots[-1][0] != self.game.frame:
+            self.snapshots.append((self.game.frame, snapshot(self.game)))
+
+    def rewind(self, frames=1):
+        """Restore the snapshot recorded frames before the newest one and forget the ones after it.
+
+        The oldest snapshot stays in the buffer, so rewinding can go on until it is reached.
+
+        Returns:
+            int: The frame the game is back at, None when nothing was recorded.
+
+        """
+        if not self.snapshots:
+            return None
+        for _ in range(min(frames, len(self.snapshots) - 1)):
+            self.snapshots.pop()
+        frame, blob = self.snapshots[-1]
+        restore(self.game, blob)
+        return frame
+
+    def seconds(self):
+        """Return the seconds of simulated play that can be rewound."""
+        if not self.snapshots:
+            return 0.0
+        return (self.snapshots[-1][0] - self.snapshots[0][0]) / FPS
+
+def check(frames=2000):
+    """Snapshot a game halfway, play on, restore and replay; print whether the state hashes agree."""
+    from main import Game
+    from headless import track_ball
+    ok = True
+    for balls in (1, 3):
+        game = Game(headless=True, seed=7, balls=balls)
+        hashes = []
+        blob = None
+        for frame in range(frames):
+            if frame == frames // 2:
+                blob = snapshot(game)
+            game.serve()
+            game.update(track_ball(game))
+            hashes.append(game.state_hash())
+
+        #restore into the same game, then into a new game with the same seed
+        for target in (game, Game(headless=True, seed=7, balls=balls)):
+            restore(target, blob)
+            replayed = []
+            for frame in range(frames // 2, frames):
+                target.serve()
+                target.update(track_ball(target))
+                replayed.append(target.state_hash())
+            same = replayed == hashes[frames // 2:]
+            ok = ok and same
+            print(f'{balls} ball(s), restored into {"the same" if target is game else "a new"} game: '
+                  f'{"matched" if same else "DIVERGED"} for {frames - frames // 2} frames, snapshot {len(blob)} bytes')
+    return ok
+
+if __name__ == '__main__':
+    sys.exit(0 if check(int(sys.argv[1]) if len(sys.argv) > 1 else 2000) else 1)
\ No newline at end of file
@@ -0,0 +1,100 @@
+import pygame
+from settings import *
+
+class BlockGroup(pygame.sprite.Group):
+    """A sprite group of blocks with a uniform-grid spatial index.
+
+    The grid matches the layout of Game.blocks_setup, one cell per block slot
+    of Block_Size plus Block_Offset, starting at Top_Offset. Blocks are indexed
+    when they are added to the group and dropped from the index when they are
+    removed, so Block.kill() keeps the index up to date on its own. Queries only
+    look at the cells a rect overlaps instead of scanning every block.
+
+    Attributes:
+        cell_w (float): The width of a grid cell.
+        cell_h (float): The height of a grid cell.
+        cells (dict): Blocks keyed by (col, row) cell.
+        changed (list): Rects of blocks damaged or removed since a renderer last read it,
+            None while no renderer tracks changes.
+        revision (int): Counts block damage and removals, so readers can tell the board changed.
+
+    Methods:
+        cells_for(rect): Return the cells covered by a rect.
+        collide(rect): Return the blocks colliding with a rect.
+        bounds(): Return a rect containing every block.
+        spritecollide(sprite): Index backed drop-in for pygame.sprite.spritecollide.
+        touch(sprite): Record that a block changed its image.
+
+    """
+
+    def __init__(self, *sprites):
+        """Initialize an empty BlockGroup and add the given sprites."""
+        self.cell_w = Block_Size[0] + Block_Offset
+        self.cell_h = Block_Size[1] + Block_Offset
+        self.cells = {}
+        self._order = {}
+        self._count = 0
+        self._bounds = None
+        self.changed = None
+        self.revision = 0
+        super().__init__(*sprites)
+
+    def cells_for(self, rect):
+        """Return the (col, row) cells covered by a rect."""
+        col_0 = int(rect.left // self.cell_w)
+        col_1 = int((rect.right - 1) // self.cell_w)
+        row_0 = int((rect.top - Top_Offset) // self.cell_h)
+        row_1 = int((rect.bottom - 1 - Top_Offset) // self.cell_h)
+        return [(col, row) for row in range(row_0, row_1 + 1) for col in range(col_0, col_1 + 1)]
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        #insertion order keeps query results in the same order as spritecollide
+        self._order[sprite] = self._count
+        self._count += 1
+        self._bounds = None
+        for cell in self.cells_for(sprite.rect):
+            self.cells.setdefault(cell, []).append(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        del self._order[sprite]
+        self.touch(sprite)
+        for cell in self.cells_for(sprite.rect):
+            bucket = self.cells.get(cell)
+            if bucket:
+                bucket.remove(sprite)
+                if not bucket:
+                    del self.cells[cell]
+
+    def bounds(self):
+        """Return a rect containing every block, not shrunk as blocks are removed."""
+        if self._bounds is None:
+            rects = [sprite.rect for sprite in self]
+            self._bounds = rects[0].unionall(rects) if rects else pygame.Rect(0, 0, 0, 0)
+        return self._bounds
+
+    def touch(self, sprite):
+        """Record that a block changed its image, in changed if changes are tracked."""
+        self.revision += 1
+        if self.changed is not None:
+            self.changed.append(sprite.rect.copy())
+
+    def collide(self, rect):
+        """Return the blocks colliding with a rect, in the order they were added."""
+        found = []
+        for cell in self.cells_for(rect):
+            for sprite in self.cells.get(cell, ()):
+                if sprite not in found and rect.colliderect(sprite.rect):
+                    found.append(sprite)
+        if len(found) > 1:
+            found.sort(key=self._order.__getitem__)
+        return found
+
+    def spritecollide(self, sprite, dokill=False):
+        """Index backed drop-in for pygame.sprite.spritecollide(sprite, self, dokill)."""
+        found = self.collide(sprite.rect)
+        if dokill:
+            for block in found:
+                block.kill()
+        return found
@@ -0,0 +1,661 @@
+"""Live spectator stream of a Breakout game.
+
+A Broadcaster attached to a Game serves the game state to any number of
+viewers over TCP or a Unix socket. The game loop only calls publish(),
+which encodes the frame (a few dozen bytes) and hands it to an asyncio
+server running on its own thread; sockets are never touched by the game
+loop. Viewers that fall behind are skipped and resynchronised with the
+next keyframe instead of slowing the game down.
+
+On connect the server sends HELLO (magic, version, window size). Every
+message after that is a little-endian length followed by a body:
+
+    kind (KEY or DELTA), frame, hearts      HEAD
+    paddle rect                             PADDLE
+    ball count, then x, y, vx, vy per ball  COUNT, BALL
+    blocks                                  keyframe: BLOCK per live block
+                                            delta: HIT per block hit or removed (type 0)
+    sprites spawned, then removed ids       SPRITE per upgrade or laser, REMOVED
+
+Upgrades and lasers move at a constant speed, so they are only sent when
+they appear and disappear; viewers move them by speed per simulated frame.
+Keyframes carry the whole state and are sent every keyframe_every frames and
+to viewers that join or were skipped.
+
+Usage:
+    python main.py --spectate [host:]port|unix:path
+    python spectator.py view [host:]port|unix:path
+    python spectator.py loopback [viewers] [frames]
+"""
+import os
+import sys
+import time
+import socket
+import struct
+import asyncio
+import threading
+from array import array
+from settings import *
+
+MAGIC = b'BRKSPC'
+VERSION = 1
+HELLO = struct.Struct('<6sBHH')
+LENGTH = struct.Struct('<I')
+HEAD = struct.Struct('<BIB')
+PADDLE = struct.Struct('<4h')
+COUNT = struct.Struct('<I')
+BALL = struct.Struct('<2h2f')
+BLOCK = struct.Struct('<IhhB')
+HIT = struct.Struct('<IB')
+SPRITE = struct.Struct('<HBhhb')
+REMOVED = struct.Struct('<H')
+KEY, DELTA = 1, 2
+UPGRADES = list(Upgrade_Type)
+#sprite kind of lasers, upgrades use their index in UPGRADES
+LASER = 255
+
+def parse_address(spec):
+    """Return a (host, port) tuple, or a path for 'unix:path', from an address spec."""
+    if spec.startswith('unix:'):
+        return spec[5:]
+    host, _, port = spec.rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+class StateEncoder:
+    """Encodes the state of a game as keyframes and deltas.
+
+    Block ids are their position in the block group when the encoder was
+    created (the index for a BlockField). Upgrades and lasers get a new
+    id whenever they appear, including pooled sprites reused for a new drop
+    or shot, which are told apart by not being where their speed would have
+    taken them.
+
+    Attributes:
+        game (Game): The game being encoded.
+        frame (int): The game frame of the last encoded message.
+
+    Methods:
+        encode(key, delta): Return the (keyframe, delta) of the current frame.
+
+    """
+
+    def __init__(self, game):
+        """Initialize the StateEncoder object.
+
+        Args:
+            game (Game): The game to encode.
+
+        """
+        self.game = game
+        blocks = game.block_grp
+        if hasattr(blocks, 'alive'):
+            self.blocks = None
+            self.positions = list(zip(blocks.x, blocks.y))
+        else:
+            self.blocks = blocks.sprites()
+            self.positions = [block.rect.topleft for block in self.blocks]
+        self._field_type = None
+        self._field_alive = None
+        self.types = self.block_types()
+        self.sprites = {}
+        self.frame = game.frame
+        self._next_id = 0
+
+    def block_types(self):
+        """Return the tile type of every block by id, 0 once it is removed."""
+        blocks = self.game.block_grp
+        if self.blocks is None:
+            #BlockField: rescan only when its arrays changed since the last frame
+            if self._field_type == blocks.type and self._field_alive == blocks.alive:
+                return self.types
+            self._field_type = array('h', blocks.type)
+            self._field_alive = bytearray(blocks.alive)
+            return [kind if alive else 0 for kind, alive in zip(blocks.type, blocks.alive)]
+        return [block.type if block.alive() else 0 for block in self.blocks]
+
+    def scan_sprites(self):
+        """Return the live upgrades and lasers as {sprite: (id, kind, x, y, speed)} and the spawned ones."""
+        game = self.game
+        steps = game.frame - self.frame
+        current = {}
+        spawned = []
+        for group, is_laser in ((game.upgrade_sprites, False), (game.player.sprite.lasers_grp, True)):
+            for sprite in group:
+                x, y = sprite.rect.topleft
+                entry = self.sprites.get(sprite)
+                if entry is None or entry[2] != x or entry[3] + entry[4] * steps != y:
+                    speed = -sprite.speed if is_laser else sprite.speed
+                    kind = LASER if is_laser else UPGRADES.index(sprite.up_type)
+                    entry = (self._next_id, kind, x, y, speed)
+                    self._next_id = (self._next_id + 1) & 0xFFFF
+                    spawned.append(entry)
+                else:
+                    entry = entry[:2] + (x, y) + entry[4:]
+                current[sprite] = entry
+        return current, spawned
+
+    def encode(self, key=False, delta=True):
+        """Encode the current frame against the last one encoded.
+
+        Args:
+            key (bool, optional): Build a keyframe. Defaults to False.
+            delta (bool, optional): Build a delta. Defaults to True.
+
+        Returns:
+            tuple: (keyframe, delta) messages with their length prefix, None where not built.
+
+        """
+        game = self.game
+        player = game.player.sprite
+        balls = game.ball.sprites()
+        common = [PADDLE.pack(*player.rect), COUNT.pack(len(balls))]
+        common += [BALL.pack(ball.rect.x, ball.rect.y, *ball.velocity) for ball in balls]
+        common = b''.join(common)
+
+        types = self.block_types()
+        current, spawned = self.scan_sprites()
+
+        key_msg = delta_msg = None
+        if key:
+            live = [BLOCK.pack(i, *self.positions[i], kind) for i, kind in enumerate(types) if kind]
+            sprites = [SPRITE.pack(*entry) for entry in current.values()]
+            key_msg = self._message(KEY, common, live, sprites, [])
+        if delta:
+            hits = [HIT.pack(i, kind) for i, (kind, last) in enumerate(zip(types, self.types)) if kind != last]
+            alive = {entry[0] for entry in current.values()}
+            removed = [REMOVED.pack(entry[0]) for entry in self.sprites.values() if entry[0] not in alive]
+            delta_msg = self._message(DELTA, common, hits, [SPRITE.pack(*entry) for entry in spawned], removed)
+
+        self.types = types
+        self.sprites = current
+        self.frame = game.frame
+        return key_msg, delta_msg
+
+    def _message(self, kind, common, blocks, sprites, removed):
+        """Join the sections of a message and prefix its length."""
+        body = b''.join([HEAD.pack(kind, self.game.frame, min(self.game.player.sprite.hearts, 255)), common,
+                         COUNT.pack(len(blocks)), *blocks, COUNT.pack(len(sprites)), *sprites,
+                         COUNT.pack(len(removed)), *removed])
+        return LENGTH.pack(len(body)) + body
+
+class SpectatorState:
+    """The game state rebuilt by a viewer from keyframes and deltas.
+
+    Attributes:
+        synced (bool): Indicates whether a keyframe has been applied.
+        frame (int): The game frame of the last message.
+        hearts (int): The player's hearts.
+        paddle (tuple): The paddle rect.
+        balls (list): (x, y, vx, vy) per ball.
+        blocks (dict): {id: [x, y, type]} of the live blocks.
+        sprites (dict): {id: [kind, x, y, speed]} of the upgrades and lasers.
+        changed (list): (x, y, type) of the blocks changed since a viewer last cleared it,
+            type 0 for removed blocks; None after a keyframe, when every block has to be redrawn.
+
+    Methods:
+        apply(body): Apply one message body.
+        snapshot(): Return the state without the sprite ids, for comparisons.
+
+    """
+
+    def __init__(self):
+        """Initialize an empty SpectatorState."""
+        self.synced = False
+        self.frame = 0
+        self.hearts = 0
+        self.paddle = (0, 0, 0, 0)
+        self.balls = []
+        self.blocks = {}
+        self.sprites = {}
+        self.changed = None
+
+    def apply(self, body):
+        """Apply one message body; deltas are ignored until the first keyframe."""
+        kind, frame, hearts = HEAD.unpack_from(body)
+        if kind == DELTA and not self.synced:
+            return
+        if kind == KEY:
+            self.synced = True
+            self.blocks.clear()
+            self.sprites.clear()
+            self.changed = None
+        else:
+            for sprite in self.sprites.values():
+                sprite[2] += sprite[3] * (frame - self.frame)
+        self.frame, self.hearts = frame, hearts
+        offset = HEAD.size
+        self.paddle = PADDLE.unpack_from(body, offset)
+        offset += PADDLE.size
+
+        count, = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        self.balls = [BALL.unpack_from(body, offset + i * BALL.size) for i in range(count)]
+        offset += count * BALL.size
+
+        count, = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        if kind == KEY:
+            for i in range(count):
+                block_id, x, y, block_type = BLOCK.unpack_from(body, offset + i * BLOCK.size)
+                self.blocks[block_id] = [x, y, block_type]
+            offset += count * BLOCK.size
+        else:
+            for i in range(count):
+                block_id, block_type = HIT.unpack_from(body, offset + i * HIT.size)
+                block = self.blocks[block_id]
+                if self.changed is not None:
+                    self.changed.append((block[0], block[1], block_type))
+                if block_type:
+                    block[2] = block_type
+                else:
+                    del self.blocks[block_id]
+            offset += count * HIT.size
+
+        count, = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        for i in range(count):
+            sprite_id, *sprite = SPRITE.unpack_from(body, offset + i * SPRITE.size)
+            self.sprites[sprite_id] = sprite
+        offset += count * SPRITE.size
+
+        count, = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        for i in range(count):
+            self.sprites.pop(REMOVED.unpack_from(body, offset + i * REMOVED.size)[0], None)
+
+    def snapshot(self):
+        """Return the state as comparable values, sprites sorted instead of keyed by id."""
+        return (self.frame, self.hearts, self.paddle, self.balls, self.blocks,
+                sorted(tuple(sprite) for sprite in self.sprites.values()))
+
+class Broadcaster:
+    """Serves the frames of a game to spectators from an asyncio server thread.
+
+    publish() runs on the game loop: it encodes the frame and schedules the
+    send on the server thread, so a slow or stalled viewer never blocks the
+    game. A viewer whose socket buffer holds more than limit bytes misses
+    frames until the next keyframe is built for it. The viewers and the
+    keyframe requests are shared by both threads and only touched under a
+    lock.
+
+    Attributes:
+        game (Game): The game being broadcast.
+        address (tuple or str): The (host, port) or Unix socket path served, the bound port once started.
+        keyframe_every (int): Frames between keyframes sent to everyone.
+        limit (int): Bytes queued for a viewer before it is skipped.
+        viewers (dict): {writer: synced} of the connected viewers, changed by the server thread under the lock.
+        sent (int): Bytes queued to viewers so far.
+        skipped (int): Messages not sent to viewers that were behind.
+        frames (int): Frames published.
+
+    Methods:
+        start(): Start the server thread and wait until it listens.
+        publish(): Encode the current frame and send it to the viewers.
+        watching(): Return the number of connected viewers.
+        pending(): Return the bytes still queued for the viewers.
+        close(): Stop the server and disconnect the viewers.
+
+    """
+
+    def __init__(self, game, address=('127.0.0.1', Spectator_Port), keyframe_every=FPS, limit=64 * 1024):
+        """Initialize the Broadcaster object.
+
+        Args:
+            game (Game): The game to broadcast.
+            address (tuple or str, optional): (host, port), port 0 for any, or a Unix socket path.
+                Defaults to port Spectator_Port on the loopback interface.
+            keyframe_every (int, optional): Frames between keyframes. Defaults to one second of frames.
+            limit (int, optional): Bytes queued for a viewer before it is skipped. Defaults to 64 KiB.
+
+        """
+        self.game = game
+        self.address = address
+        self.keyframe_every = keyframe_every
+        self.limit = limit
+        self.viewers = {}
+        self.sent = 0
+        self.skipped = 0
+        self.frames = 0
+        self.encoder = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._tasks = set()
+        #guards viewers and _requests, read by the game loop and changed by the server thread
+        self._lock = threading.Lock()
+        #keyframe requests from the server thread and the ones served by publish()
+        self._requests = 0
+        self._served = 0
+        self._last_key = 0
+
+    def start(self):
+        """Start the server thread and wait until it listens."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._server is None:
+            raise OSError(f'cannot serve spectators on {self.address}')
+        return self
+
+    def _run(self):
+        """Run the asyncio loop of the server thread."""
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._listen())
+        except OSError:
+            self._ready.set()
+            return
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _listen(self):
+        """Open the listening socket."""
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self._server = await asyncio.start_unix_server(self._connect, self.address)
+        else:
+            self._server = await asyncio.start_server(self._connect, *self.address)
+            self.address = self._server.sockets[0].getsockname()[:2]
+        self._ready.set()
+
+    async def _connect(self, reader, writer):
+        """Greet a viewer, ask for a keyframe for it and forget it once it disconnects."""
+        sock = writer.get_extra_info('socket')
+        if sock is not None and sock.family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        writer.write(HELLO.pack(MAGIC, VERSION, Width, Height))
+        with self._lock:
+            self.viewers[writer] = False
+            self._requests += 1
+        self._tasks.add(asyncio.current_task())
+        try:
+            #viewers send nothing, reading only notices the disconnect
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            with self._lock:
+                self.viewers.pop(writer, None)
+            self._tasks.discard(asyncio.current_task())
+            writer.close()
+
+    def publish(self):
+        """Encode the current frame and hand it to the server thread.
+
+        Does nothing while nobody watches or when the frame has not advanced
+        and no viewer waits for a keyframe.
+        """
+        with self._lock:
+            watching = bool(self.viewers)
+            requests = self._requests
+        if not watching:
+            self.encoder = None
+            return
+        wanted = requests != self._served
+        if self.encoder is None:
+            self.encoder = StateEncoder(self.game)
+            wanted = True
+        elif self.game.frame == self.encoder.frame and not wanted:
+            return
+        periodic = self.game.frame - self._last_key >= self.keyframe_every
+        key, delta = self.encoder.encode(key=wanted or periodic, delta=not periodic)
+        if key:
+            self._served = requests
+            if periodic:
+                self._last_key = self.game.frame
+        self.frames += 1
+        self._loop.call_soon_threadsafe(self._send, key, delta)
+
+    def _send(self, key, delta):
+        """Queue a frame for every viewer, on the server thread."""
+        with self._lock:
+            viewers = list(self.viewers.items())
+        #the writes happen outside the lock, so publish() never waits for them
+        synced_now = {}
+        requests = 0
+        for writer, synced in viewers:
+            if writer.is_closing():
+                continue
+            if writer.transport.get_write_buffer_size() > self.limit:
+                #behind: skip it until it can take a keyframe again
+                if synced or key is not None:
+                    synced_now[writer] = False
+                    requests += 1
+                self.skipped += 1
+                continue
+            if key is not None and (not synced or delta is None):
+                writer.write(key)
+                synced_now[writer] = True
+                self.sent += len(key)
+            elif synced:
+                writer.write(delta)
+                self.sent += len(delta)
+        if synced_now:
+            with self._lock:
+                for writer, synced in synced_now.items():
+                    #a viewer that disconnected meanwhile stays gone
+                    if writer in self.viewers:
+                        self.viewers[writer] = synced
+                self._requests += requests
+
+    def watching(self):
+        """Return the number of connected viewers."""
+        with self._lock:
+            return len(self.viewers)
+
+    def pending(self):
+        """Return the bytes still queued for the viewers."""
+        with self._lock:
+            writers = list(self.viewers)
+        return sum(writer.transport.get_write_buffer_size() for writer in writers)
+
+    def close(self):
+        """Stop the server and disconnect the viewers."""
+        if self._loop is None or self._loop.is_closed():
+            return
+
+        async def shutdown():
+            self._server.close()
+            #closing a viewer's socket ends its _connect task
+            with self._lock:
+                writers = list(self.viewers)
+            for writer in writers:
+                writer.close()
+            await asyncio.gather(*self._tasks)
+            await self._server.wait_closed()
+            self._loop.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop)
+        self._thread.join()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+class SpectatorClient:
+    """A viewer connection that rebuilds the game state without blocking.
+
+    Attributes:
+        sock (socket): The connection to the broadcaster.
+        state (SpectatorState): The rebuilt state.
+        received (int): Bytes received so far.
+        messages (int): Messages applied so far.
+        closed (bool): Indicates whether the broadcaster went away.
+
+    Methods:
+        poll(): Apply every complete message received so far.
+        close(): Close the connection.
+
+    """
+
+    def __init__(self, address, timeout=5):
+        """Connect to a broadcaster and read its greeting.
+
+        Args:
+            address (tuple or str): The (host, port) or Unix socket path of the broadcaster.
+            timeout (float, optional): Seconds to wait for the connection. Defaults to 5.
+
+        """
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.sock = socket.create_connection(address, timeout) if family == socket.AF_INET else socket.socket(family)
+        if family == socket.AF_UNIX:
+            self.sock.settimeout(timeout)
+            self.sock.connect(address)
+        hello = b''
+        while len(hello) < HELLO.size:
+            chunk = self.sock.recv(HELLO.size - len(hello))
+            if not chunk:
+                raise ConnectionError('the broadcaster closed the connection')
+            hello += chunk
+        magic, version, width, height = HELLO.unpack(hello)
+        if magic != MAGIC or version != VERSION:
+            raise ConnectionError(f'not a version {VERSION} spectator stream')
+        if (width, height) != (Width, Height):
+            raise ConnectionError(f'the game runs at {width}x{height}, settings use {Width}x{Height}')
+        self.sock.setblocking(False)
+        self.state = SpectatorState()
+        self.received = 0
+        self.messages = 0
+        self.closed = False
+        self._buffer = bytearray()
+
+    def poll(self):
+        """Apply every complete message received so far and return how many there were."""
+        while True:
+            try:
+                chunk = self.sock.recv(1 << 16)
+            except BlockingIOError:
+                break
+            except ConnectionError:
+                chunk = b''
+            if not chunk:
+                self.closed = True
+                break
+            self._buffer += chunk
+            self.received += len(chunk)
+
+        applied = 0
+        view = memoryview(self._buffer)
+        offset = 0
+        while len(view) - offset >= LENGTH.size:
+            size, = LENGTH.unpack_from(view, offset)
+            if len(view) - offset - LENGTH.size < size:
+                break
+            self.state.apply(view[offset + LENGTH.size:offset + LENGTH.size + size])
+            offset += LENGTH.size + size
+            applied += 1
+        view.release()
+        del self._buffer[:offset]
+        self.messages += applied
+        return applied
+
+    def close(self):
+        """Close the connection."""
+        self.sock.close()
+
+def view(address):
+    """Open a window and draw the game streamed from a broadcaster."""
+    import pygame
+    from assets import tiles
+    pygame.init()
+    pygame.display.set_caption('Breakout spectator')
+    screen = pygame.display.set_mode((Width, Height))
+    client = SpectatorClient(address)
+    background = tiles.background()
+    layer = pygame.Surface((Width, Height)).convert()
+    font = pygame.font.SysFont(None, 48)
+    heart = tiles.get(60, Heart_Scale)
+    sprite_images = {LASER: tiles.get(61)}
+    sprite_images.update({i: tiles.get(Upgrade_Type[up_type], Upgrade_Scale) for i, up_type in enumerate(UPGRADES)})
+    block_size = tiles.get(Block_Type[2], Scale_Fac).get_size()
+    clock = pygame.time.Clock()
+
+    while not client.closed:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                client.close()
+                pygame.quit()
+                return
+        state = client.state
+        client.poll()
+        #the blocks live in a layer patched only where blocks changed
+        if state.synced and state.changed is None:
+            layer.blit(background, (0, 0))
+            for x, y, block_type in state.blocks.values():
+                layer.blit(tiles.get(Block_Type[block_type], Scale_Fac), (x, y))
+        elif state.synced:
+            for x, y, block_type in state.changed:
+                rect = pygame.Rect((x, y), block_size)
+                layer.blit(background, rect, rect)
+                if block_type:
+                    layer.blit(tiles.get(Block_Type[block_type], Scale_Fac), rect)
+        state.changed = []
+
+        screen.blit(layer if state.synced else background, (0, 0))
+        for i in range(state.hearts):
+            screen.blit(heart, (i * (heart.get_width() + 2) + 5, 5))
+        for kind, x, y, speed in state.sprites.values():
+            screen.blit(sprite_images[kind], (x, y))
+        screen.blit(tiles.get(51, Scale_Fac), state.paddle[:2])
+        for x, y, vx, vy in state.balls:
+            screen.blit(tiles.get(58, Ball_Scale), (x, y))
+        if state.synced and (state.hearts == 0 or not state.blocks):
+            text = font.render('Game Over' if state.hearts == 0 else 'Winner', True, (255, 0, 0) if state.hearts == 0 else (0, 255, 0))
+            screen.blit(text, text.get_rect(center=(Width // 2, Height // 2)))
+        pygame.display.update()
+        clock.tick(FPS)
+    print('the broadcast ended')
+
+def loopback(viewers=32, frames=3000):
+    """Broadcast a headless game to viewers on the loopback interface and check what they rebuilt."""
+    from main import Game
+    from headless import track_ball, game_state
+    game = Game(headless=True, seed=1, balls=3)
+    broadcaster = Broadcaster(game, ('127.0.0.1', 0)).start()
+    clients = [SpectatorClient(broadcaster.address) for _ in range(viewers)]
+    while broadcaster.watching() < viewers:
+        time.sleep(0.01)
+
+    publish = 0.0
+    for _ in range(frames):
+        game.serve()
+        game.update(track_ball(game))
+        start = time.perf_counter()
+        broadcaster.publish()
+        publish += time.perf_counter() - start
+        for client in clients:
+            client.poll()
+        if game_state(game) != 'running':
+            break
+
+    #let the queues drain, then resync any viewer that was skipped
+    deadline = time.perf_counter() + 5
+    while time.perf_counter() < deadline:
+        broadcaster.publish()
+        for client in clients:
+            client.poll()
+        if not broadcaster.pending() and all(client.state.frame == game.frame for client in clients):
+            break
+        time.sleep(0.01)
+
+    expected = SpectatorState()
+    expected.apply(StateEncoder(game).encode(key=True, delta=False)[0][LENGTH.size:])
+    matched = sum(client.state.snapshot() == expected.snapshot() for client in clients)
+    received = sum(client.received for client in clients)
+    print(f'{matched} of {viewers} viewers matched the game after {game.frame} frames, '
+          f'{received / viewers / broadcaster.frames:.0f} bytes per viewer per frame, '
+          f'publish {publish / broadcaster.frames * 1e6:.0f} us per frame, {broadcaster.skipped} messages skipped')
+    for client in clients:
+        client.close()
+    broadcaster.close()
+    return matched == viewers
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'view'
+    if command == 'view':
+        view(parse_address(sys.argv[2] if len(sys.argv) > 2 else str(Spectator_Port)))
+    elif command == 'loopback':
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        ok = loopback(int(sys.argv[2]) if len(sys.argv) > 2 else 32, int(sys.argv[3]) if len(sys.argv) > 3 else 3000)
+        sys.exit(0 if ok else 1)
\ No newline at end of file
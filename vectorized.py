@@ -0,0 +1,604 @@
+"""Vectorized batch simulation of many Breakout games at once.
+
+BatchBreakout keeps the state of N games in NumPy arrays (struct of arrays)
+and advances all of them with one step(actions) call. It follows the rules of
+Player, Ball, Block, Laser and Upgrade in classes.py frame for frame, in
+either ball collision mode (swept by default, like Swept_Collision, or the
+original overlap tests) and with a single ball per game (multi upgrades are
+collected without effect); run `python vectorized.py parity` to compare it
+with the sprite based game in both modes and `python vectorized.py bench
+[envs]` to measure throughput.
+
+Requires NumPy.
+"""
+import sys
+import time
+import numpy as np
+import pygame
+from settings import *
+
+#upgrade codes follow the order of Upgrade_Type
+UPGRADES = list(Upgrade_Type)
+SLOW, FAST, LASER, HEART = (UPGRADES.index(name) for name in ('slow', 'fast', 'laser', 'heart'))
+DROPS = np.array([UPGRADES.index(name) for name in Default_Drops], np.int32)
+
+def tile_size(tile, scale=1):
+    """Return the (width, height) of a tile scaled like the sprites do, without a display."""
+    surf = pygame.image.load(f'PNG/{int(tile):02d}-Breakout-Tiles.png')
+    if scale != 1:
+        surf = pygame.transform.rotozoom(surf, 0, scale)
+    return surf.get_size()
+
+def place(size, **anchor):
+    """Return a pygame Rect of a size placed by one anchor, e.g. place(size, center=pos)."""
+    rect = pygame.Rect((0, 0), size)
+    for name, value in anchor.items():
+        setattr(rect, name, value)
+    return rect
+
+class BatchBreakout:
+    """N Breakout games stepped together on NumPy arrays.
+
+    Rects are stored as integer x, y arrays with fixed widths and heights,
+    exactly like the pygame Rects of the sprites. Blocks live on the grid of
+    Game.blocks_setup, so collisions only look at the 3x3 cells around a
+    mover. Upgrades and lasers are kept in fixed-size slots, compacted so the
+    live ones form a prefix in spawn order.
+
+    Attributes:
+        n (int): The number of games.
+        swept (bool): Move the balls with swept collisions instead of overlap tests.
+        rows (int): The number of block rows.
+        cols (int): The number of block columns.
+        frame (ndarray): Frames simulated per game.
+        done (ndarray): Games that are lost (no hearts) or won (no blocks).
+        paddle_x, paddle_y (ndarray): Paddle rect position.
+        speed, hearts (ndarray): Paddle speed and hearts.
+        no_lasers, start_laser, laser_time, ready (ndarray): Laser state of the player.
+        ball_x, ball_y, ball_vx, ball_vy, ball_active (ndarray): Ball rect position, velocity and state.
+        ball_cx, ball_cy (ndarray): The exact ball centre used by swept collisions.
+        health, type, drop, drop_type (ndarray): Block state, shape (n, rows * cols).
+        blocks_left (ndarray): Live blocks per game.
+        up_x, up_y, up_type, up_count (ndarray): Falling upgrades.
+        laser_x, laser_y, laser_count (ndarray): Flying lasers.
+
+    Methods:
+        reset(seed): Start every game over with a fresh random board.
+        load_game(i, game): Copy the board of a sprite based Game into game i.
+        step(actions, serve): Advance every running game by one frame.
+
+    """
+
+    def __init__(self, n, shape=Shape, max_upgrades=16, max_lasers=16, seed=None, swept=Swept_Collision,
+                 drop_prob=Drop_prob, drops=None):
+        """Initialize the BatchBreakout object.
+
+        Args:
+            n (int): The number of games.
+            shape (list, optional): Rows of block tiers (0 for an empty cell). Defaults to Shape.
+            max_upgrades (int, optional): Upgrade slots per game; extra drops are lost. Defaults to 16.
+            max_lasers (int, optional): Laser slots per game; extra shots are lost. Defaults to 16.
+            seed (int, optional): Seed for the board randomness.
+            swept (bool, optional): Use swept ball collisions. Defaults to Swept_Collision.
+            drop_prob (int, optional): A block drops an upgrade when randint(0, 10) is above it,
+                like a Level's drop_prob. Defaults to Drop_prob.
+            drops (dict, optional): Upgrade type weights, like a Level's drops. Defaults to None
+                for an even choice of Default_Drops.
+
+        """
+        self.n = n
+        self.swept = swept
+        self.shape = np.array(shape, dtype=np.int32)
+        self.drop_prob = drop_prob
+        #the upgrade codes a drop picks from and their probabilities, the weighted choice of roll_drop
+        if drops is None:
+            self.drop_codes, self.drop_weights = DROPS, None
+        else:
+            self.drop_codes = np.array([UPGRADES.index(name) for name in drops], np.int32)
+            weights = np.array(list(drops.values()), np.float64)
+            self.drop_weights = weights / weights.sum()
+        self.rows, self.cols = self.shape.shape
+        self.max_upgrades = max_upgrades
+        self.max_lasers = max_lasers
+        self.rng = np.random.default_rng(seed)
+
+        #geometry, taken from the same tiles and anchors the sprites use
+        self.paddle_w, self.paddle_h = tile_size(51, Scale_Fac)
+        self.ball_w, self.ball_h = tile_size(58, Ball_Scale)
+        self.laser_w, self.laser_h = tile_size(61)
+        self.up_w = np.array([tile_size(Upgrade_Type[name], Upgrade_Scale)[0] for name in UPGRADES], dtype=np.int32)
+        self.up_h = np.array([tile_size(Upgrade_Type[name], Upgrade_Scale)[1] for name in UPGRADES], dtype=np.int32)
+        self.paddle_start = place((self.paddle_w, self.paddle_h), center=(Width/2, Paddle_Y))
+        self.ball_start = place((self.ball_w, self.ball_h), center=(Width/2, Height - 80))
+
+        block_w, block_h = tile_size(Block_Type[2], Scale_Fac)
+        bx, by = [], []
+        for row_index in range(self.rows):
+            for col_index in range(self.cols):
+                pos_x = col_index * (Block_Size[0] + Block_Offset)
+                pos_y = Top_Offset + row_index * (Block_Size[1] + Block_Offset)
+                rect = place((block_w, block_h), topleft=(pos_x, pos_y))
+                bx.append(rect.x)
+                by.append(rect.y)
+        self.block_x = np.array(bx, dtype=np.int32)
+        self.block_y = np.array(by, dtype=np.int32)
+        self.block_w = block_w
+        self.block_h = block_h
+        self.cell_w = Block_Size[0] + Block_Offset
+        self.cell_h = Block_Size[1] + Block_Offset
+
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Start every game over with a fresh random board.
+
+        Args:
+            seed (int, optional): Reseed the board randomness.
+
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        n, blocks = self.n, self.rows * self.cols
+        i32 = np.int32
+
+        self.frame = np.zeros(n, i32)
+        self.done = np.zeros(n, bool)
+
+        self.paddle_x = np.full(n, self.paddle_start.x, i32)
+        self.paddle_y = np.full(n, self.paddle_start.y, i32)
+        self.speed = np.full(n, 5, i32)
+        self.hearts = np.full(n, 3, i32)
+        self.no_lasers = np.full(n, 10, i32)
+        self.start_laser = np.zeros(n, bool)
+        self.laser_time = np.zeros(n, i32)
+        self.ready = np.ones(n, bool)
+
+        self.ball_x = self.paddle_x + self.paddle_w // 2 - self.ball_w // 2
+        self.ball_y = self.paddle_y - self.ball_h
+        self.ball_vx = np.full(n, 2, i32)
+        self.ball_vy = np.full(n, -2, i32)
+        self.ball_active = np.zeros(n, bool)
+        self.ball_cx = (self.ball_x + self.ball_w // 2).astype(np.float64)
+        self.ball_cy = (self.ball_y + self.ball_h // 2).astype(np.float64)
+
+        tiers = np.broadcast_to(self.shape.reshape(-1), (n, blocks))
+        self.health = (tiers * 100).astype(i32)
+        self.type = (tiers * 2).astype(i32)
+        self.drop = (self.rng.integers(0, 11, (n, blocks)) > self.drop_prob) & (tiers > 0)
+        self.drop_type = self.rng.choice(self.drop_codes, (n, blocks), p=self.drop_weights)
+        self.blocks_left = (self.health > 0).sum(axis=1).astype(i32)
+
+        self.up_x = np.zeros((n, self.max_upgrades), i32)
+        self.up_y = np.zeros((n, self.max_upgrades), i32)
+        self.up_type = np.zeros((n, self.max_upgrades), i32)
+        self.up_count = np.zeros(n, i32)
+
+        self.laser_x = np.zeros((n, self.max_lasers), i32)
+        self.laser_y = np.zeros((n, self.max_lasers), i32)
+        self.laser_count = np.zeros(n, i32)
+
+    def load_game(self, i, game):
+        """Copy the board of a sprite based Game into game i.
+
+        Blocks go to the grid cell under their rect, so boards with empty cells line up too.
+
+        Args:
+            i (int): The game index.
+            game (Game): A freshly created Game with a board of the same shape.
+
+        """
+        self.health[i] = 0
+        self.type[i] = 0
+        self.drop[i] = False
+        self.drop_type[i] = 0
+        for block in game.block_grp:
+            col = round(block.rect.x / self.cell_w)
+            row = round((block.rect.y - Top_Offset) / self.cell_h)
+            index = row * self.cols + col
+            self.health[i, index] = block.health
+            self.type[i, index] = block.type
+            self.drop[i, index] = block.drop
+            self.drop_type[i, index] = UPGRADES.index(block.drop_type) if block.drop else 0
+        self.blocks_left[i] = len(game.block_grp)
+
+    def _candidates(self, x, y):
+        """Return (block index, valid) arrays of the 3x3 grid cells around rects at x, y."""
+        col = np.floor(x / self.cell_w).astype(np.int32)[:, None] + np.array([-1, 0, 1] * 3)
+        row = np.floor((y - Top_Offset) / self.cell_h).astype(np.int32)[:, None] + np.repeat([-1, 0, 1], 3)
+        valid = (col >= 0) & (col < self.cols) & (row >= 0) & (row < self.rows)
+        return np.where(valid, row * self.cols + col, 0), valid
+
+    def _damage(self, e, b):
+        """Apply Block.get_damage to block b of game e (one block per game)."""
+        if len(e) == 0:
+            return
+        was_alive = self.health[e, b] > 0
+        health = self.health[e, b] - Damage
+        self.health[e, b] = health
+        hurt = health > 0
+        self.type[e[hurt], b[hurt]] -= 1
+
+        killed = ~hurt
+        self.blocks_left[e[killed & was_alive]] -= 1
+        dropped = killed & self.drop[e, b]
+        self._spawn_upgrade(e[dropped], b[dropped])
+
+    def _spawn_upgrade(self, e, b):
+        """Drop an upgrade from the midbottom of block b into game e."""
+        slot = self.up_count[e]
+        room = slot < self.max_upgrades
+        e, b, slot = e[room], b[room], slot[room]
+        kind = self.drop_type[e, b]
+        self.up_type[e, slot] = kind
+        self.up_x[e, slot] = self.block_x[b] + self.block_w // 2 - self.up_w[kind] // 2
+        self.up_y[e, slot] = self.block_y[b] + self.block_h
+        self.up_count[e] += 1
+
+    @staticmethod
+    def _compact(keep, *arrays):
+        """Move the kept slots of each row to the front, preserving their order."""
+        order = np.argsort(~keep, axis=1, kind='stable')
+        for array in arrays:
+            array[:] = np.take_along_axis(array, order, axis=1)
+        return keep.sum(axis=1).astype(np.int32)
+
+    def _update_upgrades(self, e):
+        """Upgrade.update for every upgrade, then Game.upgrade_collide."""
+        slots = np.arange(self.max_upgrades) < self.up_count[e, None]
+        self.up_y[e] += 3 * slots
+        kind = self.up_type[e]
+        alive = slots & (self.up_y[e] < Height)
+
+        px, py = self.paddle_x[e, None], self.paddle_y[e, None]
+        ux, uy = self.up_x[e], self.up_y[e]
+        caught = alive & (ux < px + self.paddle_w) & (px < ux + self.up_w[kind]) \
+                       & (uy < py + self.paddle_h) & (py < uy + self.up_h[kind])
+
+        if caught.any():
+            count = lambda code: (caught & (kind == code)).sum(axis=1)
+            self.speed[e] += count(FAST) - count(SLOW)
+            self.hearts[e] += count(HEART)
+            lasers = count(LASER)
+            #the first laser upgrade arms the gun, every later one adds ten shots
+            arming = (lasers > 0) & ~self.start_laser[e]
+            self.no_lasers[e] += 10 * (lasers - arming)
+            self.start_laser[e] |= arming
+
+        up_x, up_y, up_type = self.up_x[e], self.up_y[e], self.up_type[e]
+        self.up_count[e] = self._compact(alive & ~caught, up_x, up_y, up_type)
+        self.up_x[e], self.up_y[e], self.up_type[e] = up_x, up_y, up_type
+
+    def _move_paddle(self, e, direction):
+        """Player.get_input with the given directions."""
+        x = self.paddle_x[e] + direction * self.speed[e]
+        x = np.where(x <= 0, 0, x)
+        self.paddle_x[e] = np.where(x + self.paddle_w >= Width, Width - self.paddle_w, x)
+
+    def _update_lasers(self, e):
+        """Player.laser_update for the games in e."""
+        ticks = self.frame[e] * 1000 // FPS
+        recharged = (self.no_lasers[e] > 0) & ~self.ready[e] & (ticks - self.laser_time[e] >= 2000)
+        self.ready[e] |= recharged
+
+        fire = self.start_laser[e] & self.ready[e]
+        f = e[fire]
+        self.laser_time[f] = ticks[fire]
+        self.ready[f] = False
+        self.no_lasers[f] -= 1
+        slot = self.laser_count[f]
+        room = slot < self.max_lasers
+        g, slot = f[room], slot[room]
+        self.laser_x[g, slot] = self.paddle_x[g] + self.paddle_w // 2 - self.laser_w // 2
+        self.laser_y[g, slot] = self.paddle_y[g] - self.laser_h
+        self.laser_count[g] += 1
+
+        #Laser.update in firing order, each laser damages every block it overlaps
+        #and lasers above the window are culled
+        hit = np.zeros((len(e), self.max_lasers), bool)
+        for k in range(int(self.laser_count[e].max(initial=0))):
+            moving = self.laser_count[e] > k
+            g = e[moving]
+            self.laser_y[g, k] -= 2
+            x, y = self.laser_x[g, k], self.laser_y[g, k]
+            cand, valid = self._candidates(x, y)
+            bx, by = self.block_x[cand], self.block_y[cand]
+            overlap = valid & (self.health[g[:, None], cand] > 0) \
+                & (x[:, None] < bx + self.block_w) & (bx < x[:, None] + self.laser_w) \
+                & (y[:, None] < by + self.block_h) & (by < y[:, None] + self.laser_h)
+            hit[moving, k] = overlap.any(axis=1) | (y + self.laser_h < 0)
+            for j in range(cand.shape[1]):
+                rows = overlap[:, j]
+                self._damage(g[rows], cand[rows, j])
+
+        slots = np.arange(self.max_lasers) < self.laser_count[e, None]
+        laser_x, laser_y = self.laser_x[e], self.laser_y[e]
+        self.laser_count[e] = self._compact(slots & ~hit, laser_x, laser_y)
+        self.laser_x[e], self.laser_y[e] = laser_x, laser_y
+
+    def _update_ball(self, e):
+        """Ball.update for the games in e."""
+        resting = e[~self.ball_active[e]]
+        self.ball_x[resting] = self.paddle_x[resting] + self.paddle_w // 2 - self.ball_w // 2
+        self.ball_y[resting] = self.paddle_y[resting] - self.ball_h
+        self.ball_cx[resting] = self.ball_x[resting] + self.ball_w // 2
+        self.ball_cy[resting] = self.ball_y[resting] + self.ball_h // 2
+
+        e = e[self.ball_active[e]]
+        if len(e) == 0:
+            return
+        if self.swept:
+            self._sweep_ball(e)
+            return
+        self.ball_x[e] += self.ball_vx[e]
+        self.ball_y[e] += self.ball_vy[e]
+
+        #Ball.ball_movement
+        lost = e[self.ball_y[e] + self.ball_h >= Height]
+        self.hearts[lost] -= 1
+        self.ball_active[lost] = False
+        self.ball_vx[lost] = 2
+        self.ball_vy[lost] = -2
+        self.ball_x[lost] = self.ball_start.x
+        self.ball_y[lost] = self.ball_start.y
+        self.ball_vy[e] *= np.where(self.ball_y[e] <= 0, -1, 1)
+        self.ball_vx[e] *= np.where((self.ball_x[e] <= 0) | (self.ball_x[e] + self.ball_w >= Width), -1, 1)
+
+        #Ball.collision: the first overlapping block in group order, else the paddle
+        x, y = self.ball_x[e], self.ball_y[e]
+        cand, valid = self._candidates(x, y)
+        bx, by = self.block_x[cand], self.block_y[cand]
+        overlap = valid & (self.health[e[:, None], cand] > 0) \
+            & (x[:, None] < bx + self.block_w) & (bx < x[:, None] + self.ball_w) \
+            & (y[:, None] < by + self.block_h) & (by < y[:, None] + self.ball_h)
+        on_block = overlap.any(axis=1)
+        block = np.where(overlap, cand, np.iinfo(np.int32).max).min(axis=1)
+        block = np.where(on_block, block, 0)
+
+        px, py = self.paddle_x[e], self.paddle_y[e]
+        on_paddle = ~on_block & (x < px + self.paddle_w) & (px < x + self.ball_w) \
+                              & (y < py + self.paddle_h) & (py < y + self.ball_h)
+        hit = on_block | on_paddle
+        if not hit.any():
+            return
+
+        e, block, on_block = e[hit], block[hit], on_block[hit]
+        sx = np.where(on_block, self.block_x[block], self.paddle_x[e])
+        sy = np.where(on_block, self.block_y[block], self.paddle_y[e])
+        sw = np.where(on_block, self.block_w, self.paddle_w)
+        sh = np.where(on_block, self.block_h, self.paddle_h)
+
+        def damage(mask):
+            mask = mask & on_block & (self.health[e, block] != 0)
+            self._damage(e[mask], block[mask])
+
+        bottom = self.ball_y[e] + self.ball_h
+        top_hit = (np.abs(bottom - sy) < Ball_Radius) & (self.ball_vy[e] > 0)
+        self.ball_y[e] = np.where(top_hit, sy - 1 - self.ball_h, self.ball_y[e])
+        self.ball_vy[e] *= np.where(top_hit, -1, 1)
+        damage(top_hit)
+
+        bottom_hit = (np.abs(self.ball_y[e] - (sy + sh)) < Ball_Radius) & (self.ball_vy[e] < 0)
+        self.ball_y[e] = np.where(bottom_hit, sy + sh + 1, self.ball_y[e])
+        self.ball_vy[e] *= np.where(bottom_hit, -1, 1)
+        damage(bottom_hit)
+
+        vertical = top_hit | bottom_hit
+        left_hit = ~vertical & (np.abs(self.ball_x[e] + self.ball_w - sx) < Ball_Radius) & (self.ball_vx[e] > 0)
+        self.ball_x[e] = np.where(left_hit, sx - self.ball_w, self.ball_x[e])
+        self.ball_vx[e] *= np.where(left_hit, -1, 1)
+        damage(left_hit)
+
+        right_hit = ~vertical & (np.abs(self.ball_x[e] - (sx + sw)) < Ball_Radius) & (self.ball_vx[e] < 0)
+        self.ball_x[e] = np.where(right_hit, sx + sw, self.ball_x[e])
+        self.ball_vx[e] *= np.where(right_hit, -1, 1)
+        damage(right_hit)
+
+    @staticmethod
+    def _sweep_boxes(cx, cy, dx, dy, left, top, right, bottom):
+        """sweep_circle_aabb for arrays of moves against boxes already expanded by the ball radius.
+
+        Returns:
+            tuple: (hit, t, nx, ny) arrays, t and the normal only meaningful where hit.
+
+        """
+        #already overlapping: a t = 0 hit on the nearest side's normal, ties broken in the order min() picks
+        inside = (left < cx) & (cx < right) & (top < cy) & (cy < bottom)
+        depth = np.stack((cx - left, cy - top, bottom - cy, right - cx))
+        side = depth.argmin(axis=0)
+        push_x = np.array([-1, 0, 0, 1])[side]
+        push_y = np.array([0, -1, 1, 0])[side]
+        pushed = inside & (dx * push_x + dy * push_y < 0)
+
+        #otherwise a ray cast of the centre against the slabs, x first so it wins ties
+        with np.errstate(divide='ignore', invalid='ignore'):
+            low_x, high_x = (left - cx) / dx, (right - cx) / dx
+            low_y, high_y = (top - cy) / dy, (bottom - cy) / dy
+        moving_x, moving_y = dx != 0, dy != 0
+        t_enter = np.where(moving_x, np.minimum(low_x, high_x), -np.inf)
+        t_exit = np.where(moving_x, np.maximum(low_x, high_x), np.inf)
+        nx = np.where(moving_x, np.where(dx > 0, -1, 1), 0)
+        ny = np.zeros_like(nx)
+        near_y = np.where(moving_y, np.minimum(low_y, high_y), -np.inf)
+        later = moving_y & (near_y > t_enter)
+        t_enter = np.where(later, near_y, t_enter)
+        nx = np.where(later, 0, nx)
+        ny = np.where(later, np.where(dy > 0, -1, 1), ny)
+        t_exit = np.where(moving_y, np.minimum(t_exit, np.maximum(low_y, high_y)), t_exit)
+        in_slabs = (moving_x | ((left < cx) & (cx < right))) & (moving_y | ((top < cy) & (cy < bottom)))
+        cast = in_slabs & (t_enter != -np.inf) & (t_enter <= t_exit) & (t_exit > 0) & (t_enter <= 1)
+
+        hit = np.where(inside, pushed, cast)
+        t = np.where(inside, 0.0, np.maximum(t_enter, 0.0))
+        return hit, t, np.where(inside, push_x, nx), np.where(inside, push_y, ny)
+
+    def _sweep_ball(self, e):
+        """Ball.sweep for the games in e, whose balls are in play."""
+        radius = Ball_Radius
+        cx, cy = self.ball_cx[e], self.ball_cy[e]
+        vx, vy = self.ball_vx[e], self.ball_vy[e]
+        cand, valid = self._candidates(self.ball_x[e], self.ball_y[e])
+        remaining = np.ones(len(e))
+        moving = np.ones(len(e), bool)
+        for _ in range(4):
+            dx, dy = vx * remaining, vy * remaining
+            #Ball.first_impact: the walls, then the blocks in grid order, then the paddle; ties keep the first
+            first = np.full(len(e), np.inf)
+            nx = np.zeros(len(e), np.int32)
+            ny = np.zeros(len(e), np.int32)
+            target = np.full(len(e), -1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                wall_x = np.where(dx < 0, (radius - cx) / dx, np.where(dx > 0, (Width - radius - cx) / dx, np.inf))
+                wall_y = np.where(dy < 0, (radius - cy) / dy, np.inf)
+            hit = wall_x <= 1
+            first = np.where(hit, np.maximum(wall_x, 0.0), first)
+            nx = np.where(hit, np.where(dx < 0, 1, -1), nx)
+            hit = (wall_y <= 1) & (wall_y < first)
+            first = np.where(hit, np.maximum(wall_y, 0.0), first)
+            nx = np.where(hit, 0, nx)
+            ny = np.where(hit, 1, ny)
+
+            live = valid & (self.health[e[:, None], cand] > 0)
+            boxes = [(cand[:, j], live[:, j], self.block_x[cand[:, j]], self.block_y[cand[:, j]], self.block_w, self.block_h)
+                     for j in range(cand.shape[1])]
+            boxes.append((np.full(len(e), -1), np.ones(len(e), bool), self.paddle_x[e], self.paddle_y[e],
+                          self.paddle_w, self.paddle_h))
+            for block, usable, x, y, w, h in boxes:
+                hit, t, hit_x, hit_y = self._sweep_boxes(cx, cy, dx, dy, x - radius, y - radius,
+                                                         x + w + radius, y + h + radius)
+                hit &= usable & (t < first)
+                first = np.where(hit, t, first)
+                nx = np.where(hit, hit_x, nx)
+                ny = np.where(hit, hit_y, ny)
+                target = np.where(hit, block, target)
+
+            free = moving & (first == np.inf)
+            cx = np.where(free, cx + dx, cx)
+            cy = np.where(free, cy + dy, cy)
+            moving &= ~free
+            if not moving.any():
+                break
+            t = np.where(moving, first, 0.0)
+            cx = np.where(moving, cx + dx * t, cx)
+            cy = np.where(moving, cy + dy * t, cy)
+            vx = np.where(moving & (nx != 0), np.abs(vx) * nx, vx)
+            vy = np.where(moving & (ny != 0), np.abs(vy) * ny, vy)
+            struck = moving & (target >= 0)
+            self._damage(e[struck], target[struck])
+            remaining = np.where(moving, remaining * (1 - t), remaining)
+
+        self.ball_vx[e], self.ball_vy[e] = vx, vy
+        self.ball_cx[e], self.ball_cy[e] = cx, cy
+        self.ball_x[e] = np.round(cx).astype(np.int32) - self.ball_w // 2
+        self.ball_y[e] = np.round(cy).astype(np.int32) - self.ball_h // 2
+
+        #Ball.lost
+        lost = e[self.ball_y[e] + self.ball_h >= Height]
+        self.hearts[lost] -= 1
+        self.ball_active[lost] = False
+        self.ball_vx[lost] = 2
+        self.ball_vy[lost] = -2
+        self.ball_x[lost] = self.ball_start.x
+        self.ball_y[lost] = self.ball_start.y
+        self.ball_cx[lost] = self.ball_start.centerx
+        self.ball_cy[lost] = self.ball_start.centery
+
+    def step(self, actions, serve=None):
+        """Advance every running game by one frame, like Game.update.
+
+        Args:
+            actions (array): Paddle direction per game (-1, 0 or 1).
+            serve (array, optional): Games that launch the ball this frame, like pressing space.
+
+        Returns:
+            ndarray: The done flags after the step.
+
+        """
+        actions = np.asarray(actions, dtype=np.int32)
+        if serve is not None:
+            self.ball_active |= np.asarray(serve, dtype=bool) & ~self.done
+
+        e = np.flatnonzero(~self.done)
+        self.frame[e] += 1
+        self._update_upgrades(e)
+        self._move_paddle(e, actions[e])
+        self._update_lasers(e[self.ball_active[e]])
+        self._update_ball(e)
+
+        self.done |= (self.hearts == 0) | (self.blocks_left == 0)
+        return self.done
+
+def check_parity(games=8, frames=3000, swept=Swept_Collision, level=None):
+    """Step sprite based headless games and a BatchBreakout side by side and compare them.
+
+    Args:
+        games (int, optional): The number of games. Defaults to 8.
+        frames (int, optional): Frames to compare. Defaults to 3000.
+        swept (bool, optional): The ball collision mode of both engines. Defaults to Swept_Collision.
+        level (Level, optional): The board to play, without multi drops. Defaults to None for Shape.
+
+    Returns:
+        int: The first frame where a game diverged, or -1 when all frames match.
+
+    """
+    from headless import track_ball, game_state
+    from main import Game
+
+    sprite_games = [Game(headless=True, level=level) for _ in range(games)]
+    for game in sprite_games:
+        game.ball.sprite.swept = swept
+    batch = BatchBreakout(games, shape=level.grid if level else Shape, swept=swept,
+                          **({'drop_prob': level.drop_prob, 'drops': level.drops} if level else {}))
+    blocks = [game.block_grp.sprites() for game in sprite_games]
+    cells = [[round((block.rect.y - Top_Offset) / batch.cell_h) * batch.cols + round(block.rect.x / batch.cell_w)
+              for block in game_blocks] for game_blocks in blocks]
+    for i, game in enumerate(sprite_games):
+        batch.load_game(i, game)
+
+    for frame in range(frames):
+        actions = np.zeros(games, np.int32)
+        for i, game in enumerate(sprite_games):
+            if game_state(game) == 'running':
+                game.serve()
+                actions[i] = track_ball(game)
+                game.run(int(actions[i]))
+        batch.step(actions, serve=np.ones(games, bool))
+
+        for i, game in enumerate(sprite_games):
+            player, ball = game.player.sprite, game.ball.sprite
+            expected = (player.rect.x, player.hearts, player.speed, player.no_lasers, len(player.lasers_grp),
+                        ball.rect.x, ball.rect.y, ball.velocity[0], ball.velocity[1],
+                        len(game.block_grp), len(game.upgrade_sprites), [block.health for block in blocks[i]])
+            actual = (batch.paddle_x[i], batch.hearts[i], batch.speed[i], batch.no_lasers[i], batch.laser_count[i],
+                      batch.ball_x[i], batch.ball_y[i], batch.ball_vx[i], batch.ball_vy[i],
+                      batch.blocks_left[i], batch.up_count[i], batch.health[i, cells[i]].tolist())
+            if tuple(int(v) for v in actual[:-1]) + actual[-1:] != expected:
+                print(f'game {i} diverged at frame {frame}:\n  sprites {expected}\n  batch   {actual}')
+                return frame
+    print(f'{games} games matched for {frames} frames with {"swept" if swept else "overlap"} collisions '
+          f'on {level.name if level else "the Shape board"}')
+    return -1
+
+def bench(envs=10000, frames=200):
+    """Measure batched steps per second with a ball tracking policy."""
+    batch = BatchBreakout(envs, seed=0)
+    serve = np.ones(envs, bool)
+    start = time.perf_counter()
+    for _ in range(frames):
+        ball_mid = batch.ball_x + batch.ball_w // 2
+        paddle_mid = batch.paddle_x + batch.paddle_w // 2
+        actions = np.sign(ball_mid - paddle_mid)
+        batch.step(actions, serve)
+    elapsed = time.perf_counter() - start
+    print(f'{envs} games x {frames} frames: {envs * frames / elapsed:,.0f} game frames/s '
+          f'({elapsed / frames * 1e3:.2f} ms per step)')
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'parity'
+    if command == 'parity':
+        from levels import read_level
+        #checkers has an empty cell next to every block and no multi drops
+        boards = (None, read_level('levels/checkers.lvl'))
+        sys.exit(1 if any(check_parity(swept=swept, level=level) >= 0
+                          for level in boards for swept in (True, False)) else 0)
+    elif command == 'bench':
+        bench(int(sys.argv[2]) if len(sys.argv) > 2 else 10000)